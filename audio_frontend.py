@@ -0,0 +1,234 @@
+import threading
+from math import gcd
+import numpy as np
+
+OVERFLOW_POLICIES = ("drop_oldest", "skip_to_live", "block")
+
+# --- RING BUFFER ---
+# Fixed-size int16 buffer between the capture callback and the recognizer.
+# When the recognizer falls behind and the buffer fills up:
+#   drop_oldest  - overwrite the oldest audio, keeping the newest `seconds` of backlog
+#   skip_to_live - throw the whole backlog away and continue from live audio
+#   block        - make the writer wait (backpressure for file replay; a live device will overrun instead)
+class AudioRingBuffer:
+    def __init__(self, seconds, samplerate, policy="drop_oldest"):
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {policy}")
+        self.samplerate = samplerate
+        self.policy = policy
+        self.capacity = max(1, int(seconds * samplerate))
+        self.buf = np.zeros(self.capacity, dtype=np.int16)
+        # Absolute frame counters; position in buf is counter % capacity
+        self.read_pos = 0
+        self.write_pos = 0
+        self.dropped_frames = 0
+        self.overflows = 0
+        self.closed = False
+        self.cond = threading.Condition()
+
+    def write(self, data):
+        samples = np.frombuffer(data, dtype=np.int16)
+        with self.cond:
+            if self.closed: return
+            n = len(samples)
+            if n > self.capacity:
+                self.dropped_frames += n - self.capacity
+                samples = samples[-self.capacity:]
+                n = self.capacity
+            free = self.capacity - (self.write_pos - self.read_pos)
+            if n > free:
+                self.overflows += 1
+                if self.policy == "block":
+                    while not self.closed and self.capacity - (self.write_pos - self.read_pos) < n:
+                        self.cond.wait()
+                    if self.closed: return
+                elif self.policy == "skip_to_live":
+                    self.dropped_frames += self.write_pos - self.read_pos
+                    self.read_pos = self.write_pos
+                else:
+                    self.dropped_frames += n - free
+                    self.read_pos += n - free
+            start = self.write_pos % self.capacity
+            first = min(n, self.capacity - start)
+            self.buf[start:start + first] = samples[:first]
+            self.buf[:n - first] = samples[first:]
+            self.write_pos += n
+            self.cond.notify_all()
+
+    # Returns up to `frames` frames as bytes (fewer only once closed), or None when closed and drained
+    def read(self, frames):
+        with self.cond:
+            while self.write_pos - self.read_pos < frames and not self.closed:
+                self.cond.wait()
+            n = min(frames, self.write_pos - self.read_pos)
+            if n == 0: return None
+            start = self.read_pos % self.capacity
+            first = min(n, self.capacity - start)
+            if first == n:
+                data = self.buf[start:start + n].tobytes()
+            else:
+                data = self.buf[start:].tobytes() + self.buf[:n - first].tobytes()
+            self.read_pos += n
+            self.cond.notify_all()
+            return data
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+    @property
+    def lag_seconds(self):
+        return (self.write_pos - self.read_pos) / self.samplerate
+
+    @property
+    def dropped_seconds(self):
+        return self.dropped_frames / self.samplerate
+
+# --- DOWNMIX & RESAMPLE ---
+# Streaming polyphase resampler: upsample by L, low-pass, downsample by M in one step.
+# Only the outputs that are kept are computed, and the last taps-1 input samples
+# are carried between blocks so block boundaries are seamless.
+class PolyphaseResampler:
+    def __init__(self, in_rate, out_rate, taps_per_phase=32):
+        g = gcd(int(in_rate), int(out_rate))
+        self.up = int(out_rate) // g
+        self.down = int(in_rate) // g
+        self.taps = taps_per_phase
+        # Windowed-sinc low-pass at the upsampled rate, cut off a little below the lower Nyquist
+        cutoff = 0.5 / max(self.up, self.down) * 0.9
+        n = np.arange(self.taps * self.up) - (self.taps * self.up - 1) / 2
+        h = 2 * cutoff * np.sinc(2 * cutoff * n) * np.kaiser(len(n), 8.0)
+        h *= self.up / h.sum()
+        # phases[p, k] = h[p + k*up]; output taps are applied to x[base - k]
+        self.phases = h.reshape(self.taps, self.up).T.astype(np.float32)
+        self.history = np.zeros(self.taps - 1, dtype=np.float32)
+        self.in_count = 0  # input samples consumed so far
+        self.next_pos = 0  # upsampled position of the next output sample
+
+    def process(self, x):
+        ext = np.concatenate((self.history, x.astype(np.float32, copy=False)))
+        ext_start = self.in_count - len(self.history)
+        self.in_count += len(x)
+        self.history = ext[len(ext) - (self.taps - 1):]
+        count = -(-(self.in_count * self.up - self.next_pos) // self.down)
+        if count <= 0:
+            return np.zeros(0, dtype=np.float32)
+        pos = self.next_pos + np.arange(count, dtype=np.int64) * self.down
+        self.next_pos += count * self.down
+        base = pos // self.up - ext_start
+        idx = base[:, None] - np.arange(self.taps)[None, :]
+        return np.einsum('ij,ij->i', self.phases[pos % self.up], ext[idx])
+
+# Turns blocks at the device's native rate and channel count into 16-bit mono at out_rate
+class CaptureFrontend:
+    # channel=None downmixes all channels, otherwise only that channel is kept
+    def __init__(self, in_rate, channels, out_rate=16000, channel=None):
+        self.in_rate = int(in_rate)
+        self.channels = channels
+        self.channel = channel
+        self.out_rate = out_rate
+        self.resampler = PolyphaseResampler(self.in_rate, out_rate) if self.in_rate != out_rate else None
+
+    def process(self, block):
+        # block: int16 bytes or an int16/float32 array of shape (frames,) or (frames, channels)
+        if not isinstance(block, np.ndarray):
+            block = np.frombuffer(block, dtype=np.int16)
+        scale = 32767.0 if block.dtype == np.float32 else 1.0
+        if self.channel is not None:
+            block = block.reshape(-1, self.channels)[:, self.channel]
+        elif self.channels > 1:
+            block = block.reshape(-1, self.channels).mean(axis=1, dtype=np.float32)
+        else:
+            block = block.reshape(-1)
+        if self.resampler is not None:
+            block = self.resampler.process(block)
+        if scale == 1.0 and block.dtype == np.int16:
+            return block
+        return np.clip(block * scale, -32768, 32767).astype(np.int16)
+
+# --- VOICE ACTIVITY GATE ---
+# Decides per block whether the recognizer needs to see it. A 20 ms frame counts as speech when it is
+# louder than the tracked noise floor, has most of its energy in the speech band and is not noise-flat.
+# A block is only passed on if the loudness over the last second also rises and falls the way
+# syllables do; sustained music keeps a fairly flat envelope.
+# The gate opens with `preroll` seconds of earlier audio so word onsets are not clipped, stays open
+# for `hangover` seconds after the last speech block, and reports the end of speech so the caller
+# can finalize the utterance instead of waiting for Kaldi's own endpoint.
+class VoiceActivityGate:
+    def __init__(self, samplerate=16000, frame_ms=20, margin_db=6.0, min_db=-50.0, min_band_ratio=0.5,
+                 max_flatness=0.6, min_modulation_db=6.0, min_speech_frames=0.4, hangover=0.6, preroll=0.3):
+        self.samplerate = samplerate
+        self.frame = int(samplerate * frame_ms / 1000)
+        self.margin_db = margin_db
+        self.min_db = min_db
+        self.min_band_ratio = min_band_ratio
+        self.max_flatness = max_flatness
+        self.min_modulation_db = min_modulation_db
+        self.min_speech_frames = min_speech_frames
+        self.hangover = hangover
+        self.preroll = preroll
+        freqs = np.fft.rfftfreq(self.frame, 1 / samplerate)
+        self.band = (freqs >= 300) & (freqs <= 3400)
+        self.window = np.hanning(self.frame).astype(np.float32)
+        self.noise_db = None
+        self.recent_db = np.full(int(1000 / frame_ms), min_db, dtype=np.float32)  # last second of frame energies
+        self.active = False
+        self.silent_for = 0.0
+        self.pending = []
+        self.pending_seconds = 0.0
+        self.total_frames = 0
+        self.skipped_frames = 0
+
+    def is_speech(self, samples):
+        n = len(samples) // self.frame
+        if n == 0: return False
+        frames = samples[:n * self.frame].reshape(n, self.frame).astype(np.float32) / 32768.0
+        energy_db = 10 * np.log10(np.mean(frames ** 2, axis=1) + 1e-10)
+        spec = np.abs(np.fft.rfft(frames * self.window, axis=1)) ** 2 + 1e-12
+        band_ratio = spec[:, self.band].sum(axis=1) / spec.sum(axis=1)
+        flatness = np.exp(np.mean(np.log(spec), axis=1)) / np.mean(spec, axis=1)
+        self.recent_db = np.roll(self.recent_db, -n)
+        self.recent_db[-n:] = np.maximum(energy_db[-len(self.recent_db):], self.min_db)
+        low, high = np.percentile(self.recent_db, (10, 90))
+
+        # Noise floor follows quiet frames quickly and loud ones slowly
+        if self.noise_db is None: self.noise_db = float(energy_db.min())
+        for e in energy_db:
+            self.noise_db = e if e < self.noise_db else self.noise_db + 0.002 * (e - self.noise_db)
+
+        loud = (energy_db > self.noise_db + self.margin_db) & (energy_db > self.min_db)
+        speech = loud & (band_ratio > self.min_band_ratio) & (flatness < self.max_flatness)
+        return speech.mean() >= self.min_speech_frames and high - low >= self.min_modulation_db
+
+    # Returns (data to feed the recognizer or None, whether speech just ended)
+    def process(self, data):
+        samples = np.frombuffer(data, dtype=np.int16)
+        seconds = len(samples) / self.samplerate
+        self.total_frames += len(samples)
+        if self.is_speech(samples):
+            self.silent_for = 0.0
+            if not self.active:
+                self.active = True
+                pending, self.pending, self.pending_seconds = self.pending, [], 0.0
+                self.skipped_frames -= sum(len(p) for p in pending) // 2
+                return b"".join(pending) + data, False
+            return data, False
+        if self.active:
+            self.silent_for += seconds
+            if self.silent_for < self.hangover:
+                return data, False
+            self.active = False
+            ended = True
+        else:
+            ended = False
+        self.skipped_frames += len(samples)
+        self.pending.append(data)
+        self.pending_seconds += seconds
+        while self.pending and self.pending_seconds - len(self.pending[0]) / 2 / self.samplerate >= self.preroll:
+            self.pending_seconds -= len(self.pending.pop(0)) / 2 / self.samplerate
+        return None, ended
+
+    @property
+    def skipped_fraction(self):
+        return self.skipped_frames / self.total_frames if self.total_frames else 0.0
@@ -0,0 +1,237 @@
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from audio_frontend import CaptureFrontend
+from transcript import timestamp
+
+log = logging.getLogger("translator")
+
+SAMPLERATE = 16000
+FRAME = 480  # 30 ms frames for finding silences
+DECODE_BLOCK = 8000  # frames per AcceptWaveform call; no one is waiting for partials here
+
+# Offline subtitles for recorded lectures and videos: the file is converted to 16 kHz mono once, cut
+# at silences into chunks, and the chunks are decoded in parallel worker threads that share one loaded
+# model (a fresh KaldiRecognizer per chunk; Vosk releases the GIL while it decodes, so the threads
+# run on all cores without a copy of the model each). Results come back in order with word-level
+# timestamps, are split into subtitle-sized cues, translated in batches (into every target language)
+# through the same translator chains and cache as the live app, and written as SRT.
+
+# --- AUDIO ---
+# Writes the file as 16 kHz mono 16-bit PCM; WAV goes through our own front end, anything else through ffmpeg
+def convert(path, pcm_path):
+    if path.lower().endswith(".wav"):
+        with wave.open(path, "rb") as w, open(pcm_path, "wb") as out:
+            if w.getsampwidth() != 2:
+                raise ValueError("Only 16-bit PCM WAV files are supported (other formats go through ffmpeg)")
+            frontend = CaptureFrontend(w.getframerate(), w.getnchannels(), SAMPLERATE)
+            while True:
+                data = w.readframes(SAMPLERATE * 10)
+                if not data: break
+                out.write(frontend.process(data).tobytes())
+    else:
+        try:
+            subprocess.run(["ffmpeg", "-nostdin", "-v", "error", "-y", "-i", path, "-ac", "1", "-ar", str(SAMPLERATE),
+                            "-f", "s16le", pcm_path], check=True)
+        except FileNotFoundError:
+            raise ValueError(f"{os.path.basename(path)} is not a WAV file and ffmpeg was not found on PATH")
+    return os.path.getsize(pcm_path) // 2
+
+# Loudness of every FRAME, smoothed over ~0.3 s so a cut lands in a pause rather than between two syllables
+def frame_energy(pcm):
+    n = len(pcm) // FRAME
+    energy = np.empty(n, dtype=np.float32)
+    step = 20000  # frames at a time, to keep memory flat on long files
+    for i in range(0, n, step):
+        frames = pcm[i * FRAME:min(n, i + step) * FRAME].reshape(-1, FRAME).astype(np.float32) / 32768.0
+        energy[i:i + len(frames)] = 10 * np.log10(np.mean(frames ** 2, axis=1) + 1e-10)
+    width = 10
+    return np.convolve(energy, np.ones(width) / width, mode="same") if n > width else energy
+
+# (start, end) sample ranges of about chunk_seconds, each cut at the quietest point within
+# search_seconds of its target
+def split_points(energy, total, chunk_seconds, search_seconds):
+    per_second = SAMPLERATE / FRAME
+    cuts = [0]
+    while total / SAMPLERATE - cuts[-1] / SAMPLERATE > chunk_seconds * 1.5:
+        target = cuts[-1] / FRAME + chunk_seconds * per_second
+        lo, hi = int(target - search_seconds * per_second), int(target + search_seconds * per_second)
+        lo = max(lo, cuts[-1] // FRAME + 1)
+        hi = min(hi, len(energy))
+        if hi <= lo: break
+        cuts.append((lo + int(np.argmin(energy[lo:hi]))) * FRAME)
+    cuts.append(total)
+    return list(zip(cuts[:-1], cuts[1:]))
+
+# --- WORKERS ---
+# Decodes samples [start, end) of the PCM file with the shared model; returns (index, utterances,
+# CPU seconds). Utterance times are in seconds from the start of the file, from Vosk's word timings
+# when it gives them, otherwise from the block positions where each result came out.
+def decode_chunk(model, job):
+    index, pcm_path, start, end = job
+    import vosk
+    cpu = time.thread_time()
+    pcm = np.memmap(pcm_path, dtype=np.int16, mode="r")
+    rec = vosk.KaldiRecognizer(model, SAMPLERATE)
+    if hasattr(rec, "SetWords"): rec.SetWords(True)
+    utterances = []
+    last = start
+    def collect(result_json, pos):
+        nonlocal last
+        res = json.loads(result_json)
+        if res.get("text"):
+            words = [(w["word"], start / SAMPLERATE + w["start"], start / SAMPLERATE + w["end"]) for w in res.get("result", [])]
+            utterances.append({"start": words[0][1] if words else last / SAMPLERATE, "end": words[-1][2] if words else pos / SAMPLERATE,
+                               "text": res["text"], "words": words})
+        last = pos
+    for pos in range(start, end, DECODE_BLOCK):
+        block_end = min(pos + DECODE_BLOCK, end)
+        if rec.AcceptWaveform(pcm[pos:block_end].tobytes()): collect(rec.Result(), block_end)
+    collect(rec.FinalResult(), end)
+    return index, utterances, time.thread_time() - cpu
+
+# --- CUES ---
+# Splits an utterance into cues of at most max_seconds and max_chars, at word boundaries
+def make_cues(utterance, max_seconds, max_chars):
+    words = utterance["words"]
+    if not words: return [(utterance["start"], utterance["end"], utterance["text"])]
+    cues = []
+    current = []
+    for word in words:
+        if current and (word[2] - current[0][1] > max_seconds or len(" ".join(w[0] for w in current + [word])) > max_chars):
+            cues.append((current[0][1], current[-1][2], " ".join(w[0] for w in current)))
+            current = []
+        current.append(word)
+    cues.append((current[0][1], current[-1][2], " ".join(w[0] for w in current)))
+    return cues
+
+def write_srt(path, cues, texts):
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        n = 0
+        for (start, end, _), text in zip(cues, texts):
+            if not text: continue
+            n += 1
+            f.write(f"{n}\n{timestamp(start, ',')} --> {timestamp(max(end, start + 0.5), ',')}\n{text}\n\n")
+
+# --- DRIVER ---
+def run(args):
+    import main as app
+    model_path = app.find_model_path(app.resolve_model_arg(args.model))
+    if not os.path.exists(model_path):
+        raise ValueError(f"Model not found: {model_path} (run the GUI once to download it)")
+    workers = args.workers or os.cpu_count() or 1
+    try:
+        import vosk
+        vosk.SetLogLevel(-1)
+        model = app.get_model(model_path)
+    except Exception as e:
+        raise ValueError(f"Could not load the model {model_path}: {e}")
+    folder = args.output_dir or os.path.dirname(os.path.abspath(args.input))
+    os.makedirs(folder, exist_ok=True)
+    base = os.path.join(folder, os.path.splitext(os.path.basename(args.input))[0])
+    started = time.time()
+    timings = {}
+
+    fd, pcm_path = tempfile.mkstemp(suffix=".pcm")
+    os.close(fd)
+    try:
+        total = convert(args.input, pcm_path)
+        audio_seconds = total / SAMPLERATE
+        timings["convert"] = time.time() - started
+        pcm = np.memmap(pcm_path, dtype=np.int16, mode="r") if total else np.zeros(0, dtype=np.int16)
+        # Enough chunks to keep every worker busy until the end, but not so short that cuts get frequent
+        chunk_seconds = args.chunk_seconds or min(120.0, max(15.0, audio_seconds / (workers * 4)))
+        chunks = split_points(frame_energy(pcm), total, chunk_seconds, min(5.0, chunk_seconds / 4))
+        del pcm
+        log.info("%.0fs of audio in %d chunks of ~%.0fs on %d workers", audio_seconds, len(chunks), chunk_seconds, workers)
+
+        langs = [] if args.no_translate else app.parse_langs(args.target_langs or ",".join(app.TARGET_LANGS))
+        translators = {lang: app.make_translator(target=lang) for lang in langs}
+        cache = None if args.no_translate or args.no_cache else app.open_translation_cache()
+        pool = ThreadPoolExecutor(max_workers=app.TRANSLATION_WORKERS)
+        def translate(lang, texts):
+            found = [cache.get(t, app.SOURCE_LANG, lang) if cache else None for t in texts]
+            missing = [t for t, f in zip(texts, found) if f is None]
+            if missing:
+                try:
+                    fresh, _, cacheable = app.translate_batch(translators[lang], missing)
+                    fresh = iter(fresh)
+                except Exception as e:
+                    log.warning("Translation into %s failed for %d cue(s): %s", lang, len(missing), e)
+                    fresh, cacheable = iter([""] * len(missing)), False
+                for i, t in enumerate(texts):
+                    if found[i] is None:
+                        found[i] = next(fresh)
+                        if cache and cacheable and found[i]: cache.put(t, app.SOURCE_LANG, lang, found[i])
+            return found
+
+        cues = []
+        batches = {lang: [] for lang in langs}  # translation futures per language, in cue order
+        cpu = 0.0
+        decode_start = time.time()
+        jobs = [(i, pcm_path, start, end) for i, (start, end) in enumerate(chunks) if end > start]
+        with ThreadPoolExecutor(max_workers=workers) as workers_pool:
+            for index, utterances, chunk_cpu in workers_pool.map(lambda job: decode_chunk(model, job), jobs):
+                cpu += chunk_cpu
+                fresh = [cue for u in utterances for cue in make_cues(u, args.max_cue_seconds, args.max_cue_chars)]
+                cues.extend(fresh)
+                # Translate while later chunks are still decoding
+                for lang in langs:
+                    for i in range(0, len(fresh), app.TRANSLATION_BATCH_SIZE):
+                        batches[lang].append(pool.submit(translate, lang, [c[2] for c in fresh[i:i + app.TRANSLATION_BATCH_SIZE]]))
+                if not args.quiet and audio_seconds:
+                    done = chunks[index][1] / SAMPLERATE
+                    print(f"{done / audio_seconds:6.1%}  {done / (time.time() - decode_start):5.1f}x real time", file=sys.stderr, flush=True)
+        timings["decode"] = time.time() - decode_start
+
+        outputs = [base + ".en.srt"]
+        write_srt(outputs[0], cues, [c[2] for c in cues])
+        for lang in langs:
+            outputs.append(f"{base}.{lang}.srt")
+            write_srt(outputs[-1], cues, [t for batch in batches[lang] for t in batch.result()])
+        if langs: timings["translate_tail"] = time.time() - decode_start - timings["decode"]
+        pool.shutdown()
+    finally:
+        os.remove(pcm_path)
+
+    wall = time.time() - started
+    return {"event": "summary", "input": args.input, "outputs": outputs, "audio_seconds": round(audio_seconds, 3),
+            "workers": workers, "chunks": len(chunks), "cues": len(cues), "wall_seconds": round(wall, 3),
+            "x_realtime": round(audio_seconds / wall, 2) if wall else None,
+            "decode_x_realtime": round(audio_seconds / timings["decode"], 2) if timings["decode"] else None,
+            # decode CPU per wall second: close to the worker count when the work spreads evenly
+            "parallelism": round(cpu / timings["decode"], 2) if timings["decode"] else None,
+            "seconds": {name: round(value, 3) for name, value in timings.items()}}
+
+def main():
+    parser = argparse.ArgumentParser(description="Subtitle a recorded audio/video file: decode in parallel, translate and write SRT")
+    parser.add_argument("input", help="WAV file, or any media file ffmpeg can read")
+    parser.add_argument("--model", default="small", help="small, medium, large or a path to a Vosk model")
+    parser.add_argument("--workers", type=int, default=0, help="Decoding threads (default: one per core; they share one copy of the model)")
+    parser.add_argument("--output-dir", help="Folder for the .en.srt/.<lang>.srt files (default: next to the input)")
+    parser.add_argument("--chunk-seconds", type=float, default=0, help="Target chunk length (default: based on the length and worker count)")
+    parser.add_argument("--max-cue-seconds", type=float, default=7.0)
+    parser.add_argument("--max-cue-chars", type=int, default=84)
+    parser.add_argument("--target-langs", help="Comma-separated languages to write translated subtitles in (default: TARGET_LANGS in main.py)")
+    parser.add_argument("--no-translate", action="store_true", help="Write the English subtitles only")
+    parser.add_argument("--no-cache", action="store_true", help="Do not use the translation cache")
+    parser.add_argument("--quiet", action="store_true", help="No progress lines on stderr")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    try:
+        print(json.dumps(run(args), ensure_ascii=False))
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,535 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import platform
+import re
+import subprocess
+import sys
+import threading
+import time
+import wave
+import numpy as np
+from audio_frontend import CaptureFrontend
+from latency import LatencyTracker
+from translation import BATCH_DELIMITER, TranslatorChain
+
+BLOCK_SIZE = 4000
+
+def load_wav(path):
+    with wave.open(path, "rb") as w:
+        if w.getsampwidth() != 2:
+            raise ValueError("Only 16-bit PCM WAV files are supported")
+        rate, channels = w.getframerate(), w.getnchannels()
+        samples = np.frombuffer(w.readframes(w.getnframes()), dtype=np.int16).reshape(-1, channels)
+    return samples, rate, channels
+
+def save_wav(path, samples, rate):
+    with wave.open(path, "wb") as w:
+        w.setnchannels(samples.shape[1] if samples.ndim > 1 else 1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(samples.astype(np.int16).tobytes())
+
+def blocks(samples, size=BLOCK_SIZE):
+    for i in range(0, len(samples), size):
+        yield samples[i:i + size]
+
+# --- FRONT END ---
+def frontend_speed(samples, rate, channels, out_rate):
+    frontend = CaptureFrontend(rate, channels, out_rate)
+    start = time.perf_counter()
+    for block in blocks(samples):
+        frontend.process(block)
+    return len(samples) / rate / (time.perf_counter() - start)
+
+# CPU seconds the recognizer spends per second of audio when fed at out_rate
+def recognizer_cpu(model, samples, rate, channels, out_rate):
+    import vosk
+    frontend = CaptureFrontend(rate, channels, out_rate)
+    converted = [frontend.process(block).tobytes() for block in blocks(samples)]
+    rec = vosk.KaldiRecognizer(model, out_rate)
+    start = time.process_time()
+    for data in converted:
+        rec.AcceptWaveform(data)
+    text = json.loads(rec.FinalResult()).get("text", "")
+    return (time.process_time() - start) / (len(samples) / rate), text
+
+def bench_frontend(args):
+    samples, rate, channels = load_wav(args.input)
+    result = {
+        "input": args.input,
+        "samplerate": rate,
+        "channels": channels,
+        "audio_seconds": round(len(samples) / rate, 3),
+        "frontend_x_realtime": round(frontend_speed(samples, rate, channels, args.target_rate), 1),
+    }
+    if args.model:
+        import vosk
+        from main import find_model_path, resolve_model_arg
+        vosk.SetLogLevel(-1)
+        model = vosk.Model(find_model_path(resolve_model_arg(args.model)))
+        for label, out_rate in (("native", rate), ("resampled", args.target_rate)):
+            cpu, text = recognizer_cpu(model, samples, rate, channels, out_rate)
+            result[label] = {"samplerate": out_rate, "cpu_per_audio_second": round(cpu, 4), "text": text}
+        if result["native"]["cpu_per_audio_second"]:
+            result["cpu_saving"] = round(1 - result["resampled"]["cpu_per_audio_second"] / result["native"]["cpu_per_audio_second"], 3)
+    return result
+
+# --- CORPUS ---
+# A corpus is a folder of 16-bit WAV clips, optionally grouped in subfolders (speech/, music/, silence/ ...).
+# clip.txt next to clip.wav holds the reference transcript; a clip without one should produce no words.
+def load_corpus(folder):
+    clips = []
+    for root, dirs, files in os.walk(folder):
+        dirs.sort()
+        for name in sorted(files):
+            if not name.lower().endswith(".wav"): continue
+            path = os.path.join(root, name)
+            ref_path = os.path.splitext(path)[0] + ".txt"
+            reference = ""
+            if os.path.exists(ref_path):
+                with open(ref_path, encoding="utf-8") as f: reference = f.read()
+            category = os.path.relpath(root, folder).split(os.sep)[0]
+            clips.append({"path": path, "name": os.path.relpath(path, folder).replace(os.sep, "/"),
+                          "category": "clips" if category == "." else category, "reference": reference})
+    if not clips:
+        raise ValueError(f"No WAV clips in {folder}")
+    return clips
+
+# Identifies the exact clips and transcripts, so results are only compared across the same corpus
+def corpus_info(folder):
+    clips = load_corpus(folder)
+    digest = hashlib.sha256()
+    seconds = 0.0
+    for clip in clips:
+        digest.update(clip["name"].encode() + clip["reference"].encode())
+        with open(clip["path"], "rb") as f: digest.update(hashlib.sha256(f.read()).digest())
+        with wave.open(clip["path"], "rb") as w: seconds += w.getnframes() / w.getframerate()
+    return {"folder": folder, "clips": len(clips), "audio_seconds": round(seconds, 3), "sha256": digest.hexdigest()[:16]}
+
+# Deterministic music and silence clips (speech clips with transcripts have to be added by hand).
+# Written at 44.1 kHz stereo like typical system audio, so the front end's downmix and resampling are included.
+def bench_make_corpus(args):
+    rate = 44100
+    rng = np.random.default_rng(args.seed)
+    t = np.arange(int(args.seconds * rate)) / rate
+    written = []
+    def write(name, left, right=None):
+        path = os.path.join(args.folder, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        stereo = np.stack([left, left if right is None else right], axis=1)
+        save_wav(path, np.clip(stereo * 32767, -32768, 32767), rate)
+        written.append(path)
+
+    write("silence/digital_silence.wav", np.zeros_like(t))
+    write("silence/room_noise.wav", rng.normal(0, 0.003, len(t)), rng.normal(0, 0.003, len(t)))
+    # Chords changing every two seconds, with harmonics and a soft beat
+    chords = [(220.0, 277.2, 329.6), (196.0, 246.9, 293.7), (174.6, 220.0, 261.6), (196.0, 246.9, 329.6)]
+    music = np.zeros_like(t)
+    for i, chord in enumerate(chords * int(args.seconds // 8 + 1)):
+        part = (t >= 2 * i) & (t < 2 * i + 2)
+        for f in chord:
+            for h, gain in ((1, 0.12), (2, 0.05), (3, 0.02)):
+                music[part] += gain * np.sin(2 * np.pi * f * h * t[part])
+    beat = np.exp(-30 * (t % 0.5)) * rng.normal(0, 0.08, len(t))
+    write("music/chords.wav", music + beat, 0.8 * music + beat)
+    write("music/tone.wav", 0.2 * np.sin(2 * np.pi * 440 * t))
+    os.makedirs(os.path.join(args.folder, "speech"), exist_ok=True)
+    return {"folder": args.folder, "written": written,
+            "next": "add speech/*.wav recordings with a .txt transcript next to each one"}
+
+# --- WORD ERROR RATE ---
+def words(text):
+    return re.findall(r"[a-z0-9']+", text.lower())
+
+# Substitutions + deletions + insertions turning ref into hyp
+def word_errors(ref, hyp):
+    row = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        prev, row[0] = row[0], i
+        for j, h in enumerate(hyp, 1):
+            prev, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, prev + (r != h))
+    return row[-1]
+
+def wer_summary(items):
+    ref_words = sum(item["ref_words"] for item in items)
+    errors = sum(item["errors"] for item in items)
+    return {"ref_words": ref_words, "errors": errors, "wer": round(errors / ref_words, 4) if ref_words else None,
+            # words recognized in music or silence clips
+            "false_words": sum(item["hyp_words"] for item in items if not item["ref_words"])}
+
+# --- MEASUREMENT ---
+# Deterministic stand-in for the translation backends: answers after a fixed delay plus a per-character
+# cost, without network, so runs only differ in what is being measured
+class FakeTranslator:
+    def __init__(self, delay=0.05, per_char=0.0):
+        self.delay = delay
+        self.per_char = per_char
+
+    def translate(self, text):
+        time.sleep(self.delay + self.per_char * len(text))
+        return BATCH_DELIMITER.join(f"[fa] {line}" for line in text.split(BATCH_DELIMITER))
+
+# Current and peak resident memory of this process in MB (None where the platform can't tell)
+def memory_mb():
+    if sys.platform == "win32":
+        import ctypes
+        from ctypes import wintypes
+        class Counters(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD)] + \
+                       [(name, ctypes.c_size_t) for name in ("PeakWorkingSetSize", "WorkingSetSize", "QuotaPeakPagedPoolUsage",
+                        "QuotaPagedPoolUsage", "QuotaPeakNonPagedPoolUsage", "QuotaNonPagedPoolUsage", "PagefileUsage", "PeakPagefileUsage")]
+        counters = Counters()
+        counters.cb = ctypes.sizeof(counters)
+        ctypes.windll.psapi.GetProcessMemoryInfo(ctypes.windll.kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb)
+        return counters.WorkingSetSize / 2**20, counters.PeakWorkingSetSize / 2**20
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak = peak / 2**20 if sys.platform == "darwin" else peak / 1024
+    try:
+        with open("/proc/self/statm") as f: current = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        current = None
+    return current, peak
+
+def cpu_seconds():
+    times = os.times()
+    return times.user + times.system
+
+# Least-squares slope of ys over xs
+def slope(xs, ys):
+    if len(xs) < 2: return 0.0
+    x, y = np.array(xs, dtype=float), np.array(ys, dtype=float)
+    x -= x.mean()
+    return float((x * (y - y.mean())).sum() / (x * x).sum()) if (x * x).sum() else 0.0
+
+# Loads main with the configuration under test and starts its translation thread on the fake translator.
+# Runs in a child process of its own, so peak memory and module settings belong to one configuration.
+def open_pipeline(args):
+    import main as app
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s %(levelname)s %(message)s")
+    app.TARGET_SAMPLERATE = args.rate
+    app.DECODE_BLOCK_SIZE = args.block
+    app.latency = LatencyTracker(window=float("inf"))
+    model_path = app.resolve_model_arg(args.model)
+    if not os.path.exists(app.find_model_path(model_path)):
+        raise ValueError(f"Model not found: {model_path}")
+    start = time.perf_counter()
+    app.get_model(model_path)
+    load_seconds = time.perf_counter() - start
+    pending = [app.translation_queue]  # queues to join before a clip's translations are all out
+    if not args.no_translate:
+        # A fake service per language, as if each language had its own backend
+        fakes = {lang: FakeTranslator(args.translate_delay, args.translate_per_char) for lang in app.parse_langs(args.target_langs)}
+        pending = app.start_translation({lang: TranslatorChain([("fake", lambda fake=fake: fake)], retries=0) for lang, fake in fakes.items()})
+    return app, model_path, load_seconds, pending
+
+def config_info(args, load_seconds):
+    return {"model": args.model, "rate": args.rate, "block": args.block, "vad": args.vad,
+            "translate_delay": None if args.no_translate else args.translate_delay,
+            "target_langs": None if args.no_translate else args.target_langs, "model_load_seconds": round(load_seconds, 3)}
+
+# One model/configuration over the whole corpus, in this process (used by "run")
+def bench_replay(args):
+    app, model_path, load_seconds, pending = open_pipeline(args)
+    clips = load_corpus(args.corpus)
+    cpu_start, wall_start = cpu_seconds(), time.perf_counter()
+    results = []
+    for clip in clips:
+        src = app.FileAudioSource(clip["path"], speed=0)
+        start = time.perf_counter()
+        # A ring of a few blocks keeps the reader just ahead of the recognizer, so latencies measured from
+        # capture time reflect processing rather than how far ahead the file has been read
+        app.vosk_thread([(src, None, None)], model_path, overflow="block", use_vad=args.vad,
+                        buffer_seconds=max(0.5, 3 * args.block / args.rate))
+        decode = time.perf_counter() - start
+        if args.no_translate:
+            while not app.translation_queue.empty(): app.translation_queue.get_nowait()
+        else:
+            for sentences in pending: sentences.join()
+        finals, error = [], None
+        while not app.gui_queue.empty():
+            kind, payload = app.gui_queue.get_nowait()[:2]
+            if kind.startswith("final_") and kind != "final_en": app.latency.rendered(None, kind[6:])
+            elif kind == "final_en" and payload.startswith("Error: "): error = payload[7:]
+            elif kind in ("segment_en", "final_en") and payload: finals.append(payload)
+        ref, hyp = words(clip["reference"]), words(" ".join(finals))
+        result = {"name": clip["name"], "category": clip["category"], "audio_seconds": round(src.audio_seconds, 3),
+                  "decode_seconds": round(decode, 3), "rtf": round(decode / src.audio_seconds, 4) if src.audio_seconds else None,
+                  "ref_words": len(ref), "hyp_words": len(hyp), "errors": word_errors(ref, hyp), "text": " ".join(finals)}
+        if error: result["error"] = error
+        results.append(result)
+
+    wall, cpu = time.perf_counter() - wall_start, cpu_seconds() - cpu_start
+    audio = sum(r["audio_seconds"] for r in results)
+    decode = sum(r["decode_seconds"] for r in results)
+    categories = {}
+    for r in results: categories.setdefault(r["category"], []).append(r)
+    _, peak = memory_mb()
+    summary = config_info(args, load_seconds)
+    summary.update(
+        audio_seconds=round(audio, 3), decode_seconds=round(decode, 3), rtf=round(decode / audio, 4) if audio else None,
+        cpu_seconds=round(cpu, 3), cpu_per_audio_second=round(cpu / audio, 4) if audio else None,
+        cpu_cores=round(cpu / wall, 3) if wall else None, peak_rss_mb=round(peak, 1) if peak else None,
+        latency=app.latency.snapshot(), failed_clips=sum(1 for r in results if "error" in r), **wer_summary(results),
+        categories={name: dict(audio_seconds=round(sum(r["audio_seconds"] for r in items), 3),
+                               rtf=round(sum(r["decode_seconds"] for r in items) / max(1e-9, sum(r["audio_seconds"] for r in items)), 4),
+                               **wer_summary(items)) for name, items in categories.items()},
+        clips=results)
+    return summary
+
+# --- SOAK ---
+# File-like replay of a PCM buffer over and over, ending after `total` bytes
+class LoopedPCM:
+    def __init__(self, pcm, total):
+        self.pcm = pcm
+        self.total = total
+        self.pos = 0
+
+    def read(self, n):
+        n = min(n, self.total - self.pos)
+        out = bytearray()
+        while len(out) < n:
+            offset = self.pos % len(self.pcm)
+            chunk = self.pcm[offset:offset + n - len(out)]
+            out += chunk
+            self.pos += len(chunk)
+        return bytes(out)
+
+    def close(self):
+        pass
+
+# The corpus as one mono PCM buffer at the recognizer's rate
+def corpus_pcm(clips, rate):
+    parts = []
+    for clip in clips:
+        samples, clip_rate, channels = load_wav(clip["path"])
+        frontend = CaptureFrontend(clip_rate, channels, rate)
+        parts.extend(frontend.process(block) for block in blocks(samples))
+    return np.concatenate(parts).astype(np.int16).tobytes()
+
+# The corpus looped at `speed` x real time for `seconds` of wall time, live-style (audio is dropped
+# when the recognizer falls behind), sampling lag, CPU and memory every second (used by "soak")
+def bench_soak_step(args):
+    app, model_path, load_seconds, pending = open_pipeline(args)
+    pcm = corpus_pcm(load_corpus(args.corpus), args.rate)
+    total = int(args.speed * args.seconds * args.rate) * 2
+    src = app.FileAudioSource("corpus", speed=args.speed, fmt="raw", samplerate=args.rate, channels=1, stream=LoopedPCM(pcm, total))
+    threading.Thread(target=app.vosk_thread, args=([(src, None, None)], model_path), daemon=True,
+                     kwargs={"use_vad": args.vad, "buffer_seconds": args.buffer_seconds, "overflow": "drop_oldest"}).start()
+
+    start = time.perf_counter()
+    samples = []  # (wall seconds, rss MB, lag seconds, translation backlog)
+    lag = {"behind_seconds": 0.0, "dropped_seconds": 0.0}
+    cores = []
+    finals = 0
+    next_sample = start
+    while True:
+        try:
+            msg = app.gui_queue.get(timeout=0.2)
+        except app.queue.Empty:
+            msg = None
+        if msg and msg[0] == "eof": break
+        if msg and msg[0] == "lag": lag = msg[1]
+        elif msg and msg[0] == "cpu": cores.append(msg[1]["core_fraction"])
+        elif msg and msg[0] in ("segment_en", "final_en") and msg[1]: finals += 1
+        elif msg and msg[0].startswith("final_") and msg[0] != "final_en": app.latency.rendered(None, msg[0][6:])
+        now = time.perf_counter()
+        if now >= next_sample:
+            samples.append((now - start, memory_mb()[0], lag["behind_seconds"], sum(q.qsize() for q in pending)))
+            next_sample += 1.0
+    wall = time.perf_counter() - start
+
+    # Memory and lag trends ignore the first fifth of the run, while caches and buffers fill;
+    # a memory trend over less than half a minute is noise
+    steady = samples[len(samples) // 5:]
+    times = [s[0] for s in steady]
+    rss = [s[1] for s in steady if s[1] is not None]
+    growth = slope(times, rss) * 60 if len(rss) == len(times) and times and times[-1] - times[0] >= 30 else None
+    lag_trend = slope(times, [s[2] for s in steady])
+    backlog = max((s[3] for s in samples), default=0)
+    reasons = []
+    if lag["dropped_seconds"] > 0: reasons.append("dropped_audio")
+    if lag_trend > args.max_lag_growth or max((s[2] for s in samples), default=0) > args.max_lag: reasons.append("recognizer_lag")
+    if backlog > args.max_translation_backlog: reasons.append("translation_backlog")
+    _, peak = memory_mb()
+    result = config_info(args, load_seconds)
+    result.update(
+        speed=args.speed, wall_seconds=round(wall, 3), audio_seconds=round(src.audio_seconds, 3),
+        x_realtime=round(src.audio_seconds / wall, 3) if wall else None, finals=finals,
+        dropped_seconds=lag["dropped_seconds"], max_lag_seconds=round(max((s[2] for s in samples), default=0), 3),
+        lag_growth_per_second=round(lag_trend, 4), max_translation_backlog=backlog,
+        core_fraction=round(sum(cores) / len(cores), 3) if cores else None,
+        rss_start_mb=round(rss[0], 1) if rss else None, rss_end_mb=round(rss[-1], 1) if rss else None,
+        peak_rss_mb=round(peak, 1) if peak else None, rss_growth_mb_per_minute=round(growth, 3) if growth is not None else None,
+        latency=app.latency.snapshot(), saturated=bool(reasons), reasons=reasons)
+    return result
+
+# --- DRIVER ---
+def run_info():
+    info = {"time": time.strftime("%Y-%m-%dT%H:%M:%S%z"), "python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()}
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+        if commit: info["commit"] = commit
+    except (OSError, subprocess.SubprocessError):
+        pass
+    return info
+
+def pipeline_argv(args, model, rate, block):
+    argv = [args.corpus, "--model", model, "--rate", str(rate), "--block", str(block),
+            "--translate-delay", str(args.translate_delay), "--translate-per-char", str(args.translate_per_char),
+            "--target-langs", args.target_langs]
+    if args.vad: argv.append("--vad")
+    if args.no_translate: argv.append("--no-translate")
+    return argv
+
+# Runs one benchmark command in a fresh interpreter and returns its JSON result
+def run_child(command, argv):
+    proc = subprocess.run([sys.executable, os.path.abspath(__file__), command] + argv, capture_output=True, text=True)
+    if proc.returncode:
+        lines = proc.stderr.strip().splitlines()
+        return {"error": lines[-1] if lines else f"exit code {proc.returncode}"}
+    return json.loads(proc.stdout)
+
+def csv_list(text, kind=str):
+    return [kind(item) for item in text.split(",") if item]
+
+def bench_run(args):
+    runs = []
+    for model in csv_list(args.models):
+        for rate in csv_list(args.rates, int):
+            for block in csv_list(args.blocks, int):
+                print(f"{model} {rate} Hz, block {block}...", file=sys.stderr, flush=True)
+                result = run_child("replay", pipeline_argv(args, model, rate, block))
+                if "error" in result: result.update(model=model, rate=rate, block=block)
+                elif not args.clips: del result["clips"]
+                runs.append(result)
+    return {"benchmark": "corpus", "info": run_info(), "corpus": corpus_info(args.corpus), "runs": runs}
+
+# Raises the replay speed until the pipeline saturates; the last speed it kept up with is the headroom
+def bench_soak(args):
+    steps = []
+    for speed in csv_list(args.speeds, float):
+        print(f"{args.model} at {speed:g}x for {args.seconds:g}s...", file=sys.stderr, flush=True)
+        argv = pipeline_argv(args, args.model, args.rate, args.block) + [
+            "--speed", str(speed), "--seconds", str(args.seconds), "--buffer-seconds", str(args.buffer_seconds),
+            "--max-lag", str(args.max_lag), "--max-lag-growth", str(args.max_lag_growth), "--max-translation-backlog", str(args.max_translation_backlog)]
+        steps.append(run_child("soak-step", argv))
+        if steps[-1].get("saturated", True) and not args.all: break
+    kept_up = [s for s in steps if s.get("saturated") is False]
+    growth = [s["rss_growth_mb_per_minute"] for s in kept_up if s.get("rss_growth_mb_per_minute") is not None]
+    return {"benchmark": "soak", "info": run_info(), "corpus": corpus_info(args.corpus), "steps": steps,
+            "sustainable_speed": max((s["speed"] for s in kept_up), default=None),
+            "saturation_speed": min((s["speed"] for s in steps if s.get("saturated")), default=None),
+            "rss_growth_mb_per_minute": max(growth) if growth else None,
+            "memory_growth": bool(growth) and max(growth) > args.max_growth}
+
+# Metric changes between two "run" results, per model/configuration present in both
+COMPARED = {"rtf": ("rtf",), "wer": ("wer",), "false_words": ("false_words",), "cpu_per_audio_second": ("cpu_per_audio_second",),
+            "peak_rss_mb": ("peak_rss_mb",), "model_load_seconds": ("model_load_seconds",),
+            "final_p90": ("latency", "final", "p90"), "translate_p90": ("latency", "translate", "p90"),
+            "end_to_end_p90": ("latency", "end_to_end", "p90")}
+
+def bench_compare(args):
+    loaded = []
+    for path in (args.before, args.after):
+        with open(path, encoding="utf-8") as f: loaded.append(json.load(f))
+    before, after = ({(r["model"], r["rate"], r["block"], r.get("vad")): r for r in data.get("runs", []) if "error" not in r} for data in loaded)
+    def pick(run, keys):
+        for key in keys: run = run.get(key) if isinstance(run, dict) else None
+        return run
+    changes = []
+    for key in before.keys() & after.keys():
+        metrics = {}
+        for name, keys in COMPARED.items():
+            a, b = pick(before[key], keys), pick(after[key], keys)
+            if a is None or b is None: continue
+            metrics[name] = {"before": a, "after": b, "change": round((b - a) / a, 4) if a else None}
+        changes.append({"model": key[0], "rate": key[1], "block": key[2], "vad": key[3], "metrics": metrics})
+    same_corpus = loaded[0].get("corpus", {}).get("sha256") == loaded[1].get("corpus", {}).get("sha256")
+    return {"benchmark": "compare", "same_corpus": same_corpus, "configurations": sorted(changes, key=lambda c: (c["model"], c["rate"], c["block"]))}
+
+def add_pipeline_args(p):
+    p.add_argument("--translate-delay", type=float, default=0.05, help="Seconds the fake translator takes per request")
+    p.add_argument("--translate-per-char", type=float, default=0.0, help="Extra fake translation seconds per character")
+    p.add_argument("--target-langs", default="fa", help="Comma-separated languages every sentence is translated into (one fake service each)")
+    p.add_argument("--no-translate", action="store_true", help="Leave the translation stage out")
+    p.add_argument("--vad", action="store_true", help="Gate the audio by voice activity instead of decoding all of it")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks for the translator pipeline")
+    parser.add_argument("--output", help="Write the JSON result to this file instead of stdout")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("frontend", help="Downmix/resample speed and recognizer CPU at native vs 16 kHz")
+    p.add_argument("input", help="16-bit PCM WAV file")
+    p.add_argument("--model", help="small, medium, large or a model path (skips the recognizer run if omitted)")
+    p.add_argument("--target-rate", type=int, default=16000)
+    p.set_defaults(func=bench_frontend)
+
+    p = sub.add_parser("make-corpus", help="Write deterministic music and silence clips into a corpus folder")
+    p.add_argument("folder")
+    p.add_argument("--seconds", type=float, default=20)
+    p.add_argument("--seed", type=int, default=1)
+    p.set_defaults(func=bench_make_corpus)
+
+    p = sub.add_parser("run", help="Replay the corpus through every model and configuration: RTF, latency, CPU, peak RSS, WER")
+    p.add_argument("corpus", help="Folder of WAV clips with optional .txt transcripts")
+    p.add_argument("--models", default="small", help="Comma-separated: small, medium, large or model paths")
+    p.add_argument("--rates", default="16000", help="Comma-separated recognizer sample rates")
+    p.add_argument("--blocks", default="1600", help="Comma-separated frames per AcceptWaveform call")
+    p.add_argument("--clips", action="store_true", help="Include per-clip results and transcripts")
+    add_pipeline_args(p)
+    p.set_defaults(func=bench_run)
+
+    p = sub.add_parser("soak", help="Replay the corpus live at rising multiples of real time until the pipeline saturates")
+    p.add_argument("corpus")
+    p.add_argument("--model", default="small")
+    p.add_argument("--rate", type=int, default=16000)
+    p.add_argument("--block", type=int, default=1600)
+    p.add_argument("--speeds", default="1,2,4,8,16", help="Comma-separated multiples of real time, tried in order")
+    p.add_argument("--seconds", type=float, default=60, help="Wall seconds per speed")
+    p.add_argument("--all", action="store_true", help="Keep going after the first saturated speed")
+    p.add_argument("--buffer-seconds", type=float, default=10)
+    p.add_argument("--max-lag", type=float, default=2.0, help="Recognizer lag (s) that counts as saturated")
+    p.add_argument("--max-lag-growth", type=float, default=0.02, help="Lag growth (s per s) that counts as saturated")
+    p.add_argument("--max-translation-backlog", type=int, default=20, help="Queued sentences that count as saturated")
+    p.add_argument("--max-growth", type=float, default=1.0, help="RSS growth (MB per minute) reported as a leak")
+    add_pipeline_args(p)
+    p.set_defaults(func=bench_soak)
+
+    p = sub.add_parser("compare", help="Metric changes between two 'run' results")
+    p.add_argument("before")
+    p.add_argument("after")
+    p.set_defaults(func=bench_compare)
+
+    # One configuration in this process; "run" and "soak" start these in fresh interpreters
+    for name, func in (("replay", bench_replay), ("soak-step", bench_soak_step)):
+        p = sub.add_parser(name, help=argparse.SUPPRESS)
+        p.add_argument("corpus")
+        p.add_argument("--model", default="small")
+        p.add_argument("--rate", type=int, default=16000)
+        p.add_argument("--block", type=int, default=1600)
+        p.add_argument("--speed", type=float, default=1.0)
+        p.add_argument("--seconds", type=float, default=60)
+        p.add_argument("--buffer-seconds", type=float, default=10)
+        p.add_argument("--max-lag", type=float, default=2.0)
+        p.add_argument("--max-lag-growth", type=float, default=0.02)
+        p.add_argument("--max-translation-backlog", type=int, default=20)
+        add_pipeline_args(p)
+        p.set_defaults(func=func)
+
+    args = parser.parse_args()
+    result = args.func(args)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+    else:
+        json.dump(result, sys.stdout, indent=2, ensure_ascii=False)
+        print()
+
+if __name__ == "__main__":
+    main()
@@ -27,7 +27,7 @@ echo ========================================================
 rem --noconsole: مخفی کردن صفحه سیاه CMD
 rem --collect-all vosk: اضافه کردن کتابخانه های ضروری
 rem --add-data: اضافه کردن مدل کوچک داخل فایل
-pyinstaller --noconsole --onefile --name "VoiceTranslator" --add-data "bundled_model;bundled_model" --collect-all vosk main.py
+pyinstaller --noconsole --onefile --name "VoiceTranslator" --add-data "bundled_model;bundled_model" --add-data "phrases_fa.tsv;." --collect-all vosk main.py
 
 echo.
 echo ========================================================
@@ -0,0 +1,548 @@
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import os
+import socket
+import sys
+import threading
+import time
+from collections import deque
+from urllib.parse import urlparse
+
+log = logging.getLogger("translator")
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+KEEPALIVE_SECONDS = 15
+FANOUT_SLICE = 16  # subscribers served per loop turn; between turns other threads get the GIL back
+# gui_queue kinds that are captions are <type>_<lang>; everything else (lag, stats, ...) stays local
+CAPTION_TYPES = {"partial", "segment", "final"}
+
+# Local caption feed for OBS browser sources, second screens and phones on the LAN:
+#   GET /        caption page (?lang=all or a list such as en,fa&lines=2&source=label)
+#   GET /ws      WebSocket
+#   GET /events  Server-Sent Events (resumes from Last-Event-ID while it is still in the history)
+#   GET /stats   counters as JSON
+# Every message is JSON: {"seq", "ts", "type": partial|segment|final, "lang": en|fa|..., "source"?, "text"}.
+# Partials are deltas: the new text is the previous partial's first `keep` characters + `text`
+# (keep 0 means the full text). A client only gets a delta on top of the partial it was sent last,
+# otherwise the full text. A segment extends the current line; a final closes it (an empty final only
+# closes a line built from segments).
+
+def ws_frame(payload, opcode=0x1):
+    n = len(payload)
+    if n < 126: header = bytes([0x80 | opcode, n])
+    elif n < 65536: header = bytes([0x80 | opcode, 126]) + n.to_bytes(2, "big")
+    else: header = bytes([0x80 | opcode, 127]) + n.to_bytes(8, "big")
+    return header + payload
+
+def encode(message):
+    data = json.dumps(message, ensure_ascii=False, separators=(",", ":"))
+    return ws_frame(data.encode("utf-8")), f"id: {message['seq']}\ndata: {data}\n\n".encode("utf-8")
+
+# A published message, encoded once for every subscriber. Partials carry a delta and a full
+# variant; `base` is the seq of the partial the delta applies to.
+class Event:
+    __slots__ = ("seq", "key", "partial", "base", "delta", "full")
+
+    def __init__(self, seq, key, partial, base, delta, full):
+        self.seq, self.key, self.partial, self.base, self.delta, self.full = seq, key, partial, base, delta, full
+
+# --- SUBSCRIBER ---
+# Frames go straight to the socket while it keeps up. Once it backs up they wait in a bounded queue
+# for the subscriber's own writer task, so a slow one only ever delays itself. When the queue fills
+# up, its queued partials are dropped (a newer partial or final supersedes them anyway) and it gets
+# full text again; if finals alone fill it, it is disconnected as a slow consumer.
+class Subscriber:
+    def __init__(self, server, writer, protocol, limit):
+        self.server = server
+        self.writer = writer
+        self.protocol = protocol  # 0 WebSocket, 1 SSE: index into the encoded frames
+        self.limit = limit
+        self.queue = deque()  # (frame, is_partial)
+        self.ready = asyncio.Event()
+        self.partial_seq = {}  # (source, lang) -> seq of the last partial queued for it
+        self.closed = False
+        self.sent = 0
+        self.dropped = 0
+
+    def offer(self, event):
+        if self.closed: return
+        if len(self.queue) >= self.limit:
+            kept = deque(item for item in self.queue if not item[1])
+            self.dropped += len(self.queue) - len(kept)
+            self.server.dropped += len(self.queue) - len(kept)
+            self.queue = kept
+            self.partial_seq.clear()
+            if len(self.queue) >= self.limit:
+                self.server.slow_disconnects += 1
+                self.close()
+                return
+        if event.partial:
+            frames = event.delta if event.base is not None and self.partial_seq.get(event.key) == event.base else event.full
+            self.partial_seq[event.key] = event.seq
+        else:
+            frames = event.full
+            self.partial_seq.pop(event.key, None)
+        if not self.queue and not self.writer.transport.get_write_buffer_size():
+            self.writer.write(frames[self.protocol])
+            self.sent += 1
+            return
+        self.queue.append((frames[self.protocol], event.partial))
+        self.ready.set()
+
+    async def pump(self):
+        keepalive = ws_frame(b"", 0x9) if self.protocol == 0 else b": ping\n\n"
+        try:
+            while not self.closed:
+                if not self.queue:
+                    self.ready.clear()
+                    try:
+                        await asyncio.wait_for(self.ready.wait(), KEEPALIVE_SECONDS)
+                    except asyncio.TimeoutError:
+                        self.writer.write(keepalive)
+                        await self.writer.drain()
+                    continue
+                while self.queue:
+                    self.writer.write(self.queue.popleft()[0])
+                    self.sent += 1
+                await self.writer.drain()
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            self.close()
+
+    def close(self):
+        if self.closed: return
+        self.closed = True
+        self.ready.set()
+        self.server.clients = self.server.clients - {self}
+        self.server.sent += self.sent
+        self.writer.close()
+
+# --- SERVER ---
+# Runs its own asyncio loop in a background thread. publish() is safe to call from any thread and only
+# appends to a deque (one loop wakeup per burst). The loop shares the GIL with the recognizer and the
+# overlay, so it hands each event to at most FANOUT_SLICE subscribers per turn and then yields;
+# a caller waits at most one slice (fanout_ms_p99 in stats()), not a whole fan-out.
+class CaptionServer:
+    def __init__(self, host="127.0.0.1", port=8765, buffer_size=256, history=20):
+        self.host = host
+        self.port = port
+        self.buffer_size = buffer_size
+        self.history = deque(maxlen=history)  # recent segments/finals, replayed to new subscribers
+        self.partials = {}  # (source, lang) -> current partial Event
+        self.partial_texts = {}
+        self.inbox = deque()
+        self.wakeup_pending = False
+        self.clients = frozenset()  # replaced, never changed in place, so other threads can read it
+        self.seq = 0
+        self.sent = 0
+        self.dropped = 0
+        self.slow_disconnects = 0
+        self.connections = 0
+        self.fanning = None  # (event, subscribers that still have to be offered it)
+        self.fanout_seconds = deque(maxlen=1000)  # per slice
+        self.loop = None
+        self.started = threading.Event()
+        self.error = None
+
+    def start(self):
+        threading.Thread(target=self.run, name="caption-server", daemon=True).start()
+        self.started.wait(10)
+        if self.error: raise self.error
+        return self
+
+    def run(self):
+        loop = asyncio.new_event_loop()
+        try:
+            server = loop.run_until_complete(asyncio.start_server(self.handle, self.host, self.port, limit=16384, backlog=1024))
+        except OSError as e:
+            self.error = e
+            self.started.set()
+            return
+        self.port = server.sockets[0].getsockname()[1]
+        self.loop = loop
+        self.started.set()
+        log.info("Caption server on http://%s:%d/", self.host, self.port)
+        loop.run_forever()
+
+    def stop(self):
+        if self.loop: self.loop.call_soon_threadsafe(self.loop.stop)
+
+    # msg: a gui_queue message, ("final_fa", text) or ("final_fa", text, source)
+    def publish(self, msg):
+        if self.loop is None or msg[0].partition("_")[0] not in CAPTION_TYPES: return
+        self.inbox.append((time.time(), msg))
+        if not self.wakeup_pending:
+            self.wakeup_pending = True
+            self.loop.call_soon_threadsafe(self.drain)
+
+    # One slice of the fan-out; events still reach every subscriber in order
+    def drain(self):
+        started = time.perf_counter()
+        budget = FANOUT_SLICE
+        while budget > 0:
+            if self.fanning is None:
+                if not self.inbox: break
+                event = self.make_event(*self.inbox.popleft())
+                if event is not None: self.fanning = (event, list(self.clients))
+                continue
+            event, pending = self.fanning
+            batch = pending[-budget:]
+            del pending[-budget:]
+            for client in batch: client.offer(event)
+            budget -= len(batch)
+            if not pending: self.fanning = None
+        self.fanout_seconds.append(time.perf_counter() - started)
+        if self.fanning is not None or self.inbox:
+            self.loop.call_soon(self.drain)
+            return
+        self.wakeup_pending = False
+        # A publish() that saw wakeup_pending just before it was cleared did not schedule a drain
+        if self.inbox and not self.wakeup_pending:
+            self.wakeup_pending = True
+            self.loop.call_soon(self.drain)
+
+    def make_event(self, ts, msg):
+        kind, payload = msg[0], msg[1]
+        source = msg[2] if len(msg) > 2 else None
+        if isinstance(payload, tuple): payload = payload[1]  # early translation: (utterance, text)
+        kind, _, lang = kind.partition("_")
+        key = (source, lang)
+        message = {"seq": self.seq + 1, "ts": round(ts, 3), "type": kind, "lang": lang, "text": payload}
+        if source is not None: message["source"] = source
+        if kind == "partial":
+            previous = self.partial_texts.get(key, "")
+            if payload == previous: return None
+            self.seq += 1
+            keep = len(os.path.commonprefix([previous, payload]))
+            full = encode(dict(message, keep=0))
+            delta = encode(dict(message, keep=keep, text=payload[keep:])) if keep else full
+            base = self.partials[key].seq if key in self.partials else None
+            event = Event(self.seq, key, True, base, delta, full)
+            self.partials[key] = event
+            self.partial_texts[key] = payload
+            return event
+        self.seq += 1
+        # The page drops the partial on a segment too, so the next one must not be a delta against it
+        if kind in ("final", "segment"):
+            self.partials.pop(key, None)
+            self.partial_texts.pop(key, None)
+        frames = encode(message)
+        event = Event(self.seq, key if kind in ("final", "segment") else None, False, None, frames, frames)
+        self.history.append(event)
+        return event
+
+    async def handle(self, reader, writer):
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), 10)
+            lines = head.decode("latin-1").split("\r\n")
+            method, target, _ = lines[0].split(" ", 2)
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError, ValueError):
+            writer.close()
+            return
+        headers = {k.strip().lower(): v.strip() for k, v in (line.split(":", 1) for line in lines[1:] if ":" in line)}
+        path = urlparse(target).path
+        if method != "GET":
+            self.respond(writer, "405 Method Not Allowed", "text/plain", b"GET only")
+        elif path == "/ws" and headers.get("upgrade", "").lower() == "websocket" and "sec-websocket-key" in headers:
+            accept = base64.b64encode(hashlib.sha1((headers["sec-websocket-key"] + WS_GUID).encode()).digest()).decode()
+            writer.write(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                          f"Sec-WebSocket-Accept: {accept}\r\n\r\n").encode())
+            await self.subscribe(reader, writer, 0, None)
+        elif path == "/events":
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream; charset=utf-8\r\nCache-Control: no-cache\r\n"
+                         b"Connection: keep-alive\r\nAccess-Control-Allow-Origin: *\r\n\r\nretry: 2000\n\n")
+            last = headers.get("last-event-id", "")
+            await self.subscribe(reader, writer, 1, int(last) if last.isdigit() else None)
+        elif path == "/":
+            self.respond(writer, "200 OK", "text/html; charset=utf-8", PAGE.encode("utf-8"))
+        elif path == "/stats":
+            self.respond(writer, "200 OK", "application/json", json.dumps(self.stats()).encode())
+        else:
+            self.respond(writer, "404 Not Found", "text/plain", b"not found")
+
+    def respond(self, writer, status, content_type, body):
+        writer.write(f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\nContent-Length: {len(body)}\r\n"
+                     f"Access-Control-Allow-Origin: *\r\nConnection: close\r\n\r\n".encode() + body)
+        writer.close()
+
+    async def subscribe(self, reader, writer, protocol, last_seq):
+        # Keep what the kernel and the transport hold for one subscriber small, so a stalled one
+        # shows up in its own queue instead of in our memory
+        writer.get_extra_info("socket").setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 16 * 1024)
+        writer.transport.set_write_buffer_limits(high=16 * 1024)
+        client = Subscriber(self, writer, protocol, self.buffer_size)
+        self.connections += 1
+        # Catch up: recent lines (or what was missed since Last-Event-ID), then the current partials
+        for event in self.history:
+            if last_seq is None or event.seq > last_seq: client.offer(event)
+        for event in self.partials.values(): client.offer(event)
+        self.clients = self.clients | {client}
+        pump = asyncio.ensure_future(client.pump())
+        try:
+            if protocol == 0: await self.read_ws(reader, writer)
+            else: await reader.read()  # SSE clients send nothing; this returns when they hang up
+        except (asyncio.IncompleteReadError, ConnectionError, OSError):
+            pass
+        finally:
+            client.close()
+            pump.cancel()
+
+    # Answers pings and close frames; subscribers have nothing else to say
+    async def read_ws(self, reader, writer):
+        while True:
+            head = await reader.readexactly(2)
+            opcode, length = head[0] & 0x0F, head[1] & 0x7F
+            if length == 126: length = int.from_bytes(await reader.readexactly(2), "big")
+            elif length == 127: length = int.from_bytes(await reader.readexactly(8), "big")
+            if length > 65536: return
+            mask = await reader.readexactly(4) if head[1] & 0x80 else None
+            data = await reader.readexactly(length)
+            if mask: data = bytes(b ^ mask[i % 4] for i, b in enumerate(data))
+            if opcode == 0x8:
+                writer.write(ws_frame(data[:2], 0x8))
+                return
+            if opcode == 0x9: writer.write(ws_frame(data, 0xA))
+
+    def stats(self):
+        clients = self.clients
+        fanout = sorted(self.fanout_seconds)
+        return {
+            "clients": len(clients),
+            "websocket_clients": sum(1 for c in clients if c.protocol == 0),
+            "sse_clients": sum(1 for c in clients if c.protocol == 1),
+            "connections": self.connections,
+            "messages": self.seq,
+            "frames_sent": self.sent + sum(c.sent for c in clients),
+            "partials_dropped": self.dropped,
+            "slow_disconnects": self.slow_disconnects,
+            "queued_max": max((len(c.queue) for c in clients), default=0),
+            "fanout_ms_p99": round(fanout[min(len(fanout) - 1, int(len(fanout) * 0.99))] * 1000, 3) if fanout else None,
+        }
+
+# --- CAPTION PAGE ---
+# Transparent background and outlined text, so it can be used directly as an OBS browser source
+PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><meta name="viewport" content="width=device-width, initial-scale=1">
+<title>Captions</title>
+<style>
+body { margin: 0; background: transparent; color: #fff; font: 28px Tahoma, "Vazirmatn", sans-serif;
+       text-shadow: 0 0 4px #000, 0 0 2px #000; position: absolute; bottom: 0; left: 0; right: 0; padding: 12px; }
+.line { margin: 4px 0; }
+.line:not(.en) { color: #ffd54f; }
+.rtl { direction: rtl; text-align: right; }
+.partial { opacity: 0.7; }
+</style></head><body><div id="captions"></div>
+<script>
+const params = new URLSearchParams(location.search);
+const wanted = params.get("lang") || "all";
+const every = wanted === "all" || wanted === "both";
+const langs = every ? [] : wanted.split(",");
+const maxLines = parseInt(params.get("lines") || "2");
+const onlySource = params.get("source");
+const RTL = ["fa", "ar", "he", "ur", "ps"];
+// Finished lines are kept per language; the open line and partial per stream and language,
+// because the server sends each stream's partials as deltas against that stream's last one
+const lines = {}, open = {}, partial = {};
+function track(lang, key) {
+  if (!(key in open)) { open[key] = ""; partial[key] = ""; }
+  if (lang in lines) return;
+  lines[lang] = [];
+  if (every) langs.push(lang);
+}
+function render() {
+  const root = document.getElementById("captions");
+  root.innerHTML = "";
+  for (const lang of langs) {
+    if (!(lang in lines)) continue;
+    const current = Object.keys(open).filter(key => key.endsWith("|" + lang))
+      .map(key => (open[key] + " " + partial[key]).trim()).filter(text => text);
+    const shown = lines[lang].concat(current).slice(-maxLines);
+    for (const [i, text] of shown.entries()) {
+      const div = document.createElement("div");
+      div.className = "line " + lang + (RTL.includes(lang) ? " rtl" : "") + (i >= shown.length - current.length ? " partial" : "");
+      div.textContent = text;
+      root.appendChild(div);
+    }
+  }
+}
+function apply(m) {
+  if (onlySource && m.source !== onlySource) return;
+  const key = (m.source || "") + "|" + m.lang;
+  track(m.lang, key);
+  if (m.type === "partial") partial[key] = partial[key].slice(0, m.keep) + m.text;
+  else if (m.type === "segment") { open[key] = (open[key] + " " + m.text).trim(); partial[key] = ""; }
+  else {
+    const text = (open[key] + " " + m.text).trim();
+    if (text) lines[m.lang].push(text);
+    lines[m.lang] = lines[m.lang].slice(-20);
+    open[key] = ""; partial[key] = "";
+  }
+  render();
+}
+function connect() {
+  if (!window.WebSocket) { new EventSource("/events").onmessage = e => apply(JSON.parse(e.data)); return; }
+  const ws = new WebSocket((location.protocol === "https:" ? "wss://" : "ws://") + location.host + "/ws");
+  ws.onmessage = e => apply(JSON.parse(e.data));
+  ws.onclose = () => setTimeout(connect, 2000);
+}
+connect();
+</script></body></html>
+"""
+
+# --- DEMO AND LOAD TEST ---
+DEMO_SENTENCES = [
+    "today we are going to look at how the recognizer turns audio into words",
+    "every partial result is sent to the subscribers as a small delta",
+    "a slow client only loses its own partial updates and never slows the others",
+    "the final sentence and its translation replace the partial text",
+]
+
+# Publishes made-up captions at about `rate` words per second, timing every publish() call
+# (the part the recognizer and the overlay would pay)
+def demo_publisher(server, rate, costs):
+    while True:
+        for sentence in DEMO_SENTENCES:
+            words = sentence.split()
+            # The first half is committed as a segment, like the recognizer does with long sentences
+            half = len(words) // 2
+            for chunk, last in ((words[:half], "segment_en"), (words[half:], "final_en")):
+                for i in range(1, len(chunk) + 1):
+                    started = time.perf_counter()
+                    server.publish(("partial_en", " ".join(chunk[:i])))
+                    costs.append(time.perf_counter() - started)
+                    time.sleep(1.0 / rate)
+                server.publish((last, " ".join(chunk)))
+            server.publish(("final_fa", "[fa] " + sentence))
+
+# Stands in for the recognizer thread: sleeps 1 ms at a time and records how late it wakes up, which
+# includes waiting for the GIL while the server's loop is fanning out
+def stall_probe(lateness):
+    while True:
+        started = time.perf_counter()
+        time.sleep(0.001)
+        lateness.append(time.perf_counter() - started - 0.001)
+
+def serve(args):
+    server = CaptionServer(args.host, args.port, args.buffer, args.history).start()
+    costs = deque(maxlen=10000)
+    lateness = deque(maxlen=5000)  # about the last 5 seconds
+    if args.demo_rate: threading.Thread(target=demo_publisher, args=(server, args.demo_rate, costs), daemon=True).start()
+    threading.Thread(target=stall_probe, args=(lateness,), daemon=True).start()
+    started = time.time()
+    last_wall, last_cpu = started, time.process_time()
+    while not args.seconds or time.time() - started < args.seconds:
+        time.sleep(min(5.0, args.seconds or 5.0))
+        stats = server.stats()
+        now, cpu = time.time(), time.process_time()
+        stats["cpu_percent"] = round(100 * (cpu - last_cpu) / (now - last_wall), 1)
+        last_wall, last_cpu = now, cpu
+        if costs:
+            ordered = sorted(costs)
+            stats["publish_us_p99"] = round(ordered[int(len(ordered) * 0.99)] * 1e6, 1)
+        if lateness:
+            ordered = sorted(lateness)
+            stats["stall_ms_p99"], stats["stall_ms_max"] = round(ordered[int(len(ordered) * 0.99)] * 1e3, 2), round(ordered[-1] * 1e3, 2)
+        print(json.dumps(stats), flush=True)
+    return 0
+
+async def load_client(host, port, protocol, slow, seconds, results):
+    received, delays, text = 0, [], {}
+    try:
+        sock = socket.socket()
+        # A slow reader with a tiny receive window, so the server notices it quickly
+        if slow: sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+        sock.setblocking(False)
+        await asyncio.get_running_loop().sock_connect(sock, (host, port))
+        # StreamReader buffers up to twice its limit before it stops reading the socket
+        reader, writer = await asyncio.open_connection(sock=sock, limit=4096 if slow else 1 << 20)
+        if protocol == "ws":
+            key = base64.b64encode(os.urandom(16)).decode()
+            writer.write(f"GET /ws HTTP/1.1\r\nHost: {host}\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                         f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n".encode())
+        else:
+            writer.write(f"GET /events HTTP/1.1\r\nHost: {host}\r\nAccept: text/event-stream\r\n\r\n".encode())
+        await reader.readuntil(b"\r\n\r\n")
+        deadline = time.time() + seconds
+        while time.time() < deadline:
+            if slow: await asyncio.sleep(slow)
+            if protocol == "ws":
+                head = await asyncio.wait_for(reader.readexactly(2), deadline - time.time())
+                length = head[1] & 0x7F
+                if length == 126: length = int.from_bytes(await reader.readexactly(2), "big")
+                elif length == 127: length = int.from_bytes(await reader.readexactly(8), "big")
+                data = await reader.readexactly(length)
+                if head[0] & 0x0F != 0x1: continue
+            else:
+                line = await asyncio.wait_for(reader.readline(), deadline - time.time())
+                if not line: break
+                if not line.startswith(b"data: "): continue
+                data = line[6:]
+            message = json.loads(data)
+            received += 1
+            delays.append(time.time() - message["ts"])
+            # Check the deltas: keep must never point past the text we have. Like the page, the
+            # partial text is dropped on a segment or final
+            key = (message.get("source"), message["lang"])
+            if message["type"] == "partial":
+                if message["keep"] > len(text.get(key, "")): results["bad_deltas"] += 1
+                text[key] = text.get(key, "")[:message["keep"]] + message["text"]
+            else:
+                text.pop(key, None)
+        writer.close()
+    except asyncio.TimeoutError:
+        pass
+    except (asyncio.IncompleteReadError, ConnectionError, OSError):
+        results["disconnected"] += 1
+    results["received"].append(received)
+    results["delays"].extend(delays)
+
+async def load_test(args):
+    url = urlparse(args.url)
+    results = {"received": [], "delays": [], "disconnected": 0, "bad_deltas": 0}
+    tasks = []
+    for i in range(args.clients):
+        protocol = "sse" if i < args.clients * args.sse_share else "ws"
+        slow = args.slow_delay if i >= args.clients - args.slow else 0
+        tasks.append(load_client(url.hostname, url.port or 80, protocol, slow, args.seconds, results))
+    await asyncio.gather(*tasks)
+    return results
+
+def loadtest(args):
+    results = asyncio.run(load_test(args))
+    delays = sorted(results["delays"])
+    pick = lambda q: round(delays[min(len(delays) - 1, int(len(delays) * q))] * 1000, 1) if delays else None
+    received = results["received"]
+    print(json.dumps({"clients": args.clients, "slow_clients": args.slow, "messages": sum(received),
+                      "per_client_min": min(received, default=0), "per_client_max": max(received, default=0),
+                      "delay_ms_p50": pick(0.5), "delay_ms_p99": pick(0.99), "delay_ms_max": pick(1.0),
+                      "disconnected": results["disconnected"], "bad_deltas": results["bad_deltas"]}))
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Caption broadcast server (demo mode) and its load-test client")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("serve", help="Run the server on its own, optionally with made-up captions")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--buffer", type=int, default=256, help="Messages queued per subscriber")
+    p.add_argument("--history", type=int, default=20, help="Lines replayed to new subscribers")
+    p.add_argument("--demo-rate", type=float, default=0, help="Publish made-up captions at this many words per second")
+    p.add_argument("--seconds", type=float, default=0, help="Stop after this long (default: run until interrupted)")
+    p = sub.add_parser("loadtest", help="Connect many subscribers and report what they received")
+    p.add_argument("--url", default="http://127.0.0.1:8765")
+    p.add_argument("--clients", type=int, default=300)
+    p.add_argument("--sse-share", type=float, default=0.5, help="Fraction of clients using SSE instead of WebSocket")
+    p.add_argument("--slow", type=int, default=0, help="How many of the clients read slowly")
+    p.add_argument("--slow-delay", type=float, default=0.5, help="Seconds a slow client waits before each read")
+    p.add_argument("--seconds", type=float, default=20)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    return serve(args) if args.command == "serve" else loadtest(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+import bisect
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# Per-stage latency of the caption pipeline. Each utterance carries a trace dict of wall-clock
+# timestamps (time.time(), so they compare across the recognizer process too):
+#   audio_start, audio_end  capture time of its first and last decoded audio
+#   partial, final          first partial result, final result
+#   translating, translated translation request started / answered
+#   delivered, rendered     handed to the overlay / drawn (printed in headless mode)
+# With several target languages every language gets its own copy of the trace from the fan-out,
+# tagged with "lang"; its translation stages are then also kept as "<stage>.<lang>".
+
+STAGES = {
+    "backlog": "audio waiting in the ring buffer before the recognizer reads it",
+    "decode": "AcceptWaveform time per block",
+    "first_partial": "speech start to the first partial result",
+    "final": "end of speech to the final result",
+    "translate_wait": "final result to the translation request",
+    "translate": "translation request to response (cache hits included)",
+    "deliver": "response to hand-off, waiting for earlier sentences",
+    "render": "hand-off to on-screen render",
+    "end_to_end": "end of speech to the translation on screen",
+}
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Percentiles over the last `window` seconds, plus all-time buckets for Prometheus
+class StageHistogram:
+    def __init__(self, window):
+        self.window = window
+        self.samples = deque()  # (time, seconds)
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds, now):
+        self.samples.append((now, seconds))
+        self.buckets[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.trim(now)
+
+    def trim(self, now):
+        while self.samples and now - self.samples[0][0] > self.window: self.samples.popleft()
+
+    def summary(self, now):
+        self.trim(now)
+        if not self.samples: return None
+        values = sorted(seconds for _, seconds in self.samples)
+        pick = lambda p: round(values[min(len(values) - 1, int(p * len(values)))], 4)
+        return {"count": len(values), "p50": pick(0.5), "p90": pick(0.9), "p99": pick(0.99), "max": round(values[-1], 4)}
+
+class LatencyTracker:
+    def __init__(self, window=60.0):
+        self.lock = threading.Lock()
+        self.window = window
+        self.stages = {name: StageHistogram(window) for name in STAGES}
+        self.pending = {}  # (source, lang) -> traces handed to the overlay, in delivery order
+
+    def observe(self, stage, seconds):
+        if seconds is None or seconds < 0: return
+        with self.lock:
+            if stage not in self.stages: self.stages[stage] = StageHistogram(self.window)
+            self.stages[stage].observe(seconds, time.time())
+
+    # Observes trace[end] - trace[start] once both are known
+    def span(self, stage, trace, start, end):
+        if start in trace and end in trace:
+            self.observe(stage, trace[end] - trace[start])
+            if "lang" in trace: self.observe(f"{stage}.{trace['lang']}", trace[end] - trace[start])
+
+    def delivered(self, trace, source=None):
+        trace["delivered"] = time.time()
+        self.span("deliver", trace, "translated", "delivered")
+        with self.lock:
+            self.pending.setdefault((source, trace.get("lang")), deque()).append(trace)
+
+    # Translations reach the screen in delivery order, so the oldest pending trace is the one drawn
+    def rendered(self, source=None, lang=None):
+        with self.lock:
+            pending = self.pending.get((source, lang)) or self.pending.get((source, None))
+            trace = pending.popleft() if pending else None
+        if trace is None: return
+        trace["rendered"] = time.time()
+        self.span("render", trace, "delivered", "rendered")
+        self.span("end_to_end", trace, "audio_end", "rendered")
+
+    def snapshot(self):
+        now = time.time()
+        with self.lock:
+            summaries = {name: hist.summary(now) for name, hist in self.stages.items()}
+        return {name: summary for name, summary in summaries.items() if summary}
+
+    def prometheus(self, metric="translator_stage_latency_seconds"):
+        lines = [f"# HELP {metric} Caption pipeline latency per stage", f"# TYPE {metric} histogram"]
+        with self.lock:
+            for name, hist in self.stages.items():
+                stage, _, lang = name.partition(".")
+                labels = f'stage="{stage}",lang="{lang}"' if lang else f'stage="{stage}"'
+                cumulative = 0
+                for bound, n in zip(BUCKETS + (None,), hist.buckets):
+                    cumulative += n
+                    lines.append(f'{metric}_bucket{{{labels},le="{"+Inf" if bound is None else bound}"}} {cumulative}')
+                lines.append(f'{metric}_sum{{{labels}}} {hist.sum:.6f}')
+                lines.append(f'{metric}_count{{{labels}}} {hist.count}')
+        return "\n".join(lines) + "\n"
+
+# Appends a snapshot line to jsonl_path and rewrites prom_path (for a node_exporter textfile
+# collector or any scraper) every `interval` seconds
+def export_loop(tracker, interval, jsonl_path=None, prom_path=None):
+    while True:
+        time.sleep(interval)
+        if jsonl_path:
+            with open(jsonl_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"time": round(time.time(), 3), "stages": tracker.snapshot()}) + "\n")
+        if prom_path:
+            with open(prom_path + ".tmp", "w", encoding="utf-8") as f: f.write(tracker.prometheus())
+            os.replace(prom_path + ".tmp", prom_path)
+
+def start_export(tracker, interval, jsonl_path=None, prom_path=None):
+    if jsonl_path or prom_path:
+        threading.Thread(target=export_loop, args=(tracker, interval, jsonl_path, prom_path), daemon=True).start()
+
+# One line for the overlay HUD
+def hud_text(snapshot):
+    parts = []
+    for stage, label in (("end_to_end", "e2e"), ("final", "final"), ("translate", "translate"), ("render", "render"), ("backlog", "backlog")):
+        if stage in snapshot:
+            parts.append(f"{label} {snapshot[stage]['p50']:.2f}/{snapshot[stage]['p90']:.2f}s")
+    return "p50/p90  " + "  ".join(parts) if parts else ""
@@ -1,16 +1,29 @@
+import time
+LAUNCHED = time.perf_counter()  # before the other imports, so the startup report includes them
 import os
 import sys
 import queue
-import sounddevice as sd
-import vosk
+import argparse
+import wave
 import json
+import logging
 import threading
+import contextlib
+import multiprocessing
 import tkinter as tk
 from tkinter import font, ttk, messagebox
-from deep_translator import GoogleTranslator
+from concurrent.futures import ThreadPoolExecutor, Future
 from collections import deque
-import time
-import requests
+# vosk, sounddevice, requests and the translator backends are imported on first use
+from audio_frontend import AudioRingBuffer, CaptureFrontend, VoiceActivityGate, OVERFLOW_POLICIES
+from model_service import RemoteRecognizer
+from latency import LatencyTracker, start_export, hud_text
+from transcript import TranscriptWriter
+from caption_server import CaptionServer
+from recognizer_process import SharedAudioRing, RecognizerSupervisor
+from translation import (collect_batch, translate_batch, ThroughputCounter, OrderedDelivery, TranslationCache, FuzzyMemory,
+                         SpeculativeTranslator, GoogleWebTranslator, HttpTranslator, PhraseTableTranslator,
+                         TranslatorChain, UtteranceSegmenter, GOOGLE_TRANSLATE_URL)
 
 # --- CONFIGURATION ---
 MODEL_SMALL_URL = "https://alphacephei.com/vosk/models/vosk-model-small-en-us-0.15.zip"
@@ -20,21 +33,148 @@ MODEL_LARGE_URL = "https://alphacephei.com/vosk/models/vosk-model-en-us-0.22.zip
 BASE_MODELS_DIR = "models"
 BUNDLED_MODEL_DIR = "bundled_model"
 INFO_FILE = "model_info.txt"
+MODEL_MANIFEST_FILE = "model_manifests.json"  # optional {url: manifest} with checksums, see model_download.py
+DOWNLOAD_CONNECTIONS = 4
+
+MODEL_SERVICE_ADDRESS = None  # e.g. "127.0.0.1:2700" to decode in a running model_service.py
+RECOGNIZER_PROCESS = False  # decode in a supervised child process fed through shared memory
+PROFILE_FILE = "profile.json"  # last model, devices and overlay settings, for --quick
+MODEL_TIERS = ["small", "medium", "large"]  # lightest first
+ADAPTIVE_MODEL = True  # step down to a lighter installed model while the recognizer can't keep up
+TIER_CHECK_SECONDS = 5.0  # window over which decode speed and backlog are judged
+TIER_DOWN_LAG_SECONDS = 4.0  # backlog that triggers a lighter model
+TIER_DOWN_RTF = 0.95  # decode time per second of audio that triggers a lighter model
+TIER_UP_RTF = 0.35  # the lighter model must be at least this far ahead...
+TIER_UP_SECONDS = 120.0  # ...for this long before the heavier model is tried again (doubles if that fails)
+CAPTURE_STREAMS = None  # e.g. ["3=Meeting", "5#0=Left", "5#1=Right"] (device[#channel][=label]) to skip the device selector
+
+BLOCK_SIZE = 4000  # capture block, in frames at the device's native rate
+TARGET_SAMPLERATE = 16000  # Vosk models are trained on 16 kHz audio
+DECODE_BLOCK_SIZE = 1600  # frames handed to AcceptWaveform at a time (100 ms)
+AUDIO_BUFFER_SECONDS = 10
+OVERFLOW_POLICY = "drop_oldest"  # "drop_oldest", "skip_to_live" or "block"
+LAG_WARN_SECONDS = 2.0
+LAG_REPORT_INTERVAL = 1.0
+PARTIAL_MIN_INTERVAL = 0.15  # seconds between PartialResult() calls
+VAD_ENABLED = False  # skip silence and music-only audio (--vad); off until its WER cost is measured with benchmark.py
+VAD_HANGOVER_SECONDS = 0.6
+VAD_PREROLL_SECONDS = 0.3
+SOURCE_LANG = "en"
+TARGET_LANG = "fa"
+TARGET_LANGS = [TARGET_LANG]  # every sentence is translated into each of these; the first one gets early translations
+RTL_LANGS = {"fa", "ar", "he", "ur", "ps"}
+TRANSLATION_CACHE_FILE = "translation_cache.sqlite3"
+TRANSLATION_CACHE_MEMORY = 2000  # sentences kept in RAM
+TRANSLATION_CACHE_DISK = 200000  # sentences kept on disk before the least recently used are evicted
+FUZZY_THRESHOLD = 0.85  # reuse the translation of a stored sentence this similar (word-level); None to turn off
+STATS_LOG_INTERVAL = 60.0
+LATENCY_WINDOW_SECONDS = 60  # percentiles cover this much recent history
+LATENCY_EXPORT_INTERVAL = 10
+LATENCY_JSONL_FILE = None  # e.g. "latency.jsonl": a percentile snapshot appended every interval
+LATENCY_PROM_FILE = None  # e.g. "latency.prom": Prometheus text format, rewritten every interval
+LATENCY_HUD = False  # show stage percentiles on the overlay
+TRANSCRIPT_DIR = None  # e.g. "transcripts": record every sentence and its translation with audio timestamps
+TRANSCRIPT_FORMATS = ["srt", "vtt", "jsonl"]
+TRANSCRIPT_ROTATE_MINUTES = 60  # start a new set of files every this many minutes of audio
+TRANSCRIPT_BUFFER = 1000  # sentences waiting for the disk before new ones are dropped
+TRANSCRIPT_FSYNC_SECONDS = 10.0
+TRANSCRIPT_REORDER_SECONDS = 5.0  # how long sentences wait to be written in time order across streams
+CAPTION_SERVER_PORT = None  # e.g. 8765: captions for browsers and OBS at http://host:port/
+CAPTION_SERVER_HOST = "127.0.0.1"  # "0.0.0.0" to reach it from other devices on the LAN
+CAPTION_CLIENT_BUFFER = 256  # messages waiting per subscriber before its partials are dropped
+CAPTION_HISTORY = 20  # recent lines sent to a subscriber when it connects
+RENDER_INTERVAL_MS = 30  # the overlay checks for new messages this often; those that arrived meanwhile are drawn in one update
+SEGMENT_ENABLED = True  # translate long utterances in chunks instead of waiting for the end of the sentence
+SEGMENT_MAX_SECONDS = 5.0  # latency ceiling: no recognized word waits longer than this to be sent for translation
+SEGMENT_MAX_WORDS = 16
+SEGMENT_MIN_WORDS = 4  # shortest chunk cut at a clause word ("and", "because", "which" ...)
+SEGMENT_PAUSE_SECONDS = 0.5  # an unchanged hypothesis for this long commits everything recognized so far
+SPECULATIVE_TRANSLATION = False  # translate stable parts of partial results before the sentence ends
+SPECULATIVE_DEBOUNCE = 0.6  # minimum seconds between speculative requests
+TRANSLATION_BATCH_SIZE = 8  # sentences sent in one translation request
+TRANSLATION_BATCH_WAIT = 0.05  # seconds to wait for more sentences after the first one
+TRANSLATION_WORKERS = 4  # concurrent translation requests
+TRANSLATOR_BACKENDS = ["google", "phrases"]  # tried in order: "google", "http" (LibreTranslate-style), "phrases" (offline)
+TRANSLATE_HTTP_URL = "http://localhost:5000"
+PHRASE_TABLE_FILE = "phrases_{lang}.tsv"  # offline fallback, one table per target language
+TRANSLATE_TIMEOUT = 10
+TRANSLATE_RETRIES = 2  # extra attempts per backend before failing over
+BREAKER_THRESHOLD = 3  # consecutive failures before a backend is skipped
+BREAKER_RESET_SECONDS = 30
+
+log = logging.getLogger("translator")
+
+# A queue that can wake its consumer (the overlay's Tk loop) as soon as data arrives
+class NotifyingQueue(queue.Queue):
+    def __init__(self):
+        super().__init__()
+        self.listener = None
+
+    def put(self, item, block=True, timeout=None):
+        super().put(item, block, timeout)
+        if self.listener: self.listener()
 
-audio_queue = queue.Queue()
 translation_queue = queue.Queue()
-gui_queue = queue.Queue()
+latency = LatencyTracker(LATENCY_WINDOW_SECONDS)
+gui_queue = NotifyingQueue()
+captions = None  # CaptionServer, when broadcasting
 
-def get_bundled_model_path():
+def get_resource_path(name):
     if getattr(sys, 'frozen', False):
         base_path = sys._MEIPASS
     else:
         base_path = os.path.dirname(os.path.abspath(__file__))
-    return os.path.join(base_path, BUNDLED_MODEL_DIR)
+    return os.path.join(base_path, name)
+
+def get_bundled_model_path():
+    return get_resource_path(BUNDLED_MODEL_DIR)
 
 def get_model_dir(model_type):
     return os.path.join(BASE_MODELS_DIR, model_type)
 
+def find_model_path(model_path):
+    # Model zips extract into a versioned subfolder; return the folder that holds "conf"
+    if not os.path.exists(os.path.join(model_path, "conf")) and os.path.exists(model_path):
+        for d in os.listdir(model_path):
+            if os.path.exists(os.path.join(model_path, d, "conf")):
+                return os.path.join(model_path, d)
+    return model_path
+
+# Models are loaded once per process and shared; loading starts as soon as a model is picked
+model_lock = threading.Lock()
+loaded_models = {}  # resolved model path -> Future
+
+def get_model(model_path):
+    path = find_model_path(model_path)
+    with model_lock:
+        future = loaded_models.get(path)
+        owner = future is None
+        if owner: future = loaded_models[path] = Future()
+    if owner:
+        try:
+            start = time.time()
+            import vosk
+            future.set_result(vosk.Model(path))
+            log.info("Loaded model %s in %.1fs", path, time.time() - start)
+        except Exception as e:
+            future.set_exception(e)
+    return future.result()
+
+def preload_model(model_path):
+    def load():
+        try: get_model(model_path)
+        except Exception as e: log.warning("Preloading %s failed: %s", model_path, e)
+    threading.Thread(target=load, daemon=True).start()
+
+def make_recognizer(model_path, service=MODEL_SERVICE_ADDRESS):
+    if service:
+        try:
+            return RemoteRecognizer(service, os.path.abspath(find_model_path(model_path)), TARGET_SAMPLERATE)
+        except (OSError, RuntimeError) as e:  # RuntimeError: the service answered with an error, e.g. it could not load the model
+            log.warning("Model service %s unavailable (%s), loading the model locally", service, e)
+    import vosk
+    return vosk.KaldiRecognizer(get_model(model_path), TARGET_SAMPLERATE)
+
 def is_model_installed(model_type):
     path = get_model_dir(model_type)
     if os.path.exists(path):
@@ -44,6 +184,161 @@ def is_model_installed(model_type):
                 return True
     return False
 
+# Lets go of a model once the recognizers using it are gone
+def unload_model(model_path):
+    with model_lock:
+        loaded_models.pop(find_model_path(model_path), None)
+
+# --- MODEL TIERS ---
+def installed_tiers():
+    return [t for t in MODEL_TIERS if is_model_installed(t) or (t == 'small' and os.path.exists(get_bundled_model_path()))]
+
+# Picks the model all streams decode with. In automatic mode it steps down a tier when the recognizer
+# falls behind (backlog or decode speed over a TIER_CHECK_SECONDS window) and back up after
+# TIER_UP_SECONDS of headroom. The next model loads in the background; recognize_loop swaps to it
+# between blocks once it is ready, so capture never stops.
+class ModelTiers:
+    def __init__(self, tier, auto=ADAPTIVE_MODEL, on_change=None, service=MODEL_SERVICE_ADDRESS):
+        self.lock = threading.Lock()
+        self.service = service  # the model service loads models itself
+        self.tiers = sorted(set(installed_tiers()) | {tier}, key=MODEL_TIERS.index)
+        self.tier = tier
+        self.path = resolve_model_arg(tier)
+        self.generation = 0  # bumped on every switch
+        self.auto = auto
+        self.on_change = on_change  # on_change(tier, reason) after a switch
+        self.loading = None
+        self.up_hold = TIER_UP_SECONDS
+        self.last_switch = self.last_up = self.comfortable_since = self.window_start = time.time()
+        self.decode = self.audio = self.lag = 0.0
+
+    def current(self):
+        with self.lock:
+            return self.generation, self.path
+
+    # Called when a recognizer is ready: the backlog built up while it loaded says nothing about its speed
+    def ready(self):
+        with self.lock:
+            self.window_start, self.decode, self.audio, self.lag = time.time(), 0.0, 0.0, 0.0
+
+    # Called by every stream after each decoded block
+    def observe(self, decode_seconds, audio_seconds, lag):
+        with self.lock:
+            self.decode += decode_seconds
+            self.audio += audio_seconds
+            self.lag = max(self.lag, lag)
+            now = time.time()
+            if now - self.window_start < TIER_CHECK_SECONDS: return
+            rtf, lag, audio = self.decode / self.audio if self.audio else 0.0, self.lag, self.audio
+            self.window_start, self.decode, self.audio, self.lag = now, 0.0, 0.0, 0.0
+            if not self.auto or self.loading: return
+            index = self.tiers.index(self.tier)
+            if lag > TIER_DOWN_LAG_SECONDS or rtf > TIER_DOWN_RTF:
+                self.comfortable_since = now
+                if index == 0: return
+                target, reason = self.tiers[index - 1], f"{lag:.1f}s behind, RTF {rtf:.2f}"
+            elif rtf < TIER_UP_RTF and lag < LAG_WARN_SECONDS:
+                # Mostly-silent windows say nothing about headroom
+                if audio < TIER_CHECK_SECONDS / 4 or index == len(self.tiers) - 1: return
+                if now - self.comfortable_since < self.up_hold or now - self.last_switch < self.up_hold: return
+                target, reason = self.tiers[index + 1], f"RTF {rtf:.2f} for {now - self.comfortable_since:.0f}s"
+            else:
+                self.comfortable_since = now
+                return
+        self.switch(target, reason)
+
+    def switch(self, tier, reason):
+        with self.lock:
+            if tier == self.tier or tier == self.loading: return
+            self.loading = tier
+        log.info("Switching to the %s model (%s)", tier, reason)
+        def load():
+            path = resolve_model_arg(tier)
+            try:
+                if not self.service: get_model(path)
+            except Exception as e:
+                log.warning("Loading the %s model failed: %s", tier, e)
+                with self.lock: self.loading = None
+                return
+            with self.lock:
+                now = time.time()
+                down = MODEL_TIERS.index(tier) < MODEL_TIERS.index(self.tier)
+                # Stepping down soon after stepping up: wait longer before the next attempt
+                if down and self.auto and self.last_up > now - self.up_hold: self.up_hold = min(self.up_hold * 2, 16 * TIER_UP_SECONDS)
+                if not down: self.last_up = now
+                previous = self.path
+                self.tier, self.path, self.loading = tier, path, None
+                self.generation += 1
+                self.last_switch = self.comfortable_since = now
+            if down and not self.service: unload_model(previous)
+            if self.on_change: self.on_change(tier, reason)
+        threading.Thread(target=load, daemon=True).start()
+
+    # A tier picked by hand sticks: automatic switching is turned off
+    def select(self, tier):
+        self.auto = False
+        self.switch(tier, "chosen by hand")
+
+# --- PROFILE ---
+# Remembers the last launch. Devices are stored by name and host API, because PortAudio
+# renumbers them whenever a device is plugged in or removed.
+def load_profile(path=PROFILE_FILE):
+    try:
+        with open(path, encoding="utf-8") as f: return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_profile(profile, path=PROFILE_FILE):
+    try:
+        with open(path + ".tmp", "w", encoding="utf-8") as f: json.dump(profile, f, ensure_ascii=False, indent=2)
+        os.replace(path + ".tmp", path)
+    except OSError as e:
+        log.warning("Could not save %s: %s", path, e)
+
+def describe_device(device_id):
+    import sounddevice as sd
+    dev = sd.query_devices(device_id)
+    return {"device": dev['name'], "hostapi": sd.query_hostapis(dev['hostapi'])['name']}
+
+def find_device(name, hostapi):
+    import sounddevice as sd
+    for i, dev in enumerate(sd.query_devices()):
+        if dev['max_input_channels'] > 0 and dev['name'] == name and sd.query_hostapis(dev['hostapi'])['name'] == hostapi:
+            return i
+    return None
+
+def profile_streams(streams):
+    return [dict(describe_device(dev), channel=ch, label=label) for dev, ch, label in streams]
+
+# Streams of the profile with today's device ids, or None if a device is gone
+def resolve_profile_streams(profile):
+    streams = []
+    for stream in profile.get("streams") or []:
+        dev = find_device(stream["device"], stream["hostapi"])
+        if dev is None:
+            log.info("Remembered device %r (%s) is not available", stream["device"], stream["hostapi"])
+            return None
+        streams.append((dev, stream["channel"], stream["label"]))
+    return streams or None
+
+# Wall-clock phases of a launch, logged once the overlay is on screen. Phases spent waiting for the
+# user (dialogs, downloads) are reported but left out of the "app" total.
+class StartupTimer:
+    def __init__(self, started=LAUNCHED):
+        self.started = self.last = started
+        self.phases = []  # (name, seconds, waiting for the user)
+
+    def mark(self, name, user=False):
+        now = time.perf_counter()
+        self.phases.append((name, now - self.last, user))
+        self.last = now
+
+    def report(self):
+        total = self.last - self.started
+        waiting = sum(seconds for _, seconds, user in self.phases if user)
+        log.info("Startup took %.0f ms (%.0f ms without dialogs): %s", total * 1000, (total - waiting) * 1000,
+                 ", ".join(f"{name} {seconds * 1000:.0f} ms{' (user)' if user else ''}" for name, seconds, user in self.phases))
+
 # --- GUI: HELP & GUIDE ---
 class HelpGUI:
     def __init__(self, parent):
@@ -218,67 +513,18 @@ class DownloadGUI:
 
     def run_download(self):
         try:
-            # Create target directory
-            os.makedirs(self.target_dir, exist_ok=True)
-            
-            headers = {'User-Agent': 'Mozilla/5.0'}
-            session = requests.Session()
-            
-            zip_path = "model_temp.zip"
-            mode = 'wb'
-            initial_pos = 0
-            resume_header = headers.copy()
-
-            if os.path.exists(zip_path):
-                initial_pos = os.path.getsize(zip_path)
-                if initial_pos > 0:
-                    resume_header['Range'] = f'bytes={initial_pos}-'
-                    mode = 'ab'
-
-            # 1. Connect
-            self.update_label("Connecting...")
-            response = session.get(self.url, stream=True, timeout=20, headers=resume_header)
-            
-            total_size = int(response.headers.get('content-length', 0)) + initial_pos
-            
-            if response.status_code == 416: 
-                total_size = initial_pos
-            elif response.status_code == 200 and initial_pos > 0:
-                initial_pos = 0
-                mode = 'wb'
-                total_size = int(response.headers.get('content-length', 0))
-
-            downloaded = initial_pos
-
-            # 2. Download
-            self.update_label("Downloading...")
-            with open(zip_path, mode) as file:
-                for data in response.iter_content(chunk_size=1024*1024):
-                    if data:
-                        size = file.write(data)
-                        downloaded += size
-                        perc = (downloaded / total_size) * 100
-                        self.root.after(0, self.update_progress, perc, downloaded, total_size)
-
-            # 3. Extract
-            self.update_label("Extracting... (Do not close)")
-            import zipfile
-            import shutil
-            
-            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                zip_ref.extractall("temp_extract")
-                extracted_root = zip_ref.namelist()[0].split('/')[0]
-                source = os.path.join("temp_extract", extracted_root)
-                if os.path.exists(self.target_dir):
-                    shutil.rmtree(self.target_dir)
-                os.rename(source, self.target_dir)
-                shutil.rmtree("temp_extract")
-            
+            from model_download import ModelDownloader, load_manifest
+            os.makedirs(BASE_MODELS_DIR, exist_ok=True)
+            manifest = load_manifest(get_resource_path(MODEL_MANIFEST_FILE), self.url)
+            downloader = ModelDownloader(self.url, self.target_dir, manifest, DOWNLOAD_CONNECTIONS, on_status=self.update_label,
+                                         on_progress=lambda done, total, rate: self.root.after(0, self.update_progress, done / total * 100, done, total, rate))
+            result = downloader.run()
+            log.info("Downloaded %s: %s", self.model_type, result)
+
             # Write Info File
             with open(os.path.join(self.target_dir, INFO_FILE), "w") as f:
                 f.write(self.model_type)
 
-            os.remove(zip_path)
             self.download_complete = True
             self.root.after(0, self.root.destroy)
 
@@ -286,17 +532,21 @@ class DownloadGUI:
             self.root.after(0, lambda: messagebox.showerror("Error", str(e)))
             self.root.after(0, sys.exit)
 
-    def update_progress(self, perc, current, total):
+    def update_progress(self, perc, current, total, rate=0.0):
         self.progress['value'] = perc
-        self.lbl_size.config(text=f"{current/(1024*1024):.1f} MB / {total/(1024*1024):.1f} MB")
+        self.lbl_size.config(text=f"{current/(1024*1024):.1f} MB / {total/(1024*1024):.1f} MB  ({rate/(1024*1024):.1f} MB/s)")
 
     def update_label(self, text):
         self.root.after(0, lambda: self.lbl_info.config(text=text))
 
 # --- GUI: AUDIO SELECTION ---
+# Ctrl/Shift-click selects several devices; each becomes its own captioned stream
 class AudioSelectorGUI:
-    def __init__(self):
+    # selected: device ids to preselect (the remembered ones)
+    def __init__(self, selected=()):
+        import sounddevice as sd
         self.device_id = None
+        self.streams = []
         self.root = tk.Tk()
         self.root.title("Select Audio Source")
         self.root.geometry("600x500")
@@ -310,7 +560,7 @@ class AudioSelectorGUI:
         scrollbar = tk.Scrollbar(frame)
         scrollbar.pack(side='right', fill='y')
         
-        self.listbox = tk.Listbox(frame, yscrollcommand=scrollbar.set, font=("Consolas", 10))
+        self.listbox = tk.Listbox(frame, yscrollcommand=scrollbar.set, font=("Consolas", 10), selectmode=tk.EXTENDED)
         self.listbox.pack(side='left', fill='both', expand=True)
         scrollbar.config(command=self.listbox.yview)
 
@@ -367,6 +617,14 @@ class AudioSelectorGUI:
             self.device_map[list_idx] = real_id
             list_idx += 1
 
+        for idx, real_id in self.device_map.items():
+            if real_id in selected:
+                self.listbox.selection_set(idx)
+                self.listbox.see(idx)
+
+        self.split_channels = tk.BooleanVar(value=False)
+        tk.Checkbutton(self.root, text="Caption each channel separately (multichannel interfaces)", variable=self.split_channels).pack(pady=(10, 0))
+
         # BUTTONS FRAME
         btn_frame = tk.Frame(self.root)
         btn_frame.pack(pady=15)
@@ -379,9 +637,19 @@ class AudioSelectorGUI:
     def confirm(self):
         selection = self.listbox.curselection()
         if selection:
-            idx = selection[0]
-            if idx in self.device_map:
-                self.device_id = self.device_map[idx]
+            ids = [self.device_map[idx] for idx in selection if idx in self.device_map]
+            if ids:
+                self.device_id = ids[0]
+                for dev in ids:
+                    name = self.devices[dev]['name'].split(" (")[0]
+                    channels = self.devices[dev]['max_input_channels']
+                    if self.split_channels.get() and channels > 1:
+                        self.streams += [(dev, ch, f"{name} #{ch + 1}") for ch in range(channels)]
+                    else:
+                        self.streams.append((dev, None, name))
+                labels = [label for _, _, label in self.streams]
+                self.streams = [(dev, ch, label if labels.count(label) == 1 else f"{label} [{dev}]") for dev, ch, label in self.streams]
+                if len(self.streams) == 1: self.streams = [(self.device_id, None, None)]
                 self.root.destroy()
             else:
                 # User clicked on a header or separator
@@ -394,89 +662,266 @@ class AudioSelectorGUI:
 
 # --- MAIN APP ---
 class SubtitleOverlay:
-    def __init__(self, root):
+    # speculators: one per stream, switched together from the context menu.
+    # settings: remembered overlay settings; on_settings(settings) is called whenever they change.
+    # tiers: the ModelTiers the recognizers follow, for the Model menu.
+    # langs: the target languages translations arrive in (final_<lang>); each gets its own line and
+    # can be hidden from the Languages menu. Early translations are only made for the first one.
+    def __init__(self, root, speculators=(), settings=None, on_settings=None, tiers=None, langs=None):
         self.root = root
+        self.speculators = list(speculators)
+        self.langs = list(langs or TARGET_LANGS)
+        self.tiers = tiers
+        self.on_settings = on_settings
+        settings = settings or {}
         self.root.title("Real-Time Translator")
-        self.root.geometry("800x200+100+700")
+        geometry = settings.get("geometry", "800x200+100+700")
+        self.root.geometry(geometry)
         self.root.overrideredirect(True)
         self.root.attributes('-topmost', True)
         self.root.attributes('-alpha', 0.8)
         self.root.configure(bg='black')
 
-        self.show_english = tk.BooleanVar(value=True)
-        self.opacity = tk.DoubleVar(value=0.8)
-        self.en_font_size = tk.IntVar(value=10)
-        self.fa_font_size = tk.IntVar(value=16)
-
+        self.show_english = tk.BooleanVar(value=settings.get("show_english", True))
+        self.speculative = tk.BooleanVar(value=settings.get("speculative", any(s.enabled for s in self.speculators)))
+        self.opacity = tk.DoubleVar(value=settings.get("opacity", 0.8))
+        self.en_font_size = tk.IntVar(value=settings.get("en_font_size", 10))
+        self.fa_font_size = tk.IntVar(value=settings.get("fa_font_size", 16))
+        self.show_hud = tk.BooleanVar(value=settings.get("latency_hud", LATENCY_HUD))
+        self.model_tier = tk.StringVar(value=tiers.tier if tiers else "")
+        self.auto_model = tk.BooleanVar(value=tiers.auto if tiers else False)
+        hidden = settings.get("hidden_languages", [])  # remembered as hidden, so a newly added language shows up
+        self.show_langs = {lang: tk.BooleanVar(value=lang not in hidden) for lang in self.langs}
+        if not any(var.get() for var in self.show_langs.values()): self.show_langs[self.langs[0]].set(True)
+        self.root.attributes('-alpha', self.opacity.get())
+        for speculator in self.speculators: speculator.enabled = self.speculative.get()
+
+        # With several streams, lines are prefixed with the stream label; the dicts are keyed by it (None for a single stream)
+        # Translation state is kept per language (every language, shown or not, so it can be shown at any time)
         self.history_en = deque(maxlen=2)
-        self.history_fa = deque(maxlen=2)
-        self.current_en = ""
+        self.history_tr = {lang: deque(maxlen=2) for lang in self.langs}
+        self.current_en = {}
+        self.current_tr = {}  # (utterance, speculative translation) of the sentence still being spoken, first language only
+        self.tr_done = {lang: {} for lang in self.langs}  # sentences whose final translation has arrived
+        # Chunks of an utterance still being spoken (see UtteranceSegmenter) are joined on one line
+        self.open_en = {}
+        self.open_tr = {lang: {} for lang in self.langs}
+        self.tr_closes = {lang: {} for lang in self.langs}  # per source, for each translation on its way: whether it ends its line
+        self.lags = {}  # (behind, dropped) seconds
+
+        self.shown_en = self.shown_lag = None
+        self.shown_tr = dict.fromkeys(self.langs)
+        self.data_pending = False  # set by worker threads, cleared by the Tk thread
+        self.counters = {"messages": 0, "wakeups": 0, "renders": 0, "label_updates": 0}
+        self.max_render_ms = 0.0
+        self.last_stats_log = time.time()
 
-        self.update_fonts()
+        self.font_en = font.Font(family="Segoe UI", size=self.en_font_size.get())
+        self.font_fa = font.Font(family="Tahoma", size=self.fa_font_size.get(), weight="bold")
         self.container = tk.Frame(root, bg='black')
         self.container.pack(fill='both', expand=True, padx=10, pady=5)
         self.spacer = tk.Frame(self.container, bg='black')
         self.lbl_en = tk.Label(self.container, text="", font=self.font_en, fg='#aaaaaa', bg='black', 
                                justify="center", height=3, anchor='s', wraplength=780)
-        self.lbl_fa = tk.Label(self.container, text="...Listening...", font=self.font_fa, fg='white', bg='black', 
-                               justify="right", anchor='se', wraplength=780) 
+        self.lbl_tr = {lang: tk.Label(self.container, text="", font=self.font_fa, fg='white', bg='black', wraplength=780,
+                                      justify="right" if lang in RTL_LANGS else "center", anchor='se' if lang in RTL_LANGS else 's')
+                       for lang in self.langs}
+        self.lbl_tr[self.shown_langs()[0]].config(text="...Listening...")
+        self.update_wraplength(int(geometry.split("x")[0]))
         self.refresh_layout()
 
+        # Shown only while the recognizer is noticeably behind live audio
+        self.lbl_lag = tk.Label(self.root, text="", font=("Segoe UI", 8), fg='orange', bg='black')
+        # Stage latency percentiles, refreshed every second while enabled
+        self.lbl_hud = tk.Label(self.root, text="", font=("Consolas", 8), fg='#66ccff', bg='black')
+        # Short-lived notices such as a model switch
+        self.lbl_notice = tk.Label(self.root, text="", font=("Segoe UI", 8), fg='#99cc66', bg='black')
+
         self.grip = tk.Label(self.root, text="⇲", bg="#444444", fg="white", cursor="sizing", font=("Arial", 12))
         self.grip.place(relx=1.0, rely=1.0, x=-20, y=-20, width=20, height=20)
         self.grip.bind("<Button-1>", self.start_resize)
         self.grip.bind("<B1-Motion>", self.do_resize)
         self.root.bind('<Button-1>', self.start_move)
         self.root.bind('<B1-Motion>', self.do_move)
+        self.root.bind('<ButtonRelease-1>', self.save_settings)  # after a move or resize
         
         self.create_context_menu()
         self.root.bind("<Button-3>", self.show_context_menu)
         self.lbl_en.bind("<Button-3>", self.show_context_menu)
-        self.lbl_fa.bind("<Button-3>", self.show_context_menu)
+        for label in self.lbl_tr.values(): label.bind("<Button-3>", self.show_context_menu)
         self.container.bind("<Button-3>", self.show_context_menu)
 
-        self.update_gui_loop()
+        gui_queue.listener = self.wake
+        self.poll()
+        self.update_hud()
+
+    def shown_langs(self):
+        return [lang for lang in self.langs if self.show_langs[lang].get()]
 
     def refresh_layout(self):
         self.lbl_en.pack_forget()
-        self.lbl_fa.pack_forget()
+        for label in self.lbl_tr.values(): label.pack_forget()
         self.spacer.pack_forget()
         if self.show_english.get(): self.lbl_en.pack(side='top', fill='x')
-        self.lbl_fa.pack(side='bottom', fill='both', expand=False, pady=(0, 10))
+        # Packed from the bottom up, so the lines read top to bottom in --target-langs order
+        for i, lang in enumerate(reversed(self.shown_langs())):
+            self.lbl_tr[lang].pack(side='bottom', fill='both', expand=False, pady=(0, 10 if i == 0 else 4))
         self.spacer.pack(side='top', fill='both', expand=True)
 
     def update_fonts(self):
-        self.font_en = font.Font(family="Segoe UI", size=self.en_font_size.get())
-        self.font_fa = font.Font(family="Tahoma", size=self.fa_font_size.get(), weight="bold")
-        if hasattr(self, 'lbl_en'):
-            self.lbl_en.configure(font=self.font_en)
-            self.lbl_fa.configure(font=self.font_fa)
+        # Labels follow their Font objects, so resizing them is enough
+        self.font_en.configure(size=self.en_font_size.get())
+        self.font_fa.configure(size=self.fa_font_size.get())
     
     def update_wraplength(self, width):
         wrap = width - 40 
         self.lbl_en.config(wraplength=wrap)
-        self.lbl_fa.config(wraplength=wrap)
+        for label in self.lbl_tr.values(): label.config(wraplength=wrap)
 
-    def update_display(self):
-        full_en = "\n".join(list(self.history_en) + [self.current_en]).strip()
-        full_fa = "\n".join(list(self.history_fa)).strip()
-        if not full_fa and self.current_en: full_fa = "..."
-        self.lbl_en.config(text=full_en)
-        self.lbl_fa.config(text=full_fa)
+    def tag(self, source):
+        return f"{source}: " if source else ""
 
-    def update_gui_loop(self):
+    # The unfinished line of each stream: its committed chunks, then the text still in progress
+    def live_lines(self, committed, pending):
+        lines = []
+        for source in dict.fromkeys(list(committed) + list(pending)):
+            text = " ".join(t for t in (committed.get(source), pending.get(source)) if t)
+            if text: lines.append(self.tag(source) + text)
+        return lines
+
+    def update_display(self):
+        full_en = "\n".join(list(self.history_en) + self.live_lines(self.open_en, self.current_en)).strip()
+        if full_en != self.shown_en:
+            self.lbl_en.config(text=full_en)
+            self.shown_en = full_en
+            self.counters["label_updates"] += 1
+        for lang in self.shown_langs():
+            speculative = {s: text + " …" for s, (_, text) in self.current_tr.items()} if lang == self.langs[0] else {}
+            full = "\n".join(list(self.history_tr[lang]) + self.live_lines(self.open_tr[lang], speculative)).strip()
+            if not full and any(self.current_en.values()): full = "..."
+            if full != self.shown_tr[lang]:
+                self.lbl_tr[lang].config(text=full)
+                self.shown_tr[lang] = full
+                self.counters["label_updates"] += 1
+
+    # Shows the stream that is furthest behind
+    def update_lag(self, lag, dropped, source=None):
+        self.lags[source] = (lag, dropped)
+        source, (lag, dropped) = max(self.lags.items(), key=lambda item: item[1])
+        text = None
+        if lag > LAG_WARN_SECONDS or dropped > 0:
+            text = f"{self.tag(source)}{lag:.1f}s behind"
+            if dropped > 0: text += f" | {dropped:.0f}s dropped"
+        if text == self.shown_lag: return
+        self.shown_lag = text
+        if text:
+            self.lbl_lag.config(text=text)
+            self.lbl_lag.place(x=4, y=2)
+        else:
+            self.lbl_lag.place_forget()
+
+    # Applies one message to the caption state; returns True if the captions changed
+    def apply(self, msg):
+        kind, payload = msg[:2]
+        source = msg[2] if len(msg) > 2 else None
+        stage, _, lang = kind.partition("_")
+        if kind == "partial_en":
+            if payload == self.current_en.get(source): return False
+            self.current_en[source] = payload
+        elif kind == "segment_en":
+            self.open_en[source] = (self.open_en.get(source, "") + " " + payload).strip()
+            self.current_en[source] = ""
+            for closes in self.tr_closes.values(): closes.setdefault(source, deque()).append(False)
+        elif kind == "final_en":
+            text = (self.open_en.pop(source, "") + " " + payload).strip()
+            if not text: return False
+            self.history_en.append(self.tag(source) + text)
+            self.current_en[source] = ""
+            for lang in self.langs:
+                closes = self.tr_closes[lang].setdefault(source, deque())
+                if payload.startswith("Error: "): pass  # not translated
+                elif payload: closes.append(True)
+                # Every word was in a chunk already, so the last chunk's translation ends the line
+                elif closes: closes[-1] = True
+                else: self.close_line(lang, source)
+        elif stage == "final" and lang in self.open_tr:
+            self.open_tr[lang][source] = (self.open_tr[lang].get(source, "") + " " + payload).strip()
+            closes = self.tr_closes[lang].get(source)
+            if not closes or closes.popleft(): self.close_line(lang, source)
+            done = self.tr_done[lang]
+            done[source] = done.get(source, 0) + 1
+            if lang == self.langs[0] and source in self.current_tr and self.current_tr[source][0] < done[source]: del self.current_tr[source]
+            return self.show_langs[lang].get()
+        elif stage == "partial" and lang == self.langs[0]:
+            utterance, text = payload
+            if utterance < self.tr_done[lang].get(source, 0): return False
+            self.current_tr[source] = (utterance, text)
+        elif kind == "lag":
+            self.update_lag(payload["behind_seconds"], payload["dropped_seconds"], source)
+            return False
+        elif kind == "model":
+            self.model_tier.set(payload["tier"])
+            self.notify(f"Model: {payload['tier']} ({payload['reason']})")
+            return False
+        else:
+            return False
+        return True
+
+    def close_line(self, lang, source):
+        text = self.open_tr[lang].pop(source, "")
+        if text: self.history_tr[lang].append(self.tag(source) + text)
+
+    # Called from worker threads on every put. Only sets a flag: calling into Tcl from another thread
+    # blocks that thread until the Tk loop gets to it, which would stall decoding and translation.
+    def wake(self):
+        self.data_pending = True
+
+    # Runs on the Tk thread every RENDER_INTERVAL_MS; an idle tick only checks the flag
+    def poll(self):
+        if self.data_pending:
+            self.data_pending = False  # before draining, so a message put during render() is not missed
+            self.counters["wakeups"] += 1
+            self.render()
+        if time.time() - self.last_stats_log >= STATS_LOG_INTERVAL:
+            log.info("Overlay: %s, slowest frame %.1f ms", self.counters, self.max_render_ms)
+            self.last_stats_log = time.time()
+            self.max_render_ms = 0.0
+        self.root.after(RENDER_INTERVAL_MS, self.poll)
+
+    # Drains everything that arrived since the last frame and redraws once
+    def render(self):
+        start = time.perf_counter()
+        changed = False
+        translated = []  # (source, language) of the translations drawn in this frame
         try:
             while True:
                 msg = gui_queue.get_nowait()
-                if msg[0] == "partial_en": self.current_en = msg[1]
-                elif msg[0] == "final_en":
-                    if msg[1].strip(): 
-                        self.history_en.append(msg[1])
-                        self.current_en = ""
-                elif msg[0] == "final_fa": self.history_fa.append(msg[1])
-                self.update_display()
+                self.counters["messages"] += 1
+                if captions: captions.publish(msg)
+                changed = self.apply(msg) or changed
+                stage, _, lang = msg[0].partition("_")
+                if stage == "final" and lang in self.open_tr: translated.append((msg[2] if len(msg) > 2 else None, lang))
         except queue.Empty: pass
-        self.root.after(20, self.update_gui_loop)
+        if changed:
+            self.update_display()
+            self.counters["renders"] += 1
+        for source, lang in translated: latency.rendered(source, lang)
+        self.max_render_ms = max(self.max_render_ms, (time.perf_counter() - start) * 1000)
+
+    def notify(self, text, seconds=6):
+        self.lbl_notice.config(text=text)
+        self.lbl_notice.place(x=4, rely=1.0, y=-4, anchor='sw')
+        if getattr(self, "notice_job", None): self.root.after_cancel(self.notice_job)
+        self.notice_job = self.root.after(int(seconds * 1000), self.lbl_notice.place_forget)
+
+    def update_hud(self):
+        text = hud_text(latency.snapshot()) if self.show_hud.get() else ""
+        if text:
+            self.lbl_hud.config(text=text)
+            self.lbl_hud.place(relx=1.0, x=-4, y=2, anchor='ne')
+        else:
+            self.lbl_hud.place_forget()
+        self.root.after(1000, self.update_hud)
 
     def start_resize(self, event):
         self.start_x = event.x_root; self.start_y = event.y_root
@@ -496,65 +941,715 @@ class SubtitleOverlay:
 
     def create_context_menu(self):
         self.menu = tk.Menu(self.root, tearoff=0)
-        self.menu.add_checkbutton(label="Show English Text", onvalue=True, offvalue=False, variable=self.show_english, command=self.refresh_layout)
+        self.menu.add_checkbutton(label="Show English Text", onvalue=True, offvalue=False, variable=self.show_english, command=lambda: (self.refresh_layout(), self.save_settings()))
+        if self.speculators:
+            self.menu.add_checkbutton(label="Early Translation (while speaking)", onvalue=True, offvalue=False, variable=self.speculative, command=self.toggle_speculative)
+        self.menu.add_checkbutton(label="Latency HUD", onvalue=True, offvalue=False, variable=self.show_hud, command=self.save_settings)
+        if self.tiers and len(self.tiers.tiers) > 1:
+            self.model_menu = tk.Menu(self.menu, tearoff=0); self.menu.add_cascade(label="Model", menu=self.model_menu)
+            for tier in self.tiers.tiers:
+                self.model_menu.add_radiobutton(label=tier.capitalize(), variable=self.model_tier, value=tier, command=self.select_model)
+            self.model_menu.add_separator()
+            self.model_menu.add_checkbutton(label="Switch Automatically When Behind", onvalue=True, offvalue=False, variable=self.auto_model, command=self.toggle_auto_model)
         self.size_menu_en = tk.Menu(self.menu, tearoff=0); self.menu.add_cascade(label="English Font Size", menu=self.size_menu_en)
         for s in [8,10,12,14,18]: 
-            self.size_menu_en.add_radiobutton(label=str(s), variable=self.en_font_size, value=s, command=self.update_fonts)
+            self.size_menu_en.add_radiobutton(label=str(s), variable=self.en_font_size, value=s, command=lambda: (self.update_fonts(), self.save_settings()))
             
-        self.size_menu_fa = tk.Menu(self.menu, tearoff=0); self.menu.add_cascade(label="Persian Font Size", menu=self.size_menu_fa)
+        if len(self.langs) > 1:
+            self.lang_menu = tk.Menu(self.menu, tearoff=0); self.menu.add_cascade(label="Languages", menu=self.lang_menu)
+            for lang in self.langs:
+                self.lang_menu.add_checkbutton(label=lang, onvalue=True, offvalue=False, variable=self.show_langs[lang], command=lambda lang=lang: self.toggle_language(lang))
+        self.size_menu_fa = tk.Menu(self.menu, tearoff=0)
+        self.menu.add_cascade(label="Persian Font Size" if self.langs == ["fa"] else "Translation Font Size", menu=self.size_menu_fa)
         for s in [12,14,16,20,24,28,32]: 
-            self.size_menu_fa.add_radiobutton(label=str(s), variable=self.fa_font_size, value=s, command=self.update_fonts)
+            self.size_menu_fa.add_radiobutton(label=str(s), variable=self.fa_font_size, value=s, command=lambda: (self.update_fonts(), self.save_settings()))
             
         self.menu.add_separator()
         
         self.opacity_menu = tk.Menu(self.menu, tearoff=0); self.menu.add_cascade(label="Opacity", menu=self.opacity_menu)
         for op in [0.2,0.4,0.6,0.8,1.0]: 
-            self.opacity_menu.add_radiobutton(label=f"{int(op*100)}%", variable=self.opacity, value=op, command=lambda: self.root.attributes('-alpha', self.opacity.get()))
+            self.opacity_menu.add_radiobutton(label=f"{int(op*100)}%", variable=self.opacity, value=op, command=self.set_opacity)
             
         self.menu.add_separator()
-        self.menu.add_command(label="Exit", command=self.root.destroy)
+        self.menu.add_command(label="Exit", command=self.exit)
+
+    def set_opacity(self):
+        self.root.attributes('-alpha', self.opacity.get())
+        self.save_settings()
+
+    def select_model(self):
+        self.tiers.select(self.model_tier.get())
+        self.auto_model.set(False)
+        self.save_settings()
+
+    def toggle_auto_model(self):
+        self.tiers.auto = self.auto_model.get()
+        self.save_settings()
+
+    # At least one language stays on; a language that comes back shows its current lines straight away
+    def toggle_language(self, lang):
+        if not self.shown_langs(): self.show_langs[lang].set(True)
+        self.shown_tr[lang] = None
+        self.refresh_layout()
+        self.update_display()
+        self.save_settings()
+
+    def toggle_speculative(self):
+        for speculator in self.speculators: speculator.enabled = self.speculative.get()
+        self.save_settings()
+
+    def save_settings(self, event=None):
+        if not self.on_settings: return
+        self.on_settings({"geometry": self.root.geometry(), "show_english": self.show_english.get(), "opacity": self.opacity.get(),
+                          "en_font_size": self.en_font_size.get(), "fa_font_size": self.fa_font_size.get(), "speculative": self.speculative.get(),
+                          "latency_hud": self.show_hud.get(), "adaptive_model": self.auto_model.get() if self.tiers else ADAPTIVE_MODEL,
+                          "hidden_languages": [lang for lang in self.langs if not self.show_langs[lang].get()]})
+
+    def exit(self):
+        self.save_settings()
+        self.root.destroy()
 
     def show_context_menu(self, event):
         self.menu.tk_popup(event.x_root, event.y_root)
 
+# --- AUDIO SOURCES ---
+# Feeds 16-bit PCM from a WAV file, raw PCM file or stdin ("-") in BLOCK_SIZE frames.
+# speed=1.0 paces blocks at real time, 2.0 at twice real time, 0 as fast as possible.
+# stream: an already open binary file object to read instead of path (path is then only a name).
+class FileAudioSource:
+    def __init__(self, path, speed=1.0, fmt="auto", samplerate=16000, channels=1, stream=None):
+        self.path = path
+        self.speed = speed
+        self.frames_read = 0
+        if fmt == "auto":
+            fmt = "wav" if path != "-" and path.lower().endswith(".wav") else "raw"
+        self.stream = stream or (sys.stdin.buffer if path == "-" else open(path, "rb"))
+        self.wav = None
+        if fmt == "wav":
+            self.wav = wave.open(self.stream, "rb")
+            if self.wav.getsampwidth() != 2:
+                raise ValueError("Only 16-bit PCM WAV files are supported")
+            samplerate = self.wav.getframerate()
+            channels = self.wav.getnchannels()
+        self.samplerate = samplerate
+        self.channels = channels
+
+    def read_block(self):
+        if self.wav:
+            return self.wav.readframes(BLOCK_SIZE)
+        return self.stream.read(BLOCK_SIZE * 2 * self.channels)
+
+    # sinks: (ring, frontend) pairs, e.g. one per channel of a multichannel file
+    def run(self, sinks):
+        start = time.time()
+        frame_bytes = 2 * self.channels
+        try:
+            while True:
+                data = self.read_block()
+                data = data[:len(data) - len(data) % frame_bytes]
+                if not data or all(ring.closed for ring, _ in sinks): break
+                self.frames_read += len(data) // frame_bytes
+                if self.speed > 0:
+                    delay = start + self.frames_read / (self.samplerate * self.speed) - time.time()
+                    if delay > 0: time.sleep(delay)
+                for ring, frontend in sinks: ring.write(frontend.process(data))
+        finally:
+            for ring, _ in sinks: ring.close()
+            if self.stream is not sys.stdin.buffer: self.stream.close()
+
+    @property
+    def audio_seconds(self):
+        return self.frames_read / self.samplerate
+
 # --- WORKER THREADS ---
-def vosk_thread(device_id, samplerate, model_path):
+# Messages from a labelled stream carry the label as a third element; a single unlabelled stream keeps (kind, payload)
+def caption(kind, payload, source=None):
+    return (kind, payload) if source is None else (kind, payload, source)
+
+def report_status(ring, vad, partial_counts, cpu, source=None):
+    gui_queue.put(caption("partials", dict(partial_counts), source))
+    lag = ring.lag_seconds
+    gui_queue.put(caption("lag", {"behind_seconds": round(lag, 3), "dropped_seconds": round(ring.dropped_seconds, 3)}, source))
+    gui_queue.put(caption("cpu", cpu, source))
+    if lag > LAG_WARN_SECONDS:
+        log.warning("Recognizer%s is %.1fs behind live audio (%.1fs dropped so far)", f" [{source}]" if source else "", lag, ring.dropped_seconds)
+    if vad: gui_queue.put(caption("vad", {"skipped_fraction": round(vad.skipped_fraction, 4)}, source))
+
+# kind: "final_en" for the end of an utterance, "segment_en" for a chunk committed while it goes on
+def emit_final(text, source=None, trace=None, kind="final_en"):
+    if not text: return False
+    gui_queue.put(caption(kind, text, source))
+    translation_queue.put((text, source, trace if trace is not None else {}))
+    return True
+
+def make_segmenter(enabled=SEGMENT_ENABLED):
+    if not enabled: return None
+    return UtteranceSegmenter(SEGMENT_MIN_WORDS, SEGMENT_MAX_WORDS, SEGMENT_MAX_SECONDS, SEGMENT_PAUSE_SECONDS)
+
+# partials=False skips PartialResult() entirely (nobody is showing them);
+# otherwise it is asked at most every partial_interval seconds and only changes are passed on.
+# tiers: a ModelTiers to follow; rec was made from its model `generation` (or is None and made here).
+# segmenter: an UtteranceSegmenter that commits chunks of long utterances from the partials. Each
+# chunk is translated on its own and counts as an utterance; the final only carries the rest.
+# utterance: index of the first utterance (a restarted recognizer process goes on from where the last one stopped).
+def recognize_loop(rec, ring, vad=None, speculator=None, partials=True, partial_interval=PARTIAL_MIN_INTERVAL, source=None,
+                   tiers=None, service=MODEL_SERVICE_ADDRESS, segmenter=None, generation=None, utterance=0):
+    if tiers and rec is None:
+        generation, path = tiers.current()
+        rec = make_recognizer(path, service)
+    if tiers: tiers.ready()
+    last_report = time.time()
+    # utterance: index of the sentence being recognized, counted in non-empty finals and segments
+    last_partial = None  # raw JSON of the last partial, compared before parsing
+    words = []  # its words
+    last_partial_time = 0.0
+    partial_counts = {"requested": 0, "emitted": 0}
+    trace = {}  # latency timestamps and stream position of the utterance being recognized
+    consumed = 0  # frames read from the ring
+    # Decoding runs in this thread (Vosk releases the GIL), so thread CPU time is this stream's cost
+    cpu_start = last_cpu = time.thread_time()
+    def status():
+        nonlocal last_report, last_cpu
+        now, cpu = time.time(), time.thread_time()
+        usage = {"core_fraction": round((cpu - last_cpu) / max(now - last_report, 1e-6), 3), "total_seconds": round(cpu - cpu_start, 3)}
+        report_status(ring, vad, partial_counts, usage, source)
+        last_report, last_cpu = now, cpu
+
+    def emit(text, kind):
+        nonlocal utterance, trace
+        trace["final"] = time.time()
+        if kind == "segment_en": trace["segment"] = True
+        if emit_final(text, source, trace, kind):
+            latency.span("final", trace, "audio_end", "final")
+            if speculator: speculator.finish(utterance)
+            utterance += 1
+        trace = {}
+
+    def finish(result_json):
+        nonlocal last_partial, words
+        last_partial, words = None, []
+        text = json.loads(result_json).get("text", "")
+        if segmenter and segmenter.committed:
+            text = segmenter.finish(text)
+            # Everything was committed already: an empty final closes the line the chunks were joined on
+            if not text: gui_queue.put(caption("final_en", "", source))
+        elif segmenter:
+            segmenter.reset()
+        emit(text, "final_en")
+
+    while True:
+        data = ring.read(DECODE_BLOCK_SIZE)
+        if data: consumed += len(data) // 2
+        if time.time() - last_report >= LAG_REPORT_INTERVAL: status()
+        if data is None:
+            # End of a file source: flush whatever is still in the decoder
+            finish(rec.FinalResult())
+            status()
+            if vad: log.info("Voice activity gate%s skipped %.0f%% of the audio", f" [{source}]" if source else "", vad.skipped_fraction * 100)
+            return
+        if vad:
+            data, speech_ended = vad.process(data)
+            # Silence after speech: close the utterance now rather than waiting for Kaldi's endpoint
+            if speech_ended: finish(rec.FinalResult())
+            if data is None: continue
+        if tiers and tiers.generation != generation:
+            # Close the sentence on the old model so none of it is lost, then go on with the new one
+            finish(rec.FinalResult())
+            generation, path = tiers.current()
+            rec = make_recognizer(path, service)
+            tiers.ready()
+        # The block just read ends where the unread backlog begins
+        lag = ring.lag_seconds
+        latency.observe("backlog", lag)
+        trace.setdefault("audio_start", time.time() - lag)
+        trace["audio_end"] = time.time() - lag
+        # Seconds into the stream, counting audio the ring dropped and the gate skipped
+        position = (consumed + ring.dropped_frames) / TARGET_SAMPLERATE
+        trace.setdefault("stream_start", position - len(data) / 2 / TARGET_SAMPLERATE)
+        trace["stream_end"] = position
+        decode_start = time.perf_counter()
+        accepted = rec.AcceptWaveform(data)
+        decode_time = time.perf_counter() - decode_start
+        latency.observe("decode", decode_time)
+        if tiers: tiers.observe(decode_time, len(data) / 2 / TARGET_SAMPLERATE, lag)
+        if accepted:
+            finish(rec.Result())
+        elif partials and time.time() - last_partial_time >= partial_interval:
+            last_partial_time = time.time()
+            raw = rec.PartialResult()
+            partial_counts["requested"] += 1
+            changed = raw != last_partial
+            if changed:
+                last_partial = raw
+                words = json.loads(raw).get("partial", "").split()
+            if segmenter:
+                # Asked even when nothing changed, since an unchanged hypothesis is how a pause shows
+                chunk = segmenter.update(words)
+                if chunk:
+                    emit(" ".join(chunk), "segment_en")
+                    changed = True
+                part = " ".join(segmenter.remainder(words))
+            else:
+                part = " ".join(words)
+            if not changed: continue
+            if part:
+                partial_counts["emitted"] += 1
+                if "partial" not in trace:
+                    trace["partial"] = time.time()
+                    latency.span("first_partial", trace, "audio_start", "partial")
+                gui_queue.put(caption("partial_en", part, source))
+                if speculator: speculator.update(utterance, part)
+
+# Messages from the recognizer process, replayed onto this process's queues
+def forward_worker_message(kind, payload, speculator):
+    if kind == "gui": gui_queue.put(payload)
+    elif kind == "translate": translation_queue.put(payload)
+    elif kind == "speculate" and speculator: speculator.update(*payload)
+    elif kind == "finish" and speculator: speculator.finish(payload)
+    elif kind == "latency": latency.observe(*payload)
+
+# "source[#channel][=label]": a device index (a file in headless mode), optionally a single channel of it
+def parse_stream(spec):
+    spec, _, label = spec.partition("=")
+    source, _, channel = spec.rpartition("#") if "#" in spec else (spec, "", "")
+    return source, int(channel) if channel else None, label or None
+
+# Ring and decode function for one stream. isolate=True runs the recognizer in a child process
+# (see recognizer_process.py); otherwise it runs in the calling thread on the shared model, or on
+# whichever model `tiers` picks.
+def open_decoder(model_path, label, speculator, buffer_seconds, overflow, use_vad, partials, partial_interval, service, isolate,
+                 tiers=None, segment=SEGMENT_ENABLED):
+    if isolate:
+        ring = SharedAudioRing(buffer_seconds, TARGET_SAMPLERATE, overflow)
+        options = {"service": service, "use_vad": use_vad, "speculate": speculator is not None, "partials": partials,
+                   "partial_interval": partial_interval, "source": label, "segment": segment}
+        supervisor = RecognizerSupervisor(ring, model_path, options, lambda kind, payload: forward_worker_message(kind, payload, speculator))
+        return ring, supervisor.run
+    # The recognizer is ready before any device opens, so no backlog builds up while the model loads
+    generation = None
+    if tiers: generation, model_path = tiers.current()
+    rec = make_recognizer(model_path, service)
+    ring = AudioRingBuffer(buffer_seconds, TARGET_SAMPLERATE, overflow)
+    vad = VoiceActivityGate(TARGET_SAMPLERATE, hangover=VAD_HANGOVER_SECONDS, preroll=VAD_PREROLL_SECONDS) if use_vad else None
+    return ring, lambda: recognize_loop(rec, ring, vad, speculator, partials, partial_interval, label, tiers, service, make_segmenter(segment),
+                                        generation)
+
+# streams: (device id or FileAudioSource, channel or None, label or None) per recognizer.
+# Each device or file is opened once and fanned out to its streams; every stream decodes in its own thread.
+def vosk_thread(streams, model_path, buffer_seconds=AUDIO_BUFFER_SECONDS, overflow=OVERFLOW_POLICY, use_vad=VAD_ENABLED,
+                speculators=None, partials=True, partial_interval=PARTIAL_MIN_INTERVAL, service=MODEL_SERVICE_ADDRESS, isolate=RECOGNIZER_PROCESS,
+                tiers=None, segment=SEGMENT_ENABLED):
+    rings = []
+    readers = []
+    partials = partials or segment  # segments are cut from the partial results
+    if tiers and isolate:
+        log.warning("Model switching is not available with the recognizer process, staying on %s", model_path)
+        tiers = None
     try:
-        final_model_path = model_path
-        if not os.path.exists(os.path.join(model_path, "conf")):
-            if os.path.exists(model_path):
-                subdirs = [d for d in os.listdir(model_path) if os.path.isdir(os.path.join(model_path, d))]
-                for d in subdirs:
-                    if os.path.exists(os.path.join(model_path, d, "conf")): final_model_path = os.path.join(model_path, d); break
-        
-        model = vosk.Model(final_model_path)
-        rec = vosk.KaldiRecognizer(model, samplerate)
-        with sd.RawInputStream(samplerate=samplerate, blocksize=4000, device=device_id, dtype='int16', channels=1, callback=lambda i,f,t,s: audio_queue.put(bytes(i))):
-            while True:
-                data = audio_queue.get()
-                if rec.AcceptWaveform(data):
-                    res = json.loads(rec.Result())
-                    if res.get("text"): 
-                        gui_queue.put(("final_en", res["text"]))
-                        translation_queue.put(res["text"])
-                else:
-                    part = json.loads(rec.PartialResult())
-                    if part.get("partial"): gui_queue.put(("partial_en", part["partial"]))
+        inputs = {}  # device id or source -> [(channel, ring)]
+        decoders = []
+        for i, (src, channel, label) in enumerate(streams):
+            speculator = speculators[i] if speculators else None
+            ring, decode = open_decoder(model_path, label, speculator, buffer_seconds, overflow, use_vad, partials, partial_interval, service, isolate,
+                                        tiers, segment)
+            rings.append(ring)
+            inputs.setdefault(src, []).append((channel, ring))
+            decoders.append((label, decode))
+
+        def run_decoder(label, decode):
+            try:
+                decode()
+            except Exception as e:
+                gui_queue.put(caption("final_en", f"Error: {str(e)}", label))
+
+        with contextlib.ExitStack() as devices:
+            for src, sinks in inputs.items():
+                if isinstance(src, FileAudioSource):
+                    sinks = [(ring, CaptureFrontend(src.samplerate, src.channels, TARGET_SAMPLERATE, channel)) for channel, ring in sinks]
+                    readers.append(threading.Thread(target=src.run, args=(sinks,), daemon=True))
+                    readers[-1].start()
+                    continue
+                # Open the device as it is (loopback devices often refuse mono) and convert to 16 kHz mono ourselves
+                import sounddevice as sd
+                device_info = sd.query_devices(src, 'input')
+                samplerate = int(device_info['default_samplerate'])
+                channels = device_info['max_input_channels']
+                sinks = [(ring, CaptureFrontend(samplerate, channels, TARGET_SAMPLERATE, channel)) for channel, ring in sinks]
+                def callback(i, f, t, s, sinks=sinks):
+                    for ring, frontend in sinks: ring.write(frontend.process(i))
+                devices.enter_context(sd.RawInputStream(samplerate=samplerate, blocksize=BLOCK_SIZE, device=src, dtype='int16', channels=channels, callback=callback))
+            workers = [threading.Thread(target=run_decoder, args=decoder, daemon=True) for decoder in decoders]
+            for t in workers: t.start()
+            for t in workers: t.join()
+        for (src, channel, label), ring in zip(streams, rings):
+            if ring.dropped_frames:
+                log.warning("Dropped %.1fs of audio%s in %d buffer overflows", ring.dropped_seconds, f" [{label}]" if label else "", ring.overflows)
     except Exception as e:
         gui_queue.put(("final_en", f"Error: {str(e)}"))
+    finally:
+        if isolate:
+            for ring in rings: ring.close()
+            for t in readers: t.join()
+            for ring in rings: ring.release()
+        gui_queue.put(("eof", ""))
+
+# One writer per target language ({language: TranscriptWriter}); the file names get the language
+# when there are several
+def open_transcripts(folder=TRANSCRIPT_DIR, formats=TRANSCRIPT_FORMATS, langs=TARGET_LANGS):
+    if not folder: return {}
+    name = time.strftime("session-%Y%m%d-%H%M%S")
+    return {lang: TranscriptWriter(folder, formats, TRANSCRIPT_BUFFER, fsync_interval=TRANSCRIPT_FSYNC_SECONDS, rotate_seconds=TRANSCRIPT_ROTATE_MINUTES * 60,
+                                   reorder_seconds=TRANSCRIPT_REORDER_SECONDS,
+                                   name=f"{name}.{lang}" if len(langs) > 1 else name, target=lang) for lang in langs}
+
+def start_caption_server(port=CAPTION_SERVER_PORT, host=CAPTION_SERVER_HOST):
+    global captions
+    if not port: return None
+    try:
+        captions = CaptionServer(host, port, CAPTION_CLIENT_BUFFER, CAPTION_HISTORY).start()
+    except OSError as e:
+        log.warning("Caption server could not listen on %s:%s: %s", host, port, e)
+    return captions
 
-def translation_thread():
-    translator = GoogleTranslator(source='en', target='fa')
+# Without translation the transcript still gets the English sentences
+def untranslated_thread(transcript):
     while True:
+        text, source, trace = translation_queue.get()
+        record(transcript, text, "", source, trace)
+        translation_queue.task_done()
+
+# fill=False leaves filling the fuzzy memory from disk to the caller (cache.start_fuzzy_fill())
+def open_translation_cache(path=TRANSLATION_CACHE_FILE, fuzzy_threshold=FUZZY_THRESHOLD, fill=True):
+    fuzzy = FuzzyMemory(fuzzy_threshold) if fuzzy_threshold else None
+    try:
+        cache = TranslationCache(path, TRANSLATION_CACHE_MEMORY, TRANSLATION_CACHE_DISK, fuzzy)
+        if fill: cache.start_fuzzy_fill()
+        return cache
+    except Exception as e:
+        log.warning("Translation cache %s unavailable (%s), using memory only", path, e)
+        return TranslationCache(None, TRANSLATION_CACHE_MEMORY, fuzzy=fuzzy)
+
+def make_translator(backends=TRANSLATOR_BACKENDS, http_url=TRANSLATE_HTTP_URL, google_url=GOOGLE_TRANSLATE_URL, target=TARGET_LANG):
+    factories = []
+    for name in backends:
+        if name == "google":
+            factories.append((name, lambda: GoogleWebTranslator(SOURCE_LANG, target, TRANSLATE_TIMEOUT, google_url)))
+        elif name == "http":
+            factories.append((name, lambda: HttpTranslator(http_url, SOURCE_LANG, target, TRANSLATE_TIMEOUT)))
+        elif name == "phrases":
+            path = get_resource_path(PHRASE_TABLE_FILE.format(lang=target))
+            if not os.path.exists(path):
+                log.warning("Phrase table %s not found, offline fallback disabled", path)
+                continue
+            table = PhraseTableTranslator(path)
+            factories.append((name, lambda: table))
+        else:
+            raise ValueError(f"Unknown translator backend: {name}")
+    return TranslatorChain(factories, TRANSLATE_RETRIES, breaker_threshold=BREAKER_THRESHOLD, breaker_reset=BREAKER_RESET_SECONDS)
+
+def record(transcript, text, trans, source, trace):
+    if transcript: transcript.add(source, text, trans, trace.get("stream_start", 0.0), trace.get("stream_end", 0.0), trace.get("segment", False))
+
+# Translates the sentences on `sentences` (translation_queue unless several languages share it, see
+# fanout_thread) into `target` and hands them to the overlay in order as final_<target>
+def translation_thread(translator, batch_size=TRANSLATION_BATCH_SIZE, batch_wait=TRANSLATION_BATCH_WAIT, cache=None, workers=TRANSLATION_WORKERS,
+                       transcript=None, target=TARGET_LANG, sentences=None):
+    sentences = sentences or translation_queue
+    stats = ThroughputCounter()
+    last_report = [time.time(), time.time()]  # last translation_stats message, last log line
+
+    def deliver(item):
+        text, trans, source, trace = item
+        latency.delivered(trace, source)
+        gui_queue.put(caption(f"final_{target}", trans, source))
+        record(transcript, text, trans, source, trace)
+        sentences.task_done()
+    delivery = OrderedDelivery(deliver)
+    # Keep a little work queued per worker; beyond that sentences wait on translation_queue and get batched
+    slots = threading.Semaphore(workers * 2)
+
+    def report():
+        now = time.time()
+        if now - last_report[0] < LAG_REPORT_INTERVAL and (stats.in_flight or not sentences.empty()): return
+        snapshot = stats.snapshot()
+        if cache: snapshot.update(cache.stats())
+        snapshot["backends"] = translator.stats()
+        snapshot["target"] = target
+        gui_queue.put(("translation_stats", snapshot))
+        last_report[0] = now
+        if now - last_report[1] >= STATS_LOG_INTERVAL:
+            log.info("Translation (%s): %s", target, snapshot)
+            last_report[1] = now
+
+    # items: (text, source label, latency trace)
+    def work(first_seq, items):
+        batch = [txt for txt, _, _ in items]
+        started = time.time()
+        for _, _, trace in items:
+            trace["translating"] = started
+            latency.span("translate_wait", trace, "final", "translating")
+        stats.begin()
+        requests_made = 0
+        missing = batch
         try:
-            txt = translation_queue.get()
-            trans = translator.translate(txt)
-            gui_queue.put(("final_fa", trans))
-        except: time.sleep(1)
+            translated = [cache.get(txt, SOURCE_LANG, target) if cache else None for txt in batch]
+            missing = [txt for txt, trans in zip(batch, translated) if trans is None]
+            if missing:
+                fresh, requests_made, cacheable = translate_batch(translator, missing)
+                fresh = iter(fresh)
+                for i, txt in enumerate(batch):
+                    if translated[i] is None:
+                        translated[i] = next(fresh)
+                        # Phrase-table output is a stopgap; the real translation replaces it once the service is back
+                        if cache and cacheable: cache.put(txt, SOURCE_LANG, target, translated[i])
+        except Exception as e:
+            # Every backend failed. Keep one final_<target> per sentence so the overlay can tell which sentence a translation belongs to
+            log.warning("Translation failed for %d sentence(s): %s", len(batch), e)
+            translated = [""] * len(batch)
+        finally:
+            stats.end(len(batch), requests_made, saved=0 if missing else 1)
+            slots.release()
+        report()
+        answered = time.time()
+        for i, trans in enumerate(translated):
+            text, source, trace = items[i]
+            trace["translated"] = answered
+            latency.span("translate", trace, "translating", "translated")
+            delivery.put(first_seq + i, (text, trans, source, trace))
+
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="translate")
+    seq = 0
+    while True:
+        batch = collect_batch(sentences, batch_size, batch_wait, size=lambda item: len(item[0]))
+        slots.acquire()
+        pool.submit(work, seq, batch)
+        seq += len(batch)
+
+# One recognizer, several audiences: every sentence goes to each language's own queue with its own
+# copy of the latency trace (tagged with the language, so its stages are also measured per language).
+# Each language is then batched, cached, translated and delivered in order independently, so a slow
+# or failing translation service for one language never holds up the others.
+def fanout_thread(queues):
+    while True:
+        text, source, trace = translation_queue.get()
+        for lang, sentences in queues.items(): sentences.put((text, source, dict(trace, lang=lang)))
+        translation_queue.task_done()
+
+# Starts a translation_thread per entry of translators ({language: TranslatorChain}); returns the
+# queues to join, in order, to wait until every sentence has been delivered in every language
+def start_translation(translators, batch_size=TRANSLATION_BATCH_SIZE, batch_wait=TRANSLATION_BATCH_WAIT, cache=None,
+                      workers=TRANSLATION_WORKERS, transcripts=None):
+    transcripts = transcripts or {}
+    if len(translators) == 1:
+        (lang, translator), = translators.items()
+        threading.Thread(target=translation_thread, args=(translator, batch_size, batch_wait, cache, workers, transcripts.get(lang)),
+                         kwargs={'target': lang}, daemon=True).start()
+        return [translation_queue]
+    queues = {lang: queue.Queue() for lang in translators}
+    for lang, translator in translators.items():
+        threading.Thread(target=translation_thread, args=(translator, batch_size, batch_wait, cache, workers, transcripts.get(lang)),
+                         kwargs={'target': lang, 'sentences': queues[lang]}, name=f"translation-{lang}", daemon=True).start()
+    threading.Thread(target=fanout_thread, args=(queues,), daemon=True).start()
+    return [translation_queue] + list(queues.values())
+
+def parse_langs(text):
+    langs = list(dict.fromkeys(lang.strip() for lang in text.split(",") if lang.strip()))
+    if not langs or SOURCE_LANG in langs: raise ValueError(f"Target languages must be a non-empty list without {SOURCE_LANG}: {text}")
+    return langs
+
+def start_speculator(translator, enabled=SPECULATIVE_TRANSLATION, source=None, target=TARGET_LANG):
+    speculator = SpeculativeTranslator(translator.translate, lambda utt, text: gui_queue.put(caption(f"partial_{target}", (utt, text), source)), SPECULATIVE_DEBOUNCE)
+    speculator.enabled = enabled
+    threading.Thread(target=speculator.run, daemon=True).start()
+    return speculator
+
+# --- HEADLESS MODE ---
+def percentiles(values):
+    if not values: return None
+    values = sorted(values)
+    pick = lambda p: round(values[min(len(values) - 1, int(p * len(values)))], 3)
+    return {"count": len(values), "mean": round(sum(values) / len(values), 3), "p50": pick(0.5), "p95": pick(0.95), "max": round(values[-1], 3)}
+
+def resolve_model_arg(model):
+    if model not in ('small', 'medium', 'large'):
+        return model
+    if model == 'small' and os.path.exists(get_bundled_model_path()):
+        return get_bundled_model_path()
+    return get_model_dir(model)
+
+# Streams for the --input specs: one per file, or one per channel with --split-channels.
+# Labels default to the file name when there is more than one stream.
+def headless_streams(args):
+    sources = {}
+    streams = []
+    for spec in args.input or ["-"]:
+        path, channel, label = parse_stream(spec)
+        if path not in sources:
+            sources[path] = FileAudioSource(path, speed=args.speed, fmt=args.format, samplerate=args.rate, channels=args.channels)
+        src = sources[path]
+        split = args.split_channels and channel is None and src.channels > 1
+        for ch in (range(src.channels) if split else [channel]):
+            streams.append((src, ch, f"{label}#{ch}" if split and label else label))
+    if len(streams) > 1:
+        streams = [(src, ch, label or os.path.basename(src.path) + (f"#{ch}" if ch is not None else "")) for src, ch, label in streams]
+    return streams, list(sources.values())
+
+def run_headless(args):
+    model_path = resolve_model_arg(args.model)
+    if not os.path.exists(find_model_path(model_path)):
+        print(f"Model not found: {model_path} (run the GUI once to download it)", file=sys.stderr)
+        return 1
+    streams, sources = headless_streams(args)
+    labels = [label for _, _, label in streams]
+    if len(set(labels)) != len(labels):
+        print(f"Stream labels must be unique: {labels}", file=sys.stderr)
+        return 1
+    audio_clock = lambda: max(src.audio_seconds for src in sources)
+
+    out = sys.stdout
+    start = time.time()
+    def emit(kind, **fields):
+        event = {"event": kind, "wall": round(time.time() - start, 3), "audio": round(audio_clock(), 3)}
+        event.update(fields)
+        out.write(json.dumps(event, ensure_ascii=False) + "\n")
+        out.flush()
+
+    # Replaying as fast as possible must not drop audio, so the reader waits for the recognizer
+    overflow = args.overflow or ("block" if args.speed <= 0 else OVERFLOW_POLICY)
+    try:
+        langs = parse_langs(args.target_langs)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    translators = {} if args.no_translate else {lang: make_translator(args.translators.split(","), args.translate_url, args.google_url, lang) for lang in langs}
+    translator = translators.get(langs[0])
+    speculators = [start_speculator(translator, True, label, langs[0]) for label in labels] if args.speculative and translator else None
+    tiers = None
+    if args.adaptive_model and args.model in MODEL_TIERS:
+        tiers = ModelTiers(args.model, True, lambda tier, reason: gui_queue.put(("model", {"tier": tier, "reason": reason})), args.model_service)
+    threading.Thread(target=vosk_thread, args=(streams, model_path), daemon=True,
+                     kwargs={'buffer_seconds': args.buffer_seconds, 'overflow': overflow, 'use_vad': args.vad, 'speculators': speculators,
+                             'partials': not args.final_only or speculators is not None, 'partial_interval': args.partial_interval,
+                             'service': args.model_service, 'isolate': args.process, 'tiers': tiers, 'segment': not args.no_segment}).start()
+    start_export(latency, args.latency_interval, args.latency_jsonl, args.latency_prom)
+    transcripts = open_transcripts(args.transcript_dir, args.transcript_formats.split(","), langs)
+    start_caption_server(args.caption_port, args.caption_host)
+    pending = [translation_queue]
+    if translators:
+        cache = None if args.no_cache else open_translation_cache(args.cache_file, args.fuzzy_threshold)
+        pending = start_translation(translators, args.batch_size, args.batch_wait, cache, args.translation_workers, transcripts)
+    elif transcripts:
+        threading.Thread(target=untranslated_thread, args=(transcripts[langs[0]],), daemon=True).start()
+
+    # Text events carry a string, status events (lag, cpu, vad, translation_stats) a dict,
+    # partial_<lang> an (utterance, text) pair. Events from labelled streams have a "source" field and
+    # their status is summarized per source (translation_stats per language when there are several).
+    status = {}
+    failed = False
+    utterance_start = {}  # (source, utterance) -> wall time of its first English text
+    first_text = {lang: {} for lang in langs}  # language -> (source, utterance) -> wall time of its first translated text
+    finals = {}  # (kind, source) -> count
+    def handle(kind, payload, source=None):
+        nonlocal failed
+        now = time.time()
+        tag = {"source": source} if source is not None else {}
+        if isinstance(payload, dict):
+            key = payload.get("target") if kind == "translation_stats" and len(langs) > 1 else source
+            if key is None: status[kind] = payload
+            else: status.setdefault(kind, {})[key] = payload
+            emit(kind, **tag, **payload)
+            return
+        if captions: captions.publish((kind, payload, source))
+        stage, _, lang = kind.partition("_")
+        if stage == "partial" and lang in first_text:
+            first_text[lang].setdefault((source, payload[0]), now)
+            emit(kind, **tag, utterance=payload[0], text=payload[1])
+            return
+        if payload.startswith("Error: "): failed = True
+        # Segments and finals are both translated one by one; an empty final only ends a segmented line
+        if kind in ("partial_en", "segment_en", "final_en"): utterance_start.setdefault((source, finals.get(("final_en", source), 0)), now)
+        if stage == "final" and lang in first_text:
+            latency.rendered(source, lang)  # printing is this mode's render
+            if payload: first_text[lang].setdefault((source, finals.get((kind, source), 0)), now)
+            finals[kind, source] = finals.get((kind, source), 0) + 1
+        if kind in ("segment_en", "final_en") and payload: finals["final_en", source] = finals.get(("final_en", source), 0) + 1
+        emit(kind, **tag, text=payload)
 
-def main():
+    while True:
+        msg = gui_queue.get()
+        if msg[0] == "eof": break
+        handle(*msg)
+    decode_time = time.time() - start
+
+    if args.no_translate and not transcripts:
+        while not translation_queue.empty(): translation_queue.get_nowait()
+    else:
+        for sentences in pending: sentences.join()
+        while not gui_queue.empty(): handle(*gui_queue.get_nowait())
+    for lang, transcript in transcripts.items():
+        transcript.close()
+        if len(transcripts) == 1: status["transcript"] = transcript.stats()
+        else: status.setdefault("transcript", {})[lang] = transcript.stats()
+    if captions: status["captions"] = captions.stats()
+
+    audio_seconds = audio_clock()
+    first = {lang: percentiles([first_text[lang][u] - t for u, t in utterance_start.items() if u in first_text[lang]]) for lang in langs}
+    emit("summary", audio_seconds=round(audio_seconds, 3), decode_seconds=round(decode_time, 3),
+         total_seconds=round(time.time() - start, 3), streams=len(streams),
+         rtf=round(decode_time / audio_seconds, 4) if audio_seconds else None,
+         **{f"time_to_first_{lang}": first[lang] for lang in langs},
+         latency=latency.snapshot(), **status)
+    return 1 if failed else 0
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Real-Time System Audio Translator")
+    parser.add_argument("--quick", action="store_true", help="Skip the model and device windows and reuse the last choices")
+    parser.add_argument("--headless", action="store_true", help="Run without any window, reading audio from --input and printing JSON lines")
+    parser.add_argument("--input", action="append", help="WAV or raw 16-bit PCM file, or - for stdin (headless). Repeat for several streams; "
+                        "path#channel decodes one channel, path=label names the stream")
+    parser.add_argument("--split-channels", action="store_true", help="Decode every channel of a multichannel input as its own stream")
+    parser.add_argument("--format", choices=["auto", "wav", "raw"], default="auto", help="Input format (auto: by file extension)")
+    parser.add_argument("--rate", type=int, default=16000, help="Sample rate of raw PCM input")
+    parser.add_argument("--channels", type=int, default=1, help="Channel count of raw PCM input")
+    parser.add_argument("--speed", type=float, default=1.0, help="Playback speed: 1 = real time, 0 = as fast as possible")
+    parser.add_argument("--model", default="small", help="small, medium, large or a path to a Vosk model")
+    parser.add_argument("--model-service", default=MODEL_SERVICE_ADDRESS, help="host:port of a running model_service.py to decode in")
+    parser.add_argument("--process", action="store_true", default=RECOGNIZER_PROCESS, help="Decode in a supervised child process fed through shared memory")
+    parser.add_argument("--no-translate", action="store_true", help="Only run recognition")
+    parser.add_argument("--buffer-seconds", type=float, default=AUDIO_BUFFER_SECONDS, help="Audio backlog kept before the overflow policy applies")
+    parser.add_argument("--batch-size", type=int, default=TRANSLATION_BATCH_SIZE, help="Most sentences sent in one translation request")
+    parser.add_argument("--batch-wait", type=float, default=TRANSLATION_BATCH_WAIT, help="Seconds to wait for more sentences before sending a batch")
+    parser.add_argument("--target-langs", default=",".join(TARGET_LANGS),
+                        help="Comma-separated languages to translate every sentence into; the first one gets --speculative translations")
+    parser.add_argument("--translators", default=",".join(TRANSLATOR_BACKENDS), help="Comma-separated backends tried in order: google, http, phrases")
+    parser.add_argument("--translate-url", default=TRANSLATE_HTTP_URL, help="Base URL of the LibreTranslate-style server for the http backend")
+    parser.add_argument("--google-url", default=GOOGLE_TRANSLATE_URL, help="Google endpoint (point it at translate_stub_server.py for load tests)")
+    parser.add_argument("--translation-workers", type=int, default=TRANSLATION_WORKERS, help="Concurrent translation requests")
+    parser.add_argument("--speculative", action="store_true", help="Translate stable parts of partial results before the sentence ends")
+    parser.add_argument("--cache-file", default=TRANSLATION_CACHE_FILE, help="SQLite file that keeps translations between runs")
+    parser.add_argument("--no-cache", action="store_true", help="Always ask the translator, even for repeated sentences")
+    parser.add_argument("--fuzzy-threshold", type=float, default=FUZZY_THRESHOLD,
+                        help="Reuse translations of sentences at least this similar (0-1); 0 turns near-duplicate reuse off")
+    parser.add_argument("--final-only", action="store_true", help="Only print final results; partial results are not computed")
+    parser.add_argument("--partial-interval", type=float, default=PARTIAL_MIN_INTERVAL, help="Minimum seconds between partial results")
+    parser.add_argument("--transcript-dir", default=TRANSCRIPT_DIR, help="Record the session as SRT/VTT/JSONL files in this folder")
+    parser.add_argument("--transcript-formats", default=",".join(TRANSCRIPT_FORMATS), help="Comma-separated: srt, vtt, jsonl")
+    parser.add_argument("--caption-port", type=int, default=CAPTION_SERVER_PORT, help="Serve captions over WebSocket/SSE and a caption page on this port")
+    parser.add_argument("--caption-host", default=CAPTION_SERVER_HOST, help="Address for --caption-port (0.0.0.0 for the LAN)")
+    parser.add_argument("--no-segment", action="store_true", help="Translate whole utterances only, never chunks of them")
+    parser.add_argument("--adaptive-model", action="store_true", help="Step down to a lighter installed model while the recognizer falls behind (--model small/medium/large)")
+    parser.add_argument("--latency-jsonl", default=LATENCY_JSONL_FILE, help="Append stage latency percentiles to this JSONL file")
+    parser.add_argument("--latency-prom", default=LATENCY_PROM_FILE, help="Keep stage latency histograms in this Prometheus text file")
+    parser.add_argument("--latency-interval", type=float, default=LATENCY_EXPORT_INTERVAL, help="Seconds between latency exports")
+    parser.add_argument("--vad", action=argparse.BooleanOptionalAction, default=VAD_ENABLED, help="Skip silence and music instead of decoding every block")
+    parser.add_argument("--overflow", choices=OVERFLOW_POLICIES, help=f"What to do when the recognizer falls behind (default: block at --speed 0, else {OVERFLOW_POLICY})")
+    return parser.parse_args(argv)
+
+# Model selector plus download if needed; returns (choice, model path) or None if the user gave up
+def choose_model(timer):
     selector = ModelSelectorGUI()
-    if not selector.choice: return 
+    timer.mark("model selector", user=True)
+    if not selector.choice: return None
     
     selected_model_path = get_model_dir(selector.choice)
 
@@ -572,23 +1667,79 @@ def main():
     elif selector.choice == 'large':
         if not is_model_installed('large'):
             DownloadGUI(MODEL_LARGE_URL, 'large')
+    timer.mark("model download", user=True)
 
-    if not os.path.exists(selected_model_path) and selector.choice != 'small': return
+    if not os.path.exists(selected_model_path) and selector.choice != 'small': return None
+    return selector.choice, selected_model_path
 
-    audio_sel = AudioSelectorGUI()
-    if audio_sel.device_id is None: return
-
-    device_info = sd.query_devices(audio_sel.device_id, 'input')
-    samplerate = int(device_info['default_samplerate'])
-    
-    t1 = threading.Thread(target=vosk_thread, args=(audio_sel.device_id, samplerate, selected_model_path), daemon=True)
+def main():
+    args = parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    if args.headless:
+        sys.exit(run_headless(args))
+
+    timer = StartupTimer()
+    timer.mark("imports")
+    profile = load_profile()
+    choice = profile.get("model") if args.quick else None
+    # --quick trusts the remembered model if its folder is still there (one stat, no directory scan)
+    if choice and os.path.exists(os.path.join(find_model_path(resolve_model_arg(choice)), "conf")):
+        selected_model_path = resolve_model_arg(choice)
+    else:
+        if args.quick: log.info("No usable remembered model, showing the model selector")
+        chosen = choose_model(timer)
+        if not chosen: return
+        choice, selected_model_path = chosen
+    timer.mark("model")
+
+    # Load the model while the user is still picking a device (a recognizer process loads its own)
+    if not MODEL_SERVICE_ADDRESS and not RECOGNIZER_PROCESS: preload_model(selected_model_path)
+
+    streams = None
+    if CAPTURE_STREAMS:
+        streams = [parse_stream(spec) for spec in CAPTURE_STREAMS]
+        streams = [(int(dev), ch, label) for dev, ch, label in streams]
+    else:
+        remembered = resolve_profile_streams(profile) or []
+        timer.mark("devices")
+        if args.quick and remembered:
+            streams = remembered
+        else:
+            audio_sel = AudioSelectorGUI(selected=[dev for dev, _, _ in remembered])
+            timer.mark("device selector", user=True)
+            if audio_sel.device_id is None: return
+            streams = audio_sel.streams
+    profile.update(model=choice, streams=profile_streams(streams))
+    save_profile(profile)
+
+    langs = parse_langs(args.target_langs)
+    translators = {lang: make_translator(target=lang) for lang in langs}
+    speculators = [start_speculator(translators[langs[0]], source=label, target=langs[0]) for _, _, label in streams]
+    timer.mark("translator")
+    tiers = None
+    if choice in MODEL_TIERS:
+        tiers = ModelTiers(choice, profile.get("overlay", {}).get("adaptive_model", ADAPTIVE_MODEL),
+                           lambda tier, reason: gui_queue.put(("model", {"tier": tier, "reason": reason})))
+    t1 = threading.Thread(target=vosk_thread, args=(streams, selected_model_path), kwargs={'speculators': speculators, 'tiers': tiers}, daemon=True)
     t1.start()
-    t2 = threading.Thread(target=translation_thread, daemon=True)
-    t2.start()
+    transcripts = open_transcripts(args.transcript_dir, args.transcript_formats.split(","), langs)
+    start_caption_server(args.caption_port, args.caption_host)
+    cache = open_translation_cache(fill=False)
+    start_translation(translators, cache=cache, transcripts=transcripts)
+    start_export(latency, args.latency_interval, args.latency_jsonl, args.latency_prom)
+    timer.mark("workers")
 
     root = tk.Tk()
-    SubtitleOverlay(root)
+    def remember(settings):
+        profile["overlay"] = settings
+        save_profile(profile)
+    SubtitleOverlay(root, speculators, profile.get("overlay"), remember, tiers, langs)
+    timer.mark("overlay")
+    root.after_idle(lambda: (timer.mark("first frame"), timer.report()))
+    root.after_idle(cache.start_fuzzy_fill)  # only once the overlay is drawn: it takes seconds of CPU
     root.mainloop()
+    for transcript in transcripts.values(): transcript.close()
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # the recognizer process in PyInstaller builds
     main()
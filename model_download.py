@@ -0,0 +1,326 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import struct
+import sys
+import threading
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+
+# Downloads a model zip in byte ranges over several keep-alive connections, verifies every chunk
+# and the whole file, and extracts zip entries while the rest is still downloading.
+#
+# The zip is preallocated at its full size and chunks are written in place. Next to it, a state
+# file records the SHA-256 of every chunk that finished. On resume those chunks are hashed again
+# and only the ones that still match are kept. The state is thrown away if the server's file changed.
+#
+# A manifest (see `python model_download.py manifest`) adds the expected hashes:
+#   {"url": ..., "size": n, "sha256": whole file, "chunk_size": n, "chunks": [sha256 per chunk]}
+
+CHUNK_SIZE = 8 * 1024 * 1024
+CONNECTIONS = 4
+RETRIES = 3
+HEADERS = {'User-Agent': 'Mozilla/5.0'}
+EOCD_SIGNATURE = b"PK\x05\x06"
+
+class DownloadError(Exception):
+    pass
+
+def sha256_file(path, start=0, length=None, block=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = length
+        while remaining is None or remaining > 0:
+            data = f.read(block if remaining is None else min(block, remaining))
+            if not data: break
+            digest.update(data)
+            if remaining is not None: remaining -= len(data)
+    return digest.hexdigest()
+
+def build_manifest(path, url=None, chunk_size=CHUNK_SIZE):
+    size = os.path.getsize(path)
+    chunks = [sha256_file(path, start, chunk_size) for start in range(0, size, chunk_size)]
+    return {"url": url, "size": size, "sha256": sha256_file(path), "chunk_size": chunk_size, "chunks": chunks}
+
+# Manifests file: {url: manifest}; missing file or URL means no expected hashes
+def load_manifest(path, url):
+    if not path or not os.path.exists(path): return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f).get(url)
+
+class ModelDownloader:
+    def __init__(self, url, target_dir, manifest=None, connections=CONNECTIONS, chunk_size=CHUNK_SIZE, temp_path="model_temp.zip",
+                 retries=RETRIES, timeout=20, on_progress=None, on_status=None):
+        self.url = url
+        self.target_dir = target_dir
+        self.manifest = manifest
+        self.connections = connections
+        self.chunk_size = manifest["chunk_size"] if manifest else chunk_size
+        self.temp_path = temp_path
+        self.state_path = temp_path + ".json"
+        self.staging_dir = target_dir + ".partial"
+        self.retries = retries
+        self.timeout = timeout
+        self.on_progress = on_progress or (lambda done, total, rate: None)
+        self.on_status = on_status or (lambda text: None)
+
+        self.session = requests.Session()
+        self.session.headers.update(HEADERS)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=connections)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.cond = threading.Condition()
+        self.done = {}  # chunk index -> sha256
+        self.failed = None
+        self.downloaded = 0
+        self.fetched = 0  # bytes actually transferred in this run
+        self.rate_window = deque()  # (time, fetched)
+        self.started = time.time()
+
+    # --- planning ---
+    def probe(self):
+        # A one-byte range tells us the size, the validator and whether ranges work at all
+        with self.session.get(self.url, headers={"Range": "bytes=0-0"}, stream=True, timeout=self.timeout) as r:
+            r.raise_for_status()
+            self.ranges = r.status_code == 206
+            if self.ranges:
+                self.size = int(r.headers["Content-Range"].rsplit("/", 1)[1])
+            else:
+                self.size = int(r.headers.get("Content-Length", 0))
+            self.validator = r.headers.get("ETag") or r.headers.get("Last-Modified")
+        if not self.size: raise DownloadError("Server did not report the file size")
+        if self.manifest and self.manifest["size"] != self.size:
+            raise DownloadError(f"Server file is {self.size} bytes, manifest says {self.manifest['size']}")
+        if not self.ranges: self.chunk_size = self.size  # one connection, no resume
+        self.chunk_count = (self.size + self.chunk_size - 1) // self.chunk_size
+
+    def span(self, index):
+        start = index * self.chunk_size
+        return start, min(start + self.chunk_size, self.size)
+
+    def identity(self):
+        return {"url": self.url, "size": self.size, "validator": self.validator, "chunk_size": self.chunk_size}
+
+    # Keeps only chunks recorded by an earlier run of the same file that still hash the same on disk
+    def resume(self):
+        state = None
+        if os.path.exists(self.state_path) and os.path.exists(self.temp_path) and os.path.getsize(self.temp_path) == self.size:
+            try:
+                with open(self.state_path, encoding="utf-8") as f: state = json.load(f)
+            except (OSError, ValueError):
+                state = None
+        if not state or state.get("identity") != self.identity():
+            with open(self.temp_path, "wb") as f: f.truncate(self.size)
+            self.save_state()
+            return
+        self.on_status("Verifying partial download...")
+        for index, sha in state["chunks"].items():
+            index = int(index)
+            start, end = self.span(index)
+            expected = self.manifest["chunks"][index] if self.manifest else sha
+            if sha == expected and sha256_file(self.temp_path, start, end - start) == sha:
+                self.done[index] = sha
+                self.downloaded += end - start
+        self.save_state()
+
+    def save_state(self):
+        tmp = self.state_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"identity": self.identity(), "chunks": {str(i): sha for i, sha in self.done.items()}}, f)
+        os.replace(tmp, self.state_path)
+
+    # --- transfer ---
+    def add_progress(self, n):
+        with self.cond:
+            self.downloaded += n
+            self.fetched += n
+            now = time.time()
+            self.rate_window.append((now, self.fetched))
+            while len(self.rate_window) > 2 and now - self.rate_window[0][0] > 3.0: self.rate_window.popleft()
+            t0, f0 = self.rate_window[0]
+            rate = (self.fetched - f0) / (now - t0) if now > t0 else 0.0
+            downloaded = self.downloaded
+        self.on_progress(downloaded, self.size, rate)
+
+    def fetch(self, index):
+        start, end = self.span(index)
+        for attempt in range(self.retries + 1):
+            if self.failed: return
+            pos = start
+            try:
+                headers = {"Range": f"bytes={start}-{end - 1}"} if self.ranges else {}
+                with self.session.get(self.url, headers=headers, stream=True, timeout=self.timeout) as r:
+                    r.raise_for_status()
+                    if self.ranges and r.status_code != 206: raise DownloadError("Server ignored the byte range")
+                    digest = hashlib.sha256()
+                    with open(self.temp_path, "r+b") as f:
+                        f.seek(start)
+                        for block in r.iter_content(256 * 1024):
+                            if pos + len(block) > end: raise DownloadError(f"Chunk {index} is longer than requested")
+                            f.write(block)
+                            digest.update(block)
+                            pos += len(block)
+                            self.add_progress(len(block))
+                if pos != end: raise DownloadError(f"Chunk {index} is short ({pos - start} of {end - start} bytes)")
+                sha = digest.hexdigest()
+                if self.manifest and sha != self.manifest["chunks"][index]:
+                    raise DownloadError(f"Chunk {index} failed its checksum")
+                with self.cond:
+                    self.done[index] = sha
+                    self.save_state()
+                    self.cond.notify_all()
+                return
+            except (requests.RequestException, DownloadError) as e:
+                self.add_progress(start - pos)
+                if attempt == self.retries:
+                    with self.cond:
+                        self.failed = self.failed or e
+                        self.cond.notify_all()
+                    return
+                time.sleep(min(5.0, 0.5 * 2 ** attempt))
+
+    def covered(self, start, end):
+        return all(i in self.done for i in range(start // self.chunk_size, (end - 1) // self.chunk_size + 1))
+
+    def wait_for(self, start, end):
+        with self.cond:
+            while not self.covered(start, end):
+                if self.failed: raise self.failed
+                self.cond.wait()
+
+    # --- extraction ---
+    # Start of the central directory, read from the end record in the last chunk (None for zip64)
+    def central_directory_offset(self):
+        start, end = self.span(self.chunk_count - 1)
+        with open(self.temp_path, "rb") as f:
+            f.seek(start)
+            tail = f.read(end - start)
+        pos = tail.rfind(EOCD_SIGNATURE)
+        if pos < 0 or pos + 22 > len(tail): return None
+        offset = struct.unpack("<I", tail[pos + 16:pos + 20])[0]
+        return None if offset == 0xFFFFFFFF else offset
+
+    # Forgets and downloads again the chunks under a byte range that turned out to be corrupt
+    def refetch(self, start, end):
+        with self.cond:
+            for i in range(start // self.chunk_size, (end - 1) // self.chunk_size + 1):
+                if self.done.pop(i, None):
+                    chunk_start, chunk_end = self.span(i)
+                    self.downloaded -= chunk_end - chunk_start
+            self.save_state()
+        for i in range(start // self.chunk_size, (end - 1) // self.chunk_size + 1): self.fetch(i)
+
+    # Runs action once the byte range is on disk; without a manifest, a corrupt chunk only shows up
+    # as a bad zip header or CRC, so the range is downloaded again and the action retried
+    def when_ready(self, start, end, action):
+        for attempt in range(self.retries + 1):
+            self.wait_for(start, end)
+            try:
+                return action()
+            except zipfile.BadZipFile as e:
+                if attempt == self.retries: raise DownloadError(f"Corrupt download: {e}")
+                self.refetch(start, end)
+
+    # Extracts entries in file order, each as soon as all of its bytes are on disk
+    def extract(self, cd_offset):
+        with self.when_ready(cd_offset, self.size, lambda: zipfile.ZipFile(self.temp_path)) as zf:
+            infos = sorted(zf.infolist(), key=lambda info: info.header_offset)
+            bounds = [info.header_offset for info in infos[1:]] + [cd_offset]
+            for info, end in zip(infos, bounds):
+                self.when_ready(info.header_offset, end, lambda: zf.extract(info, self.staging_dir))  # checks each entry's CRC-32
+
+    def run(self):
+        self.on_status("Connecting...")
+        self.probe()
+        self.resume()
+        if os.path.exists(self.staging_dir): shutil.rmtree(self.staging_dir)
+        self.on_progress(self.downloaded, self.size, 0.0)
+
+        self.on_status("Downloading...")
+        last = self.chunk_count - 1
+        # The last chunk holds the zip's directory, which extraction needs before anything else
+        if last not in self.done: self.fetch(last)
+        if self.failed: raise self.failed
+        cd_offset = self.central_directory_offset()
+        pending = [i for i in range(self.chunk_count) if i not in self.done]
+        if cd_offset is not None:
+            first_cd = cd_offset // self.chunk_size
+            pending.sort(key=lambda i: (i < first_cd, i))  # rest of the directory first, then in file order
+        extractor = None
+        if cd_offset is not None:
+            extractor = ThreadPoolExecutor(max_workers=1).submit(self.extract, cd_offset)
+        with ThreadPoolExecutor(max_workers=self.connections, thread_name_prefix="download") as pool:
+            for _ in pool.map(self.fetch, pending): pass
+        if self.failed: raise self.failed
+
+        if self.manifest:
+            self.on_status("Verifying...")
+            if sha256_file(self.temp_path) != self.manifest["sha256"]:
+                os.remove(self.state_path)
+                raise DownloadError("Downloaded file failed its checksum")
+        self.on_status("Extracting... (Do not close)")
+        if extractor: extractor.result()
+        else:
+            with zipfile.ZipFile(self.temp_path) as zf: zf.extractall(self.staging_dir)
+        self.install()
+        elapsed = time.time() - self.started
+        return {"bytes": self.size, "fetched": self.fetched, "seconds": round(elapsed, 3),
+                "mb_per_second": round(self.fetched / elapsed / 1e6, 2) if elapsed else None}
+
+    # Moves the extracted model (the zip's single top folder, if it has one) into place
+    def install(self):
+        entries = os.listdir(self.staging_dir)
+        source = self.staging_dir
+        if len(entries) == 1 and os.path.isdir(os.path.join(self.staging_dir, entries[0])):
+            source = os.path.join(self.staging_dir, entries[0])
+        if os.path.exists(self.target_dir): shutil.rmtree(self.target_dir)
+        os.rename(source, self.target_dir)
+        if os.path.exists(self.staging_dir): shutil.rmtree(self.staging_dir)
+        os.remove(self.temp_path)
+        os.remove(self.state_path)
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel, verified, resumable model downloads")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("fetch", help="Download and extract a model zip")
+    p.add_argument("url")
+    p.add_argument("target_dir")
+    p.add_argument("--manifest", help="Manifests file ({url: manifest}) with the expected checksums")
+    p.add_argument("--connections", type=int, default=CONNECTIONS)
+    p.add_argument("--chunk-mb", type=float, default=CHUNK_SIZE / 1024 / 1024)
+    p.add_argument("--temp", default="model_temp.zip")
+
+    p = sub.add_parser("manifest", help="Print the manifest for a zip file")
+    p.add_argument("zip")
+    p.add_argument("--url")
+    p.add_argument("--chunk-mb", type=float, default=CHUNK_SIZE / 1024 / 1024)
+    args = parser.parse_args()
+
+    if args.command == "manifest":
+        json.dump(build_manifest(args.zip, args.url, int(args.chunk_mb * 1024 * 1024)), sys.stdout, indent=2)
+        print()
+        return
+    last_print = [0.0]
+    def progress(done, total, rate):
+        if time.time() - last_print[0] < 0.5 and done < total: return
+        last_print[0] = time.time()
+        print(f"\r{done / 1e6:.1f} / {total / 1e6:.1f} MB  {rate / 1e6:.2f} MB/s   ", end="", file=sys.stderr, flush=True)
+    downloader = ModelDownloader(args.url, args.target_dir, load_manifest(args.manifest, args.url), args.connections,
+                                 int(args.chunk_mb * 1024 * 1024), args.temp, on_progress=progress,
+                                 on_status=lambda text: print(f"\n{text}", file=sys.stderr, flush=True))
+    result = downloader.run()
+    print(file=sys.stderr)
+    json.dump(result, sys.stdout)
+    print()
+
+if __name__ == "__main__":
+    main()
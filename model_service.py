@@ -0,0 +1,167 @@
+import argparse
+import json
+import os
+import socket
+import socketserver
+import struct
+import threading
+
+# Long-lived process that keeps Vosk models in memory and runs recognizers for app instances,
+# so restarting the app or opening several overlays does not reload gigabytes from disk.
+#
+# Protocol over TCP (localhost): every request is a 1-byte op, a 4-byte big-endian length and a
+# payload; every reply is a 4-byte length and a UTF-8 JSON payload.
+#   O {"model": path, "samplerate": n}  open a recognizer -> {"ok": true} or {"error": "..."}
+#   A <pcm bytes>                        AcceptWaveform   -> {"final": bool, "result": "<json>"}
+#   P                                    PartialResult    -> {"result": "<json>"}
+#   F                                    FinalResult      -> {"result": "<json>"}
+#   R                                    Reset            -> {}
+
+DEFAULT_ADDRESS = "127.0.0.1:2700"
+
+def parse_address(address):
+    host, _, port = address.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+def recv_exact(sock, n):
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk: raise ConnectionError("Connection closed")
+        buf += chunk
+    return bytes(buf)
+
+# --- CLIENT ---
+# Drop-in stand-in for vosk.KaldiRecognizer that decodes inside the model service
+class RemoteRecognizer:
+    def __init__(self, address, model_path, samplerate, timeout=30):
+        self.sock = socket.create_connection(parse_address(address), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        # Loading a large model for the first time can take a while
+        self.sock.settimeout(None)
+        reply = self.call(b"O", json.dumps({"model": model_path, "samplerate": samplerate}).encode())
+        if "error" in reply:
+            self.sock.close()
+            raise RuntimeError(f"Model service: {reply['error']}")
+        self.last_result = None
+
+    def call(self, op, payload=b""):
+        self.sock.sendall(op + struct.pack(">I", len(payload)) + payload)
+        size = struct.unpack(">I", recv_exact(self.sock, 4))[0]
+        return json.loads(recv_exact(self.sock, size))
+
+    def AcceptWaveform(self, data):
+        reply = self.call(b"A", bytes(data))
+        self.last_result = reply["result"] if reply["final"] else None
+        return reply["final"]
+
+    def Result(self):
+        return self.last_result or self.call(b"F")["result"]
+
+    def PartialResult(self):
+        return self.call(b"P")["result"]
+
+    def FinalResult(self):
+        return self.call(b"F")["result"]
+
+    def Reset(self):
+        self.call(b"R")
+
+    def close(self):
+        self.sock.close()
+
+# --- SERVER ---
+class ModelStore:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.models = {}
+        self.loading = {}
+
+    def get(self, path):
+        import vosk
+        from main import find_model_path, resolve_model_arg
+        path = os.path.abspath(find_model_path(resolve_model_arg(path)))
+        with self.lock:
+            if path in self.models: return self.models[path]
+            event = self.loading.get(path)
+            if event is None:
+                event = self.loading[path] = threading.Event()
+                owner = True
+            else:
+                owner = False
+        if owner:
+            try:
+                print(f"Loading model {path}...", flush=True)
+                model = vosk.Model(path)
+                with self.lock: self.models[path] = model
+                print(f"Model ready: {path}", flush=True)
+            finally:
+                with self.lock: del self.loading[path]
+                event.set()
+        else:
+            event.wait()
+        with self.lock:
+            if path not in self.models: raise RuntimeError(f"Could not load model {path}")
+            return self.models[path]
+
+class Handler(socketserver.BaseRequestHandler):
+    def reply(self, obj):
+        data = json.dumps(obj).encode()
+        self.request.sendall(struct.pack(">I", len(data)) + data)
+
+    def handle(self):
+        import vosk
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        rec = None
+        try:
+            while True:
+                op = recv_exact(self.request, 1)
+                payload = recv_exact(self.request, struct.unpack(">I", recv_exact(self.request, 4))[0])
+                if op == b"O":
+                    header = json.loads(payload)
+                    try:
+                        rec = vosk.KaldiRecognizer(self.server.store.get(header["model"]), header["samplerate"])
+                        self.reply({"ok": True})
+                    except Exception as e:
+                        self.reply({"error": str(e)})
+                elif rec is None:
+                    self.reply({"error": "No recognizer opened"})
+                elif op == b"A":
+                    final = bool(rec.AcceptWaveform(payload))
+                    self.reply({"final": final, "result": rec.Result() if final else None})
+                elif op == b"P":
+                    self.reply({"result": rec.PartialResult()})
+                elif op == b"F":
+                    self.reply({"result": rec.FinalResult()})
+                elif op == b"R":
+                    rec.Reset()
+                    self.reply({})
+                else:
+                    self.reply({"error": f"Unknown op {op!r}"})
+        except (ConnectionError, OSError):
+            pass
+
+class ModelServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+def main():
+    parser = argparse.ArgumentParser(description="Keep Vosk models loaded and serve recognizers to translator instances")
+    parser.add_argument("--address", default=DEFAULT_ADDRESS, help="host:port to listen on (keep it on localhost)")
+    parser.add_argument("--preload", nargs="*", default=[], help="small, medium, large or model folders to load at startup")
+    args = parser.parse_args()
+
+    import vosk
+    vosk.SetLogLevel(-1)
+    server = ModelServer(parse_address(args.address), Handler)
+    server.store = ModelStore()
+    for path in args.preload:
+        threading.Thread(target=server.store.get, args=(path,), daemon=True).start()
+    print(f"Model service listening on {args.address}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
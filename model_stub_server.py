@@ -0,0 +1,119 @@
+import argparse
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlparse
+
+# Local stand-in for the model download server, for testing model_download.py without internet.
+# Serves the files in a folder with single byte ranges, ETags and keep-alive, like the real host.
+# Can throttle each connection, cut responses short, corrupt bytes or ignore ranges.
+
+class StubState:
+    def __init__(self, args):
+        self.args = args
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.bytes_sent = 0
+        self.faults = 0
+
+    def count(self, sent, fault=False):
+        with self.lock:
+            self.requests += 1
+            self.bytes_sent += sent
+            if fault: self.faults += 1
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        state = self.server.state
+        args = state.args
+        path = os.path.join(args.root, os.path.basename(unquote(urlparse(self.path).path)))
+        if not os.path.isfile(path):
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        size = os.path.getsize(path)
+        start, end = 0, size
+        match = re.fullmatch(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+        ranged = bool(match) and not args.no_ranges
+        if ranged:
+            start = int(match.group(1))
+            end = min(size, int(match.group(2)) + 1) if match.group(2) else size
+            if start >= size:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{size}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+        time.sleep(args.latency)
+        self.send_response(206 if ranged else 200)
+        if ranged: self.send_header("Content-Range", f"bytes {start}-{end - 1}/{size}")
+        self.send_header("Content-Length", str(end - start))
+        self.send_header("Accept-Ranges", "none" if args.no_ranges else "bytes")
+        self.send_header("ETag", f'"{int(os.path.getmtime(path))}-{size}"')
+        self.send_header("Content-Type", "application/zip")
+        self.end_headers()
+
+        truncate = random.random() < args.truncate_rate
+        corrupt = random.random() < args.corrupt_rate
+        stop = start + (end - start) // 2 if truncate else end
+        sent = 0
+        began = time.time()
+        with open(path, "rb") as f:
+            f.seek(start)
+            while start + sent < stop:
+                data = f.read(min(64 * 1024, stop - start - sent))
+                if corrupt and sent == 0: data = bytes([data[0] ^ 0xFF]) + data[1:]
+                try:
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    break
+                sent += len(data)
+                if args.bandwidth:
+                    delay = began + sent / (args.bandwidth * 1024) - time.time()
+                    if delay > 0: time.sleep(delay)
+        state.count(sent, truncate or corrupt)
+        if truncate: self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+def report(state, interval):
+    last = 0
+    while True:
+        time.sleep(interval)
+        with state.lock:
+            sent, requests, faults = state.bytes_sent, state.requests, state.faults
+        print(f"{requests} responses, {sent / 1e6:.1f} MB sent ({(sent - last) / interval / 1e6:.2f} MB/s), {faults} faulty", flush=True)
+        last = sent
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in model download server with byte ranges and fault injection")
+    parser.add_argument("root", help="Folder with the files to serve")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds before each response starts")
+    parser.add_argument("--bandwidth", type=float, default=0, help="KB/s per connection (0 = unlimited)")
+    parser.add_argument("--truncate-rate", type=float, default=0.0, help="Fraction of responses cut off halfway")
+    parser.add_argument("--corrupt-rate", type=float, default=0.0, help="Fraction of responses with a flipped byte")
+    parser.add_argument("--no-ranges", action="store_true", help="Ignore Range headers and always send the whole file")
+    parser.add_argument("--report-interval", type=float, default=5)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), Handler)
+    server.daemon_threads = True
+    server.state = StubState(args)
+    threading.Thread(target=report, args=(server.state, args.report_interval), daemon=True).start()
+    print(f"Serving {args.root} on http://{args.host}:{args.port}/", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+import logging
+import multiprocessing as mp
+import time
+from collections import deque
+from multiprocessing import shared_memory
+import numpy as np
+from audio_frontend import OVERFLOW_POLICIES
+from latency import LatencyTracker
+
+log = logging.getLogger("translator")
+
+# header slots (int64) in front of the samples
+WRITE_POS, READ_POS, SKIP_TO, CLOSED, DROPPED, OVERFLOWS = range(6)
+HEADER_BYTES = 8 * 8
+
+# --- SHARED RING BUFFER ---
+# Same interface as AudioRingBuffer, but the samples and positions live in shared memory so the
+# capture side (this process) and the recognizer (a worker process) never share a GIL, and audio
+# keeps buffering while a crashed worker is restarted. Single producer, single consumer: only the
+# producer moves WRITE_POS and SKIP_TO, only the consumer moves READ_POS. On overflow the producer
+# moves SKIP_TO past the audio it is about to overwrite; a reader that copied from that region
+# notices SKIP_TO moved past its start and reads again.
+class SharedAudioRing:
+    def __init__(self, seconds, samplerate, policy="drop_oldest", name=None, capacity=None, data_ready=None):
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {policy}")
+        self.samplerate = samplerate
+        self.policy = policy
+        self.owner = name is None
+        if self.owner:
+            self.capacity = max(1, int(seconds * samplerate))
+            self.shm = shared_memory.SharedMemory(create=True, size=HEADER_BYTES + 2 * self.capacity)
+            self.data_ready = mp.get_context("spawn").Semaphore(0)
+        else:
+            self.capacity = capacity
+            self.shm = shared_memory.SharedMemory(name=name)
+            self.data_ready = data_ready
+        self.header = np.ndarray((8,), dtype=np.int64, buffer=self.shm.buf)
+        self.buf = np.ndarray((self.capacity,), dtype=np.int16, buffer=self.shm.buf, offset=HEADER_BYTES)
+        if self.owner: self.header[:] = 0
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def start(self):
+        return max(self.header[READ_POS], self.header[SKIP_TO])
+
+    def write(self, data):
+        samples = np.frombuffer(data, dtype=np.int16)
+        if self.header[CLOSED]: return
+        n = len(samples)
+        if n > self.capacity:
+            self.header[DROPPED] += n - self.capacity
+            samples = samples[-self.capacity:]
+            n = self.capacity
+        w = int(self.header[WRITE_POS])
+        free = self.capacity - (w - self.start())
+        if n > free:
+            self.header[OVERFLOWS] += 1
+            if self.policy == "block":
+                while not self.header[CLOSED] and self.capacity - (w - self.start()) < n:
+                    time.sleep(0.005)
+            elif self.policy == "skip_to_live":
+                self.header[DROPPED] += w - self.start()
+                self.header[SKIP_TO] = w
+            else:
+                self.header[DROPPED] += n - free
+                self.header[SKIP_TO] = self.start() + n - free
+        pos = w % self.capacity
+        first = min(n, self.capacity - pos)
+        self.buf[pos:pos + first] = samples[:first]
+        self.buf[:n - first] = samples[first:]
+        self.header[WRITE_POS] = w + n
+        self.data_ready.release()
+
+    def read(self, frames):
+        while True:
+            r = int(self.start())
+            available = int(self.header[WRITE_POS]) - r
+            closed = self.header[CLOSED]
+            if available >= frames or (closed and available > 0):
+                n = min(frames, available)
+                pos = r % self.capacity
+                first = min(n, self.capacity - pos)
+                data = self.buf[pos:pos + first].tobytes() + self.buf[:n - first].tobytes()
+                if self.header[SKIP_TO] > r: continue  # overwritten while copying
+                self.header[READ_POS] = r + n
+                return data
+            if closed: return None
+            self.data_ready.acquire(timeout=0.1)
+
+    @property
+    def closed(self):
+        return bool(self.header[CLOSED])
+
+    def close(self):
+        self.header[CLOSED] = 1
+        self.data_ready.release()
+
+    def release(self):
+        del self.header, self.buf, self.data_ready
+        self.shm.close()
+        if self.owner: self.shm.unlink()
+
+    @property
+    def lag_seconds(self):
+        return (int(self.header[WRITE_POS]) - int(self.start())) / self.samplerate
+
+    @property
+    def dropped_frames(self):
+        return int(self.header[DROPPED])
+
+    @property
+    def dropped_seconds(self):
+        return self.dropped_frames / self.samplerate
+
+    @property
+    def overflows(self):
+        return int(self.header[OVERFLOWS])
+
+# --- WORKER PROCESS ---
+# Stands in for gui_queue / translation_queue inside the worker: every put goes up the pipe
+class PipeQueue:
+    def __init__(self, conn, target):
+        self.conn = conn
+        self.target = target
+
+    def put(self, item):
+        self.conn.send((self.target, item))
+
+    def empty(self):
+        return True
+
+class PipeSpeculator:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def update(self, utterance, partial):
+        self.conn.send(("speculate", (utterance, partial)))
+
+    def finish(self, utterance):
+        self.conn.send(("finish", utterance))
+
+# Sends the recognizer's latency observations to the tracker in the main process
+class PipeLatency(LatencyTracker):
+    def __init__(self, conn):
+        super().__init__()
+        self.conn = conn
+
+    def observe(self, stage, seconds):
+        if seconds is not None and seconds >= 0: self.conn.send(("latency", (stage, seconds)))
+
+def worker_main(shm_name, capacity, samplerate, policy, data_ready, conn, model_path, options, utterance=0):
+    import main as app
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s [recognizer] %(message)s")
+    ring = SharedAudioRing(None, samplerate, policy, name=shm_name, capacity=capacity, data_ready=data_ready)
+    app.gui_queue = PipeQueue(conn, "gui")
+    app.translation_queue = PipeQueue(conn, "translate")
+    app.latency = PipeLatency(conn)
+    try:
+        rec = app.make_recognizer(model_path, options["service"])
+        vad = app.VoiceActivityGate(samplerate, hangover=app.VAD_HANGOVER_SECONDS, preroll=app.VAD_PREROLL_SECONDS) if options["use_vad"] else None
+        speculator = PipeSpeculator(conn) if options["speculate"] else None
+        app.recognize_loop(rec, ring, vad, speculator, options["partials"], options["partial_interval"], options["source"],
+                           service=options["service"], segmenter=app.make_segmenter(options["segment"]), utterance=utterance)
+        conn.send(("done", None))
+    except Exception as e:
+        conn.send(("gui", app.caption("final_en", f"Error: {e}", options["source"])))
+        conn.send(("error", str(e)))
+
+# --- SUPERVISOR ---
+# Runs worker_main in a child process and forwards its messages to on_message(kind, payload).
+# A worker that dies without reporting (crash, killed) is restarted with backoff; the shared
+# ring keeps the audio that arrived meanwhile, and the new worker numbers its utterances on from the
+# last one finished, so speculative translations in this process are not taken for stale ones.
+# Gives up after max_restarts within `window` seconds.
+class RecognizerSupervisor:
+    def __init__(self, ring, model_path, options, on_message, max_restarts=5, window=60.0):
+        self.ring = ring
+        self.model_path = model_path
+        self.options = options
+        self.on_message = on_message
+        self.max_restarts = max_restarts
+        self.window = window
+        self.restarts = 0
+        self.next_utterance = 0
+        self.ctx = mp.get_context("spawn")
+
+    def pump(self, conn, proc):
+        while True:
+            try:
+                kind, payload = conn.recv()
+            except (EOFError, OSError):
+                proc.join()
+                return "crashed"
+            if kind in ("done", "error"):
+                proc.join()
+                return kind
+            if kind == "finish": self.next_utterance = max(self.next_utterance, payload + 1)
+            self.on_message(kind, payload)
+
+    def run(self):
+        recent = deque()
+        while True:
+            parent_conn, child_conn = self.ctx.Pipe(duplex=False)
+            proc = self.ctx.Process(target=worker_main, name="recognizer", daemon=True,
+                                    args=(self.ring.name, self.ring.capacity, self.ring.samplerate, self.ring.policy,
+                                          self.ring.data_ready, child_conn, self.model_path, self.options, self.next_utterance))
+            proc.start()
+            child_conn.close()
+            outcome = self.pump(parent_conn, proc)
+            parent_conn.close()
+            if outcome != "crashed": return outcome
+            now = time.time()
+            recent.append(now)
+            while recent and now - recent[0] > self.window: recent.popleft()
+            if len(recent) > self.max_restarts:
+                self.on_message("gui", ("final_en", "Error: recognizer process keeps crashing"))
+                return "crashed"
+            self.restarts += 1
+            log.warning("Recognizer process exited with code %s, restarting (%.1fs of audio waiting)", proc.exitcode, self.ring.lag_seconds)
+            time.sleep(min(10.0, 0.5 * 2 ** (len(recent) - 1)))
@@ -0,0 +1,145 @@
+import heapq
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+log = logging.getLogger("translator")
+
+FORMATS = ("srt", "vtt", "jsonl")
+
+def timestamp(seconds, separator):
+    ms = int(round(seconds * 1000))
+    return f"{ms // 3600000:02d}:{ms // 60000 % 60:02d}:{ms // 1000 % 60:02d}{separator}{ms % 1000:03d}"
+
+# --- TRANSCRIPT ---
+# Write-behind record of a session: every translated sentence (or chunk, see UtteranceSegmenter) with
+# its English text, translation into target and position in the audio. add() never blocks; entries wait in
+# a bounded queue (and are counted as dropped if it is full) for a background thread that writes them
+# in batches, flushes after each batch and fsyncs every fsync_interval seconds, so a slow disk only
+# ever delays the transcript. Files are cut into parts of rotate_seconds of audio; timestamps stay
+# relative to the start of the session. Entries from several streams (or translated out of order)
+# are held for reorder_seconds and written in order of their start time, because players reject
+# SRT files whose times go backwards; a straggler that arrives later still is written with its
+# start moved up to the previous cue's.
+class TranscriptWriter:
+    def __init__(self, folder, formats=FORMATS, buffer_size=1000, flush_interval=1.0, fsync_interval=10.0, rotate_seconds=3600.0, name=None, target="fa",
+                 reorder_seconds=5.0):
+        unknown = set(formats) - set(FORMATS)
+        if unknown: raise ValueError(f"Unknown transcript format(s): {', '.join(sorted(unknown))}")
+        os.makedirs(folder, exist_ok=True)
+        self.folder = folder
+        self.formats = list(formats)
+        self.name = name or time.strftime("session-%Y%m%d-%H%M%S")
+        self.target = target
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self.rotate_seconds = rotate_seconds
+        self.reorder_seconds = reorder_seconds
+        self.held = []  # heap of (start, arrival number, arrival time, entry)
+        self.arrivals = 0
+        self.last_start = 0.0  # start of the last cue written
+        self.late = 0
+        self.queue = queue.Queue(buffer_size)
+        self.dropped = 0
+        self.written = 0
+        self.part = 0
+        self.part_end = None
+        self.files = {}
+        self.cues = 0  # SRT cue number within the current part
+        self.closing = False
+        self.thread = threading.Thread(target=self.run, name="transcript", daemon=True)
+        self.thread.start()
+
+    # start/end: seconds into the stream's audio
+    def add(self, source, english, translated, start, end, segment=False):
+        entry = {"source": source, "start": round(start, 3), "end": round(max(end, start + 0.5), 3), "en": english, self.target: translated}
+        if segment: entry["segment"] = True
+        try:
+            self.queue.put_nowait(entry)
+        except queue.Full:
+            if not self.dropped: log.warning("Transcript writer is falling behind, dropping entries")
+            self.dropped += 1
+
+    def open_part(self, start):
+        self.close_files()
+        self.part += 1
+        self.part_end = (int(start // self.rotate_seconds) + 1) * self.rotate_seconds if self.rotate_seconds else None
+        suffix = "" if self.part == 1 else f".part{self.part}"
+        for fmt in self.formats:
+            f = open(os.path.join(self.folder, f"{self.name}{suffix}.{fmt}"), "w", encoding="utf-8", newline="\n")
+            if fmt == "vtt": f.write("WEBVTT\n\n")
+            self.files[fmt] = f
+        self.cues = 0
+
+    def close_files(self):
+        for f in self.files.values():
+            f.flush()
+            os.fsync(f.fileno())
+            f.close()
+        self.files = {}
+
+    def write(self, entry):
+        # Subtitle times must not go backwards; the JSONL line keeps the real start
+        start = max(entry["start"], self.last_start)
+        if start > entry["start"]: self.late += 1
+        self.last_start = start
+        if not self.files or (self.part_end is not None and entry["start"] >= self.part_end): self.open_part(entry["start"])
+        tag = f"[{entry['source']}] " if entry["source"] else ""
+        lines = "\n".join(line for line in (tag + entry["en"], entry[self.target]) if line.strip())
+        self.cues += 1
+        for fmt, f in self.files.items():
+            if fmt == "srt":
+                f.write(f"{self.cues}\n{timestamp(start, ',')} --> {timestamp(max(entry['end'], start + 0.5), ',')}\n{lines}\n\n")
+            elif fmt == "vtt":
+                f.write(f"{timestamp(start, '.')} --> {timestamp(max(entry['end'], start + 0.5), '.')}\n{lines}\n\n")
+            else:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self.written += 1
+
+    def run(self):
+        last_sync = time.time()
+        while True:
+            try:
+                batch = [self.queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                batch = []
+            while True:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                now = time.time()
+                closing = None in batch
+                for entry in batch:
+                    if entry is None: break
+                    self.arrivals += 1
+                    heapq.heappush(self.held, (entry["start"], self.arrivals, now, entry))
+                while self.held and (closing or now - self.held[0][2] >= self.reorder_seconds):
+                    self.write(heapq.heappop(self.held)[3])
+                if closing:
+                    self.close_files()
+                    return
+                for f in self.files.values(): f.flush()
+                if self.files and time.time() - last_sync >= self.fsync_interval:
+                    for f in self.files.values(): os.fsync(f.fileno())
+                    last_sync = time.time()
+            except OSError as e:
+                log.warning("Writing the transcript failed: %s", e)
+
+    # Writes out what is queued and closes the files
+    def close(self, timeout=10.0):
+        if self.closing: return
+        self.closing = True
+        try:
+            self.queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self.thread.join(timeout)
+
+    def stats(self):
+        return {"written": self.written, "dropped": self.dropped, "queued": self.queue.qsize() + len(self.held), "late": self.late,
+                "parts": self.part}
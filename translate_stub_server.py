@@ -0,0 +1,110 @@
+import argparse
+import html
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Local stand-in for the translation services, for load and failure testing without internet.
+#   POST /translate  LibreTranslate-style JSON (for the "http" backend)
+#   GET  /m          Google mobile page (for the "google" backend via --google-url)
+# Translations are deterministic: every line becomes "[target] line".
+
+class StubState:
+    def __init__(self, args):
+        self.args = args
+        self.started = time.time()
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.failures = 0
+
+    def in_outage(self):
+        if not self.args.outage_every: return False
+        return (time.time() - self.started) % self.args.outage_every < self.args.outage_for
+
+    def should_fail(self):
+        return self.in_outage() or random.random() < self.args.failure_rate
+
+    def delay(self):
+        time.sleep(max(0.0, random.gauss(self.args.latency, self.args.jitter)))
+
+def translate(text, target):
+    return "\n".join(f"[{target}] {line}" for line in text.split("\n"))
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real services
+
+    def send(self, status, body, content_type):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def handle_request(self, text, target, render):
+        state = self.server.state
+        state.delay()
+        with state.lock:
+            state.requests += 1
+            failed = state.should_fail()
+            if failed: state.failures += 1
+        if failed:
+            self.send(state.args.failure_status, "unavailable", "text/plain")
+        else:
+            render(translate(text, target))
+
+    def do_POST(self):
+        if urlparse(self.path).path != "/translate":
+            return self.send(404, "not found", "text/plain")
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        self.handle_request(body.get("q", ""), body.get("target", "fa"),
+                            lambda out: self.send(200, json.dumps({"translatedText": out}, ensure_ascii=False), "application/json"))
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != "/m":
+            return self.send(404, "not found", "text/plain")
+        params = parse_qs(url.query)
+        self.handle_request(params.get("q", [""])[0], params.get("tl", ["fa"])[0],
+                            lambda out: self.send(200, f'<html><body><div class="result-container">{html.escape(out)}</div></body></html>', "text/html"))
+
+    def log_message(self, format, *args):
+        pass
+
+def report(state, interval):
+    last = 0
+    while True:
+        time.sleep(interval)
+        with state.lock:
+            requests, failures = state.requests, state.failures
+        print(f"{requests} requests ({(requests - last) / interval:.1f}/s), {failures} failed{' [outage]' if state.in_outage() else ''}", flush=True)
+        last = requests
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in translation server for load and failure tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--latency", type=float, default=0.2, help="Mean response time in seconds")
+    parser.add_argument("--jitter", type=float, default=0.05, help="Standard deviation of the response time")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fraction of requests that fail at random")
+    parser.add_argument("--failure-status", type=int, default=503)
+    parser.add_argument("--outage-every", type=float, default=0, help="Start an outage every N seconds (0 = never)")
+    parser.add_argument("--outage-for", type=float, default=10, help="Length of each outage in seconds")
+    parser.add_argument("--report-interval", type=float, default=5)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), Handler)
+    server.daemon_threads = True
+    server.state = StubState(args)
+    threading.Thread(target=report, args=(server.state, args.report_interval), daemon=True).start()
+    print(f"Stub translator on http://{args.host}:{args.port} (LibreTranslate: /translate, Google: /m)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,705 @@
+import difflib
+import queue
+import random
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict, deque
+import numpy as np
+
+GOOGLE_TRANSLATE_URL = "https://translate.google.com/m"
+
+# Google keeps line breaks intact, and recognized sentences never contain one
+BATCH_DELIMITER = "\n"
+BATCH_MAX_CHARS = 4500  # GoogleTranslator rejects requests over 5000 characters
+
+# --- BACKENDS ---
+# Every backend has a name and translate(text) -> str, raising on failure.
+# requests, bs4 and deep_translator are imported on first use, off the UI thread.
+# Backends hold HTTP sessions, which are not thread-safe, so each worker thread builds its own.
+
+# Same endpoint and page parsing as deep_translator's GoogleTranslator, but over a
+# keep-alive session (deep_translator opens a new connection for every call) and with a timeout.
+class GoogleWebTranslator:
+    name = "google"
+
+    def __init__(self, source='en', target='fa', timeout=10, url=GOOGLE_TRANSLATE_URL):
+        self.source = source
+        self.target = target
+        self.timeout = timeout
+        self.url = url
+        import requests
+        self.session = requests.Session()
+        self.session.mount("https://", requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=2))
+
+    def translate(self, text):
+        from bs4 import BeautifulSoup
+        from deep_translator.exceptions import RequestError, TooManyRequests, TranslationNotFound
+        text = text.strip()
+        if not text: return text
+        response = self.session.get(self.url, params={"sl": self.source, "tl": self.target, "q": text}, timeout=self.timeout)
+        if response.status_code == 429: raise TooManyRequests()
+        if response.status_code != 200: raise RequestError()
+        soup = BeautifulSoup(response.text, "html.parser")
+        element = soup.find("div", {"class": "t0"}) or soup.find("div", {"class": "result-container"})
+        if not element: raise TranslationNotFound(text)
+        return element.get_text(strip=True)
+
+# LibreTranslate-style JSON API: POST {url}/translate {"q", "source", "target"} -> {"translatedText"}
+class HttpTranslator:
+    name = "http"
+
+    def __init__(self, url, source='en', target='fa', timeout=10, api_key=None):
+        self.url = url.rstrip("/") + "/translate"
+        self.source = source
+        self.target = target
+        self.timeout = timeout
+        self.api_key = api_key
+        import requests
+        self.session = requests.Session()
+
+    def translate(self, text):
+        from deep_translator.exceptions import RequestError, TooManyRequests
+        payload = {"q": text, "source": self.source, "target": self.target, "format": "text"}
+        if self.api_key: payload["api_key"] = self.api_key
+        response = self.session.post(self.url, json=payload, timeout=self.timeout)
+        if response.status_code == 429: raise TooManyRequests()
+        if response.status_code != 200: raise RequestError()
+        return response.json()["translatedText"]
+
+# Offline fallback from a tab-separated "english<TAB>translation" file. Whole lines are looked up
+# first, then the longest known phrases word by word; unknown words are left untranslated. Its
+# output is only good enough to show, never to cache (offline).
+class PhraseTableTranslator:
+    name = "phrases"
+    offline = True
+    max_phrase_words = 6
+
+    def __init__(self, path):
+        self.table = {}
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if "\t" not in line or line.startswith("#"): continue
+                src, dst = line.rstrip("\n").split("\t", 1)
+                self.table[normalize_text(src)] = dst.strip()
+
+    def translate_line(self, line):
+        words = normalize_text(line).split()
+        if " ".join(words) in self.table: return self.table[" ".join(words)]
+        out = []
+        i = 0
+        while i < len(words):
+            for n in range(min(self.max_phrase_words, len(words) - i), 0, -1):
+                phrase = " ".join(words[i:i + n])
+                if phrase in self.table:
+                    out.append(self.table[phrase])
+                    i += n
+                    break
+            else:
+                out.append(words[i])
+                i += 1
+        return " ".join(part for part in out if part)  # words mapped to "" (such as "the") leave no gap
+
+    def translate(self, text):
+        return "\n".join(self.translate_line(line) for line in text.split("\n"))
+
+# --- FAILOVER ---
+# closed: requests go through. After `threshold` consecutive failures the breaker opens and
+# the backend is skipped for `reset_after` seconds, then a single trial request (half-open)
+# decides whether it closes again or stays open for another period.
+class CircuitBreaker:
+    def __init__(self, threshold=3, reset_after=30.0):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.lock = threading.Lock()
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+
+    @property
+    def state(self):
+        if self.opened_at is None: return "closed"
+        return "half_open" if time.time() - self.opened_at >= self.reset_after else "open"
+
+    def allow(self):
+        with self.lock:
+            state = self.state
+            if state == "closed": return True
+            if state == "half_open" and not self.trial_running:
+                self.trial_running = True
+                return True
+            return False
+
+    def success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_running = False
+
+    def failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.trial_running or self.failures >= self.threshold:
+                self.opened_at = time.time()
+            self.trial_running = False
+
+# Tries backends in order. Each gets `retries` extra attempts with exponential backoff
+# (plus jitter) before the chain fails over to the next one; backends whose breaker is
+# open are skipped without waiting. Breakers and counters are shared by all threads,
+# backend instances are per thread.
+class TranslatorChain:
+    def __init__(self, factories, retries=2, backoff=0.5, max_backoff=4.0, breaker_threshold=3, breaker_reset=30.0):
+        self.factories = factories  # [(name, callable returning a backend)]
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.breakers = {name: CircuitBreaker(breaker_threshold, breaker_reset) for name, _ in factories}
+        self.counts = {name: {"ok": 0, "failed": 0} for name, _ in factories}
+        self.counts_lock = threading.Lock()
+        self.local = threading.local()
+
+    def backend(self, name, factory):
+        backends = self.local.__dict__.setdefault("backends", {})
+        if name not in backends: backends[name] = factory()
+        return backends[name]
+
+    def count(self, name, outcome):
+        with self.counts_lock:
+            self.counts[name][outcome] += 1
+
+    def translate(self, text):
+        error = None
+        for name, factory in self.factories:
+            breaker = self.breakers[name]
+            for attempt in range(self.retries + 1):
+                if not breaker.allow(): break
+                try:
+                    result = self.backend(name, factory).translate(text)
+                except Exception as e:
+                    error = e
+                    breaker.failure()
+                    self.count(name, "failed")
+                    if attempt < self.retries and breaker.state == "closed":
+                        delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+                        time.sleep(delay * random.uniform(0.5, 1.0))
+                    continue
+                breaker.success()
+                self.count(name, "ok")
+                self.local.offline = getattr(self.backend(name, factory), "offline", False)
+                return result
+        if error: raise error
+        from deep_translator.exceptions import RequestError
+        raise RequestError("All translator backends are unavailable")
+
+    # Whether this thread's last translation came from an offline fallback
+    def answered_offline(self):
+        return self.local.__dict__.get("offline", False)
+
+    def stats(self):
+        with self.counts_lock:
+            return {name: dict(self.counts[name], state=self.breakers[name].state) for name, _ in self.factories}
+
+# --- BATCHING ---
+# Blocks for the first sentence, then keeps taking sentences for up to max_wait seconds
+# (or while any are already waiting) until max_size is reached
+def collect_batch(source_queue, max_size, max_wait, size=len):
+    batch = [source_queue.get()]
+    chars = size(batch[0])
+    deadline = time.time() + max_wait
+    while len(batch) < max_size:
+        try:
+            txt = source_queue.get(timeout=max(0, deadline - time.time())) if max_wait > 0 else source_queue.get_nowait()
+        except queue.Empty:
+            break
+        batch.append(txt)
+        chars += size(txt) + len(BATCH_DELIMITER)
+        if chars >= BATCH_MAX_CHARS: break
+    return batch
+
+def split_batch(translated, count):
+    parts = [p.strip() for p in translated.split(BATCH_DELIMITER) if p.strip()]
+    return parts if len(parts) == count else None
+
+# Sends the sentences as one request and maps the lines back; if the translation
+# merged or split lines, falls back to one request per sentence.
+# Returns (translations, requests made, cacheable); not cacheable if any came from an offline fallback.
+def translate_batch(translator, texts):
+    if len(texts) == 1:
+        return [translator.translate(texts[0])], 1, not translator.answered_offline()
+    parts = split_batch(translator.translate(BATCH_DELIMITER.join(texts)) or "", len(texts))
+    if parts is not None:
+        return parts, 1, not translator.answered_offline()
+    parts, cacheable = [], True
+    for t in texts:
+        parts.append(translator.translate(t))
+        cacheable = cacheable and not translator.answered_offline()
+    return parts, 1 + len(texts), cacheable
+
+# Sentences per second of wall time during which at least one batch was being translated,
+# so idle gaps between sentences don't count and concurrent workers aren't double counted
+class ThroughputCounter:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sentences = 0
+        self.requests = 0
+        self.saved_requests = 0
+        self.in_flight = 0
+        self.busy_since = 0.0
+        self.busy_seconds = 0.0
+
+    def begin(self):
+        with self.lock:
+            if self.in_flight == 0: self.busy_since = time.time()
+            self.in_flight += 1
+
+    # saved: round trips avoided because every sentence in the batch came from the cache
+    def end(self, sentences, requests, saved=0):
+        with self.lock:
+            self.sentences += sentences
+            self.requests += requests
+            self.saved_requests += saved
+            self.in_flight -= 1
+            if self.in_flight == 0: self.busy_seconds += time.time() - self.busy_since
+
+    def snapshot(self):
+        with self.lock:
+            busy = self.busy_seconds + (time.time() - self.busy_since if self.in_flight else 0)
+            return {
+                "sentences": self.sentences,
+                "requests": self.requests,
+                "saved_requests": self.saved_requests,
+                "in_flight": self.in_flight,
+                "sentences_per_second": round(self.sentences / busy, 2) if busy else None,
+            }
+
+# Hands results on strictly in sequence order, holding back any that finish early
+class OrderedDelivery:
+    def __init__(self, deliver):
+        self.deliver = deliver
+        self.lock = threading.Lock()
+        self.next_seq = 0
+        self.waiting = {}
+
+    def put(self, seq, item):
+        with self.lock:
+            self.waiting[seq] = item
+            while self.next_seq in self.waiting:
+                self.deliver(self.waiting.pop(self.next_seq))
+                self.next_seq += 1
+
+# --- CACHE ---
+def normalize_text(text):
+    return " ".join(text.lower().split())
+
+# The only words two sentences may differ in and still share a translation: articles and fillers
+# that Vosk drops or inserts. Any other word ("like" for "hate", "john" for "mary") can change the
+# meaning. They are also left out of the MinHash signature, so a dropped "the" or an extra "uh"
+# doesn't move a sentence to other buckets.
+FILLER_WORDS = frozenset("a an the uh um er ah hmm oh mm yeah".split())
+MINHASH_PRIME = (1 << 32) - 5  # below 2**32, so a * crc32 + b fits in uint64
+FUZZY_MEMORY_SIZE = 200000  # sentences indexed for near-duplicate lookups
+
+def word_similarity(a, b):
+    if any(w not in FILLER_WORDS for w in set(a) ^ set(b)): return 0.0
+    return difflib.SequenceMatcher(None, a, b, autojunk=False).ratio()
+
+# Translation memory for near-duplicates: Vosk rarely recognizes a repeated line identically, so
+# sentences that differ only in FILLER_WORDS and whose word sequences are at least `threshold`
+# similar (difflib ratio) reuse a stored translation. Candidates come from MinHash LSH over the sentence's content words: `bands` bands of
+# `rows` hashes each, one bucket lookup per band. Each band's buckets are a sorted numpy array of
+# keys (binary search, ~12 bytes per entry) plus a small dict of recent additions that gets merged in
+# every `merge_every` entries. Only the `max_candidates` entries sharing the most buckets are
+# compared word by word. Holds at most `capacity` entries; the oldest slots are reused and index
+# entries pointing at a reused slot are dropped when the arrays grow past capacity.
+class FuzzyMemory:
+    def __init__(self, threshold=0.85, capacity=FUZZY_MEMORY_SIZE, bands=8, rows=3, min_words=3, bucket_limit=32, max_candidates=8, merge_every=4096):
+        self.threshold = threshold
+        self.capacity = capacity
+        self.bands = bands
+        self.rows = rows
+        self.min_words = min_words
+        self.bucket_limit = bucket_limit
+        self.max_candidates = max_candidates
+        self.merge_every = merge_every
+        rng = np.random.default_rng(7)  # fixed, so signatures are the same in every run
+        self.hash_a = rng.integers(1, MINHASH_PRIME, (bands * rows, 1), dtype=np.uint64)
+        self.hash_b = rng.integers(0, MINHASH_PRIME, (bands * rows, 1), dtype=np.uint64)
+        self.mix = rng.integers(1, 1 << 62, rows, dtype=np.uint64) | np.uint64(1)
+        self.entries = [None] * capacity  # slot -> (source, target, normalized text, translation)
+        self.exact = {}  # (source, target, normalized text) -> slot
+        self.slot_keys = np.zeros((capacity, bands), dtype=np.uint64)
+        self.next_slot = 0
+        self.keys = [np.zeros(0, dtype=np.uint64) for _ in range(bands)]
+        self.slots = [np.zeros(0, dtype=np.int32) for _ in range(bands)]
+        self.pending = [{} for _ in range(bands)]
+        self.pending_count = 0
+        self.lock = threading.Lock()
+        self.lookups = 0
+        self.hits = 0
+        self.near_misses = 0  # best candidate within 0.1 below the threshold
+        self.hit_similarity = 0.0
+        self.times = deque(maxlen=2048)
+
+    def band_keys(self, words, source, target):
+        content = {w for w in words if w not in FILLER_WORDS} or set(words)
+        hashes = np.fromiter((zlib.crc32(w.encode()) for w in content), dtype=np.uint64, count=len(content))
+        signature = ((self.hash_a * hashes + self.hash_b) % np.uint64(MINHASH_PRIME)).min(axis=1)
+        # uint64 arithmetic wraps around, which is fine for mixing
+        keys = (signature.reshape(self.bands, self.rows) * self.mix).sum(axis=1)
+        return keys ^ np.uint64(zlib.crc32(f"{source}>{target}".encode()))
+
+    def add(self, text, source, target, translation):
+        text = normalize_text(text)
+        words = text.split()
+        if len(words) < self.min_words or not translation: return
+        key = (source, target, text)
+        keys = self.band_keys(words, source, target)
+        with self.lock:
+            slot = self.exact.get(key)
+            if slot is not None:
+                self.entries[slot] = key + (translation,)
+                return
+            slot = self.next_slot % self.capacity
+            self.next_slot += 1
+            if self.entries[slot]: self.exact.pop(self.entries[slot][:3], None)
+            self.entries[slot] = key + (translation,)
+            self.exact[key] = slot
+            self.slot_keys[slot] = keys
+            for band, k in enumerate(keys.tolist()):
+                self.pending[band].setdefault(k, []).append(slot)
+            self.pending_count += 1
+            if self.pending_count >= self.merge_every: self.merge()
+
+    def merge(self):
+        for band in range(self.bands):
+            items = [(k, slot) for k, slots in self.pending[band].items() for slot in slots]
+            self.pending[band] = {}
+            if not items: continue
+            new_keys = np.array([k for k, _ in items], dtype=np.uint64)
+            new_slots = np.array([slot for _, slot in items], dtype=np.int32)
+            order = np.argsort(new_keys, kind="stable")
+            new_keys, new_slots = new_keys[order], new_slots[order]
+            # side="right" keeps newer entries after older ones with the same key
+            at = np.searchsorted(self.keys[band], new_keys, side="right")
+            keys, slots = np.insert(self.keys[band], at, new_keys), np.insert(self.slots[band], at, new_slots)
+            if len(keys) > self.capacity * 1.25:
+                live = self.slot_keys[slots, band] == keys
+                keys, slots = keys[live], slots[live]
+            self.keys[band], self.slots[band] = keys, slots
+        self.pending_count = 0
+
+    # Translation of the most similar stored sentence if it reaches the threshold, else None
+    def lookup(self, text, source, target):
+        started = time.perf_counter()
+        words = normalize_text(text).split()
+        if len(words) < self.min_words: return None
+        keys = self.band_keys(words, source, target)
+        with self.lock:
+            shared = {}
+            for band, k in enumerate(keys):
+                sorted_keys = self.keys[band]
+                hi = sorted_keys.searchsorted(k, side="right")
+                lo = max(sorted_keys.searchsorted(k, side="left"), hi - self.bucket_limit)
+                for slot in self.slots[band][lo:hi].tolist() + self.pending[band].get(int(k), [])[-self.bucket_limit:]:
+                    shared[slot] = shared.get(slot, 0) + 1
+            best, best_score = None, 0.0
+            for slot in sorted(shared, key=shared.get, reverse=True)[:self.max_candidates]:
+                entry = self.entries[slot]
+                if entry is None or entry[0] != source or entry[1] != target: continue
+                score = word_similarity(words, entry[2].split())
+                if score > best_score: best, best_score = entry[3], score
+            self.lookups += 1
+            if best_score >= self.threshold:
+                self.hits += 1
+                self.hit_similarity += best_score
+            else:
+                if best_score >= self.threshold - 0.1: self.near_misses += 1
+                best = None
+            self.times.append(time.perf_counter() - started)
+        return best
+
+    def stats(self):
+        with self.lock:
+            times = sorted(self.times)
+            return {
+                "fuzzy_entries": len(self.exact),
+                "fuzzy_lookups": self.lookups,
+                "fuzzy_hits": self.hits,
+                "fuzzy_hit_rate": round(self.hits / self.lookups, 3) if self.lookups else None,
+                "fuzzy_near_misses": self.near_misses,
+                "fuzzy_mean_similarity": round(self.hit_similarity / self.hits, 3) if self.hits else None,
+                "fuzzy_lookup_ms_p50": round(times[len(times) // 2] * 1000, 3) if times else None,
+                "fuzzy_lookup_ms_p99": round(times[min(len(times) - 1, int(len(times) * 0.99))] * 1000, 3) if times else None,
+            }
+
+# In-memory LRU in front of an optional SQLite table that survives restarts.
+# Both tiers are keyed by (source language, target language, normalized text).
+# With a FuzzyMemory, sentences missing from both are looked up there next. start_fuzzy_fill() fills
+# it from the most recently used rows of the table in a background thread (a few seconds of CPU for
+# a full table, so the GUI starts it once the overlay is up); until then it only knows new puts.
+# Disk hits only note the new last_used time; the notes are written with the next put, or after
+# touch_interval seconds, so a hit never waits for a commit (those still pending at exit are lost,
+# which only makes the rows look older to the trim).
+class TranslationCache:
+    def __init__(self, path=None, memory_size=2000, disk_size=200000, fuzzy=None, touch_interval=30.0):
+        self.memory = OrderedDict()
+        self.memory_size = memory_size
+        self.disk_size = disk_size
+        self.fuzzy = fuzzy
+        self.lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.fuzzy_hits = 0
+        self.misses = 0
+        self.db = None
+        self.puts_since_trim = 0
+        self.touched = {}  # key -> last_used not written yet
+        self.touch_interval = touch_interval
+        self.touches_written = time.time()
+        if path:
+            self.db = sqlite3.connect(path, check_same_thread=False)
+            self.db.execute("CREATE TABLE IF NOT EXISTS translations (source TEXT, target TEXT, text TEXT, translation TEXT, "
+                            "last_used REAL, PRIMARY KEY (source, target, text))")
+            self.db.execute("CREATE INDEX IF NOT EXISTS translations_last_used ON translations (last_used)")
+            self.db.commit()
+
+    def start_fuzzy_fill(self):
+        if self.fuzzy and self.db: threading.Thread(target=self.fill_fuzzy, name="fuzzy-memory", daemon=True).start()
+
+    def fill_fuzzy(self):
+        with self.lock:
+            rows = self.db.execute("SELECT source, target, text, translation FROM translations ORDER BY last_used DESC LIMIT ?",
+                                   (self.fuzzy.capacity,)).fetchall()
+        for i, (source, target, text, translation) in enumerate(reversed(rows)):
+            self.fuzzy.add(text, source, target, translation)
+            if i % 1000 == 999: time.sleep(0.01)  # leave the recognizer and the overlay some room
+
+    def remember(self, key, translation):
+        self.memory[key] = translation
+        self.memory.move_to_end(key)
+        if len(self.memory) > self.memory_size:
+            self.memory.popitem(last=False)
+
+    def get(self, text, source, target):
+        key = (source, target, normalize_text(text))
+        with self.lock:
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                self.memory_hits += 1
+                return self.memory[key]
+            if self.db:
+                row = self.db.execute("SELECT translation FROM translations WHERE source=? AND target=? AND text=?", key).fetchone()
+                if row:
+                    self.touched[key] = time.time()
+                    if time.time() - self.touches_written >= self.touch_interval:
+                        self.write_touches()
+                        self.db.commit()
+                    self.remember(key, row[0])
+                    self.disk_hits += 1
+                    return row[0]
+            if self.fuzzy:
+                # Not copied into the exact tier, so a wrong match is not served again as if it were exact
+                found = self.fuzzy.lookup(text, source, target)
+                if found is not None:
+                    self.fuzzy_hits += 1
+                    return found
+            self.misses += 1
+            return None
+
+    def put(self, text, source, target, translation):
+        key = (source, target, normalize_text(text))
+        if self.fuzzy: self.fuzzy.add(text, source, target, translation)
+        with self.lock:
+            self.remember(key, translation)
+            if not self.db: return
+            self.touched.pop(key, None)
+            self.write_touches()
+            self.db.execute("INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?, ?)", key + (translation, time.time()))
+            self.puts_since_trim += 1
+            # Counting rows is not free, so only check the size limit every few hundred inserts
+            if self.puts_since_trim >= 500:
+                self.puts_since_trim = 0
+                excess = self.db.execute("SELECT COUNT(*) FROM translations").fetchone()[0] - self.disk_size
+                if excess > 0:
+                    self.db.execute("DELETE FROM translations WHERE rowid IN "
+                                    "(SELECT rowid FROM translations ORDER BY last_used LIMIT ?)", (excess,))
+            self.db.commit()
+
+    # Caller holds the lock and commits
+    def write_touches(self):
+        if self.touched:
+            self.db.executemany("UPDATE translations SET last_used=? WHERE source=? AND target=? AND text=?",
+                                [(used,) + key for key, used in self.touched.items()])
+            self.touched = {}
+        self.touches_written = time.time()
+
+    def stats(self):
+        hits = self.memory_hits + self.disk_hits + self.fuzzy_hits
+        lookups = hits + self.misses
+        stats = {
+            "cache_hits": hits,
+            "cache_memory_hits": self.memory_hits,
+            "cache_disk_hits": self.disk_hits,
+            "cache_fuzzy_hits": self.fuzzy_hits,
+            "cache_misses": self.misses,
+            "cache_hit_rate": round(hits / lookups, 3) if lookups else None,
+        }
+        if self.fuzzy: stats.update(self.fuzzy.stats())
+        return stats
+
+# --- SPECULATIVE TRANSLATION ---
+# Translates the stable prefix of the partial hypothesis before the utterance is final.
+# A word prefix is "stable" once it has been identical in the last few partials (the last
+# word is always left out, Kaldi is still working on it). At most one request waits at a
+# time: a newer prefix replaces it, and results that come back after the hypothesis moved
+# on or the utterance finished are dropped.
+class SpeculativeTranslator:
+    def __init__(self, translate, on_result, debounce=0.6, min_new_words=2, stable_partials=3):
+        self.translate = translate
+        self.on_result = on_result
+        self.debounce = debounce
+        self.min_new_words = min_new_words
+        self.stable_partials = stable_partials
+        self.enabled = True
+        self.cond = threading.Condition()
+        self.pending = None  # (seq, utterance, text)
+        self.seq = 0
+        self.recent = []
+        self.utterance = None
+        self.sent_words = []
+        self.last_sent = 0.0
+        self.finished_utterance = -1
+        self.requests = 0
+        self.dropped = 0
+
+    def stable_prefix(self, words):
+        self.recent = (self.recent + [words])[-self.stable_partials:]
+        if len(self.recent) < self.stable_partials: return []
+        n = 0
+        limit = min(len(w) for w in self.recent)
+        while n < limit and all(w[n] == words[n] for w in self.recent): n += 1
+        return words[:min(n, len(words) - 1)]
+
+    # Called from the recognizer thread with every partial hypothesis
+    def update(self, utterance, partial):
+        if not self.enabled: return
+        if utterance != self.utterance:
+            self.utterance, self.recent, self.sent_words = utterance, [], []
+        stable = self.stable_prefix(partial.split())
+        revised = stable[:len(self.sent_words)] != self.sent_words
+        grown = len(stable) - len(self.sent_words) >= self.min_new_words
+        if not stable or not (revised or grown) or time.time() - self.last_sent < self.debounce:
+            return
+        self.sent_words = stable
+        self.last_sent = time.time()
+        with self.cond:
+            if self.pending: self.dropped += 1
+            self.seq += 1
+            self.pending = (self.seq, utterance, " ".join(stable))
+            self.cond.notify()
+
+    # Called once the utterance has a final result; its speculative text is no longer needed
+    def finish(self, utterance):
+        with self.cond:
+            self.finished_utterance = max(self.finished_utterance, utterance)
+            if self.pending and self.pending[1] <= utterance:
+                self.pending = None
+                self.dropped += 1
+
+    def run(self):
+        while True:
+            with self.cond:
+                while self.pending is None: self.cond.wait()
+                seq, utterance, text = self.pending
+                self.pending = None
+            try:
+                self.requests += 1
+                result = self.translate(text)
+            except Exception:
+                continue
+            with self.cond:
+                stale = seq != self.seq or utterance <= self.finished_utterance
+            if stale:
+                self.dropped += 1
+            else:
+                self.on_result(utterance, result)
+
+# --- SEGMENTATION ---
+# Words that usually open a new clause; the recognizer's output has no punctuation to go by
+CLAUSE_WORDS = {"and", "but", "so", "because", "or", "which", "who", "where", "when", "while", "although",
+                "though", "then", "if", "since", "unless", "whereas", "after", "before", "until"}
+
+# Cuts run-on utterances into chunks that can be translated while the speaker goes on. Words are
+# stable once the last `stable_partials` partial results agree on them. Stable words are committed
+# before a clause word once there are min_words of them, when the hypothesis has not changed for
+# `pause` seconds, or when max_words are waiting. No word waits longer than max_seconds: then
+# everything but the word still being spoken is committed, stable or not.
+class UtteranceSegmenter:
+    def __init__(self, min_words=4, max_words=16, max_seconds=5.0, pause=0.5, stable_partials=2):
+        self.min_words = min_words
+        self.max_words = max_words
+        self.max_seconds = max_seconds
+        self.pause = pause
+        self.stable_partials = stable_partials
+        self.segments = 0
+        self.reset()
+
+    def reset(self):
+        self.committed = []  # words of this utterance already committed
+        self.recent = []
+        self.seen = []  # when each word position first appeared
+        self.words = None
+        self.changed = 0.0
+
+    # words: the current partial hypothesis, passed on every PartialResult() even if unchanged.
+    # Returns the words to commit now (empty if none).
+    def update(self, words, now=None):
+        now = time.time() if now is None else now
+        if words != self.words:
+            self.words, self.changed = words, now
+            self.recent = (self.recent + [words])[-self.stable_partials:]
+        self.seen = self.seen[:len(words)] + [now] * (len(words) - len(self.seen))
+        start = len(self.committed)
+        if len(words) <= start: return []
+        paused = now - self.changed >= self.pause
+        stable = 0
+        limit = min(len(w) for w in self.recent)
+        while stable < limit and all(w[stable] == words[stable] for w in self.recent): stable += 1
+        if len(self.recent) < self.stable_partials: stable = 0
+        # After a pause the last word is complete too
+        stable = len(words) if paused else min(stable, len(words) - 1)
+
+        cut = None
+        if now - self.seen[start] >= self.max_seconds:
+            cut = max(stable, len(words) - 1)
+        elif paused or stable - start >= self.max_words:
+            cut = stable
+        else:
+            for i in range(stable - 1, start + self.min_words - 1, -1):
+                if words[i] in CLAUSE_WORDS:
+                    cut = i
+                    break
+        if cut is None or cut <= start: return []
+        chunk = words[start:cut]
+        self.committed = self.committed + chunk
+        self.segments += 1
+        return chunk
+
+    # Words of the partial not committed yet
+    def remainder(self, words):
+        return words[len(self.committed):]
+
+    # The final result minus what was already committed (the recognizer may have revised a
+    # committed word, so the committed words are aligned against the final rather than counted off)
+    def finish(self, text):
+        words = text.split()
+        if self.committed:
+            blocks = [b for b in difflib.SequenceMatcher(None, self.committed, words, autojunk=False).get_matching_blocks() if b.size]
+            if blocks:
+                last = blocks[-1]
+                words = words[last.b + last.size + len(self.committed) - (last.a + last.size):]
+            else:
+                words = words[len(self.committed):]
+        self.reset()
+        return " ".join(words)